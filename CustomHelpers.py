@@ -1,21 +1,105 @@
 import json
+import re
+import os
+from collections import namedtuple
 
-def recursive_parse_json(json_str):
-    try:
-        # Try parsing the string as JSON
-        parsed = json.loads(json_str)
-        
-        # If it's a dictionary, recursively parse its values
-        if isinstance(parsed, dict):
-            return {k: recursive_parse_json(v) for k, v in parsed.items()}
-        # If it's a list, recursively parse each element
-        elif isinstance(parsed, list):
-            return [recursive_parse_json(element) for element in parsed]
-        else:
-            return parsed
-    except (json.JSONDecodeError, TypeError):
-        # If parsing fails, return the original string
+try:
+    import orjson
+except ImportError:  # optional, only speeds up the container parses
+    orjson = None
+if os.getenv('HOWDY_JSON_BACKEND', '').lower() == 'json':
+    orjson = None
+
+# Levels of JSON-encoded strings recursive_parse_json will unwrap
+MAX_JSON_DEPTH = 32
+JSON_WHITESPACE = ' \t\n\r'
+JSON_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+JSON_NUMBER_START = frozenset('-0123456789')
+JSON_CONSTANTS = {'true': True, 'false': False, 'null': None,
+                  'NaN': float('nan'), 'Infinity': float('inf'), '-Infinity': float('-inf')}
+
+CV_URL = 'https://compass-ssb.tamu.edu/pls/PROD/bwykfupd.p_showdoc?doctype_in=CV&pidm_in={}'
+
+# One instructor of a section, decoded from SWV_CLASS_SEARCH_INSTRCTR_JSON
+Instructor = namedtuple('Instructor', ['raw_name', 'name', 'last_name', 'pidm', 'has_cv', 'cv_url'])
+# One meeting of a section, decoded from SWV_CLASS_SEARCH_JSON_CLOB. days uses MTWRFSU letters and
+# mask is the weekly time bitmask of the meeting (see meeting_mask)
+Meeting = namedtuple('Meeting', ['meeting_type', 'days', 'begin_time', 'end_time', 'building', 'room', 'mask'])
+
+MEETING_DAY_FIELDS = [
+    ('SSRMEET_MON_DAY', 'M'), ('SSRMEET_TUE_DAY', 'T'), ('SSRMEET_WED_DAY', 'W'),
+    ('SSRMEET_THU_DAY', 'R'), ('SSRMEET_FRI_DAY', 'F'), ('SSRMEET_SAT_DAY', 'S'),
+    ('SSRMEET_SUN_DAY', 'U'),
+]
+
+# Weekly time bitmasks: one bit per SLOT_MINUTES of the week, days in WEEK_DAYS order
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WEEK_DAYS = 'MTWRFSU'
+MEETING_TIME = re.compile(r'^\s*(\d{1,2}):?(\d{2})\s*([AaPp])?\.?[Mm]?\.?\s*$')
+
+def _json_loads(text):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity, huge ints, ... fall through to the stdlib parser
+    return json.loads(text)
+
+def _decode_json_string(text):
+    """Parse a string that might hold JSON, returning it unchanged when it clearly does not"""
+    stripped = text.strip(JSON_WHITESPACE)
+    if not stripped:
+        return text
+    first = stripped[0]
+    if first in '{["':
+        try:
+            return _json_loads(stripped)
+        except ValueError:
+            return text
+    if first in JSON_NUMBER_START:
+        if not JSON_NUMBER.fullmatch(stripped):
+            return JSON_CONSTANTS.get(stripped, text)
+        if '.' in stripped or 'e' in stripped or 'E' in stripped:
+            return float(stripped)
+        return int(stripped)
+    return JSON_CONSTANTS.get(stripped, text)
+
+def recursive_parse_json(json_str, max_depth=MAX_JSON_DEPTH):
+    """
+    Decode a Howdy payload whose values may themselves be JSON-encoded strings.
+
+    Strings are only handed to the JSON parser when their first character can start
+    a JSON document; numeric strings are converted directly, so the plain-text leaves
+    that make up most of a payload never raise. Non-string values are returned as is.
+
+    Args:
+        json_str: Value to decode, usually the text of a Howdy response
+        max_depth (int): How many levels of JSON-inside-a-string to unwrap
+
+    Returns:
+        The decoded value, or json_str unchanged if it is not JSON
+    """
+    if isinstance(json_str, str):
+        parsed = _decode_json_string(json_str)
+    elif isinstance(json_str, (bytes, bytearray)):
+        try:
+            parsed = _json_loads(json_str)
+        except ValueError:
+            return json_str
+    else:
         return json_str
+
+    if max_depth <= 0:
+        return parsed
+    # Only string values can hold another layer of JSON
+    if isinstance(parsed, dict):
+        return {k: recursive_parse_json(v, max_depth - 1) if isinstance(v, str) else v
+                for k, v in parsed.items()}
+    elif isinstance(parsed, list):
+        return [recursive_parse_json(element, max_depth - 1) if isinstance(element, str) else element
+                for element in parsed]
+    return parsed
     
 
 def parse_meeting_info(out):
@@ -50,4 +134,100 @@ def parse_prof(str: str):
             out.append((name, cv))
         except KeyError:
             out.append(('Not assigned', None))
-    return out
\ No newline at end of file
+    return out
+
+
+def extract_last_name(name):
+    """Last name of "First M. Last" (Howdy) or "LAST F" (anex) style names"""
+    # Handle special cases like "LAST F"
+    if re.match(r'^[A-Z]+\s+[A-Z]$', name):
+        return name.split()[0]
+    parts = name.split()
+    if parts:
+        return parts[-1]
+    return name
+
+def normalize_instructors(value):
+    """Decode an instructor JSON blob into a tuple of Instructor records"""
+    value = recursive_parse_json(value) if isinstance(value, str) else value
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return ()
+    out = []
+    for prof in value:
+        if not isinstance(prof, dict) or not prof.get('NAME'):
+            continue
+        name = prof['NAME'].replace(' (P)', '')
+        has_cv = prof.get('HAS_CV') == 'Y'
+        pidm = prof.get('MORE')
+        out.append(Instructor(prof['NAME'], name, extract_last_name(name), pidm, has_cv,
+                              CV_URL.format(pidm) if has_cv else None))
+    return tuple(out)
+
+def parse_meeting_time(text):
+    """Minutes after midnight of a Howdy meeting time ("09:10 AM", "1:50 PM", "0910"), or None"""
+    if not isinstance(text, str):
+        return None
+    match = MEETING_TIME.match(text)
+    if not match:
+        return None
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        hours = hours % 12 + (12 if meridiem in 'Pp' else 0)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+def meeting_mask(days, begin_time, end_time):
+    """
+    Weekly bitmask of a meeting: bit day * SLOTS_PER_DAY + slot is set for every
+    SLOT_MINUTES slot the meeting touches. Meetings without days or times give 0,
+    so they never conflict with anything.
+    """
+    begin, end = parse_meeting_time(begin_time), parse_meeting_time(end_time)
+    if not days or begin is None or end is None or end <= begin:
+        return 0
+    first, last = begin // SLOT_MINUTES, (end - 1) // SLOT_MINUTES
+    day_mask = ((1 << (last - first + 1)) - 1) << first
+    mask = 0
+    for day in days:
+        position = WEEK_DAYS.find(day)
+        if position >= 0:
+            mask |= day_mask << (position * SLOTS_PER_DAY)
+    return mask
+
+def mask_ranges(mask):
+    """Turn a weekly bitmask back into [{'day', 'start', 'end'}] ranges, times as HH:MM"""
+    ranges = []
+    for position, day in enumerate(WEEK_DAYS):
+        day_bits = (mask >> (position * SLOTS_PER_DAY)) & ((1 << SLOTS_PER_DAY) - 1)
+        slot = 0
+        while day_bits:
+            if not day_bits & 1:
+                skip = (day_bits & -day_bits).bit_length() - 1
+                day_bits >>= skip
+                slot += skip
+                continue
+            run = (~day_bits & (day_bits + 1)).bit_length() - 1
+            start, end = slot * SLOT_MINUTES, (slot + run) * SLOT_MINUTES
+            ranges.append({'day': day, 'start': f"{start // 60:02d}:{start % 60:02d}", 'end': f"{end // 60:02d}:{end % 60:02d}"})
+            day_bits >>= run
+            slot += run
+    return ranges
+
+def normalize_meetings(value):
+    """Decode a meeting JSON blob (SWV_CLASS_SEARCH_JSON_CLOB) into a tuple of Meeting records"""
+    value = recursive_parse_json(value) if isinstance(value, str) else value
+    if not isinstance(value, list):
+        return ()
+    out = []
+    for meeting in value:
+        if not isinstance(meeting, dict):
+            continue
+        days = ''.join(letter for field, letter in MEETING_DAY_FIELDS if meeting.get(field))
+        begin_time, end_time = meeting.get('SSRMEET_BEGIN_TIME'), meeting.get('SSRMEET_END_TIME')
+        out.append(Meeting(meeting.get('SSRMEET_MTYP_CODE'), days, begin_time, end_time,
+                           meeting.get('SSRMEET_BLDG_CODE'), meeting.get('SSRMEET_ROOM_CODE'),
+                           meeting_mask(days, begin_time, end_time)))
+    return tuple(out)
@@ -1,5 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
+from instructor_identity import name_key
 
 # Function to get professor ratings from Rate My Professors
 def get_professor_rating(prof_last_name, department):
@@ -7,7 +8,8 @@ def get_professor_rating(prof_last_name, department):
     Get rating information for a professor from RateMyProfessors.com
     
     Args:
-        prof_last_name (str): The last name of the professor to search for
+        prof_last_name (str): The professor to search for: a last name, "LAST F" or a full name.
+                              With a first initial, only cards for that initial are accepted.
         department (str): The department name (e.g., "Computer Science")
         
     Returns:
@@ -37,7 +39,8 @@ def get_professor_rating(prof_last_name, department):
         session.headers.update(headers)
         
         # Search for the professor by last name
-        search_url = f"https://www.ratemyprofessors.com/search/professors/1003?q={prof_last_name}"
+        key = name_key(prof_last_name)
+        search_url = f"https://www.ratemyprofessors.com/search/professors/1003?q={key.last_name or prof_last_name}"
         print(f"Searching URL: {search_url}")
         
         response = requests.get(search_url, headers=headers)
@@ -61,6 +64,12 @@ def get_professor_rating(prof_last_name, department):
             print(f"Checking department: '{div.text}' against '{department}'")
             # Convert TAMU department codes to text names for matching
             if department_matches(div.text, department):
+                # Skip other professors with the same last name
+                card = div.find_parent("a", class_="TeacherCard__StyledTeacherCard-syjs0d-0")
+                card_name = card.find("div", class_=lambda c: c and c.startswith("CardName__")) if card else None
+                if card_name and key.first_initial and name_key(card_name.text).key != key.key:
+                    print(f"Skipping '{card_name.text}' - not {prof_last_name}")
+                    continue
                 # Found a matching department
                 matching_card = div
                 print(f"MATCH FOUND: '{div.text}' matches '{department}'")
@@ -0,0 +1,188 @@
+import threading
+import time
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Alert fields the monitor needs; phone details are looked up on the user at send time
+ALERT_FIELDS = ('CRN', 'Term', 'email', 'status', 'opened_at', 'use_phone', 'updated_at')
+# Seconds between polls of the updated_at cursor when change streams are unavailable
+POLL_INTERVAL = 5
+# Seconds between full resyncs in polling mode, which is how deletes are noticed
+POLL_RESYNC_INTERVAL = 10 * 60
+# Longest wait between attempts to reopen a broken change stream
+MAX_RETRY_DELAY = 60
+# Seconds start() waits for the initial seed
+SEED_TIMEOUT = 30
+
+
+class AlertRegistry:
+    """
+    In-memory copy of the active alerts, indexed by (term, CRN).
+
+    The registry is seeded with one find() and then kept current by a background thread
+    following a change stream on the alert collection. The stream is opened before the
+    seed, so changes made while seeding are not lost, and a broken stream is reopened
+    with a fresh seed. Standalone servers, which have no change streams, are followed
+    with an updated_at polling cursor instead; every writer of the collection therefore
+    sets updated_at.
+
+    Alert dicts are replaced, never modified, when a change arrives, so snapshots handed
+    out by by_section() stay consistent.
+
+    Args:
+        collection: pymongo collection of alerts
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index('updated_at')
+        except Exception as e:
+            print(f"Could not create updated_at index on alerts: {e}")
+        self._by_id = {}
+        self._by_section = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.mode = None
+        self.last_sync = None
+
+    def start(self, timeout=SEED_TIMEOUT):
+        """Start following the collection (once) and wait for the initial seed."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._follow, name='alert-registry', daemon=True)
+            self._thread.start()
+        if not self._ready.wait(timeout):
+            print(f"Alert registry not seeded after {timeout}s; continuing with what it has")
+        return self
+
+    def _project(self, doc):
+        alert = {field: doc.get(field) for field in ALERT_FIELDS}
+        alert['_id'] = doc['_id']
+        return alert
+
+    def _put(self, doc):
+        """Insert, replace or (when it is no longer active) remove one alert. Caller holds the lock."""
+        self._remove(doc['_id'])
+        if not doc.get('active'):
+            return
+        alert = self._project(doc)
+        self._by_id[alert['_id']] = alert
+        self._by_section.setdefault((alert['Term'], alert['CRN']), {})[alert['_id']] = alert
+
+    def _remove(self, alert_id):
+        alert = self._by_id.pop(alert_id, None)
+        if alert is None:
+            return
+        section = (alert['Term'], alert['CRN'])
+        alerts = self._by_section.get(section)
+        if alerts is not None:
+            alerts.pop(alert_id, None)
+            if not alerts:
+                del self._by_section[section]
+
+    def _seed(self):
+        """Replace the registry with the active alerts in the collection. Returns the newest updated_at."""
+        projection = dict.fromkeys(ALERT_FIELDS + ('active',), 1)
+        docs = list(self.collection.find({'active': True}, projection))
+        with self._lock:
+            self._by_id, self._by_section = {}, {}
+            for doc in docs:
+                self._put(doc)
+        self.last_sync = time.time()
+        self._ready.set()
+        print(f"Alert registry seeded with {len(docs)} active alerts ({self.mode})")
+        return max((doc.get('updated_at') or 0 for doc in docs), default=0)
+
+    def _apply(self, change):
+        operation = change['operationType']
+        with self._lock:
+            if operation == 'delete':
+                self._remove(change['documentKey']['_id'])
+            elif change.get('fullDocument') is not None:
+                self._put(change['fullDocument'])
+            else:
+                # Updated and then deleted before the lookup ran
+                self._remove(change['documentKey']['_id'])
+
+    def _follow(self):
+        delay = 1
+        self.mode = 'change stream'
+        while True:
+            try:
+                pipeline = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+                with self.collection.watch(pipeline, full_document='updateLookup') as stream:
+                    self._seed()
+                    delay = 1
+                    for change in stream:
+                        self._apply(change)
+                        self.last_sync = time.time()
+            except OperationFailure as e:
+                # Standalone servers do not support change streams
+                print(f"Alert change stream unavailable, polling updated_at instead: {e}")
+                break
+            except PyMongoError as e:
+                print(f"Alert change stream broke, resyncing in {delay}s: {e}")
+            except Exception as e:
+                print(f"Alert registry error, resyncing in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+        self._poll()
+
+    def _poll(self):
+        self.mode = 'polling'
+        cursor = None
+        last_resync = 0
+        while True:
+            try:
+                if cursor is None or time.time() - last_resync >= POLL_RESYNC_INTERVAL:
+                    cursor = self._seed()
+                    last_resync = time.time()
+                else:
+                    # >= so writes sharing the cursor's timestamp are not missed; re-applying is harmless
+                    docs = list(self.collection.find({'updated_at': {'$gte': cursor}},
+                                                     dict.fromkeys(ALERT_FIELDS + ('active',), 1)))
+                    with self._lock:
+                        for doc in docs:
+                            self._put(doc)
+                    cursor = max([cursor] + [doc['updated_at'] for doc in docs])
+                    self.last_sync = time.time()
+            except Exception as e:
+                print(f"Alert registry poll failed, resyncing: {e}")
+                cursor = None
+            time.sleep(POLL_INTERVAL)
+
+    def set_status(self, alerts, status, opened_at=None):
+        """Record a status (and for alerts that just opened, opened_at) the monitor just wrote, without waiting for the change to come back."""
+        with self._lock:
+            for alert in alerts:
+                if alert['_id'] in self._by_id:
+                    changed = {'status': status, 'active': True}
+                    if opened_at is not None and alert.get('status', False) != status:
+                        changed['opened_at'] = opened_at
+                    self._put(dict(alert, **changed))
+
+    def discard(self, alert_ids):
+        """Drop alerts the monitor just deactivated."""
+        with self._lock:
+            for alert_id in alert_ids:
+                self._remove(alert_id)
+
+    def by_section(self):
+        """Returns {(term, CRN): [alert, ...]} of every active alert."""
+        with self._lock:
+            return {section: list(alerts.values()) for section, alerts in self._by_section.items()}
+
+    def term_counts(self):
+        """Returns {term_code: number of active alerts}."""
+        with self._lock:
+            counts = {}
+            for (term_code, _), alerts in self._by_section.items():
+                counts[term_code] = counts.get(term_code, 0) + len(alerts)
+            return counts
+
+    def ids(self):
+        with self._lock:
+            return set(self._by_id)
+
+    def __len__(self):
+        return len(self._by_id)
@@ -1,4 +1,3 @@
-import api 
 from dotenv import load_dotenv
 import os
 from pymongo import MongoClient
@@ -11,12 +10,15 @@ load_dotenv()
 
 mongo_uri = os.getenv('MONGO_URI')
 
-api = api.Howdy_API()
 client = MongoClient(mongo_uri)
 db = client['AggieClassAlert']
 collection = db['CRNS']
 
-def find_profs(department, course_code):
+def find_profs(department, course_code, api):
+    """
+    Args:
+        api (Howdy_API): The caller's instance, so a process never builds a second catalog just for anex
+    """
     res = api.get_grade_distribution(department, course_code)
     print(f"API returned {len(res)} sections for {department} {course_code}")
     
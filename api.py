@@ -5,233 +5,816 @@ import requests
 import aiohttp
 import asyncio
 import json
+import hashlib
 import datetime
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 from CustomHelpers import recursive_parse_json
+from howdy_client import HowdyClient, HowdyUnavailable, MAX_CONCURRENT_REQUESTS
+from snapshots import SnapshotStore, SNAPSHOT_DIR
+from catalog_diff import changed_crns, diff_catalogs, apply_changes, availability_changes, is_seat_field
+from fetch_planner import FetchPlanner, seat_state, DUMP, TARGETED
+from section_catalog import SectionCatalog, SectionCatalogBuilder
+from detail_cache import SectionDetailCache, MISS, SHORT_DETAIL_TTL, LONG_DETAIL_TTL
+from json_stream import JSONArrayStream
+from instructor_identity import InstructorIndex
+from seat_history import summarize
+from course_search import CourseSearchIndex, DEFAULT_SUGGESTIONS
+from schedule import find_conflicts, fitting_sections, combined_mask, generate_schedules, section_scorer, DEFAULT_SCHEDULE_LIMIT
+from shared_catalog import MANIFEST_CHECK_INTERVAL, REQUEST_TOUCH_INTERVAL, PUBLISH_WAIT_TIMEOUT, PUBLISH_POLL_INTERVAL
 
-SEMESTERS = ['Fall 2025', 
-             'Summer 2025']
+SECTION_DETAILS_URL = 'https://howdy.tamu.edu/api/course-section-details'
+SECTION_DETAIL_LINKS = {
+    "Section attributes"             : 'https://howdy.tamu.edu/api/section-attributes',
+    "Section prereqs"                : 'https://howdy.tamu.edu/api/section-prereqs',
+    "Bookstore links"                : 'https://howdy.tamu.edu/api/section-bookstore-links',
+    "Meeting times with profs"       : 'https://howdy.tamu.edu/api/section-meeting-times-with-profs',
+    "Section program restrictions"   : 'https://howdy.tamu.edu/api/section-program-restrictions',
+    "Section college restrictions"   : 'https://howdy.tamu.edu/api/section-college-restrictions',
+    "Level restrictions"             : 'https://howdy.tamu.edu/api/section-level-restrictions',
+    "Degree restrictions"            : 'https://howdy.tamu.edu/api/section-degree-restrictions',
+    "Major restrictions"             : 'https://howdy.tamu.edu/api/section-major-restrictions',
+    "Minor restrictions"             : 'https://howdy.tamu.edu/api/section-minor-restrictions',
+    "Concentrations restrictions"    : 'https://howdy.tamu.edu/api/section-concentrations-restrictions',
+    "Field of study restrictions"    : 'https://howdy.tamu.edu/api/section-field-of-study-restrictions',
+    "Department restrictions"        : 'https://howdy.tamu.edu/api/section-department-restrictions',
+    "Cohort restrictions"            : 'https://howdy.tamu.edu/api/section-cohort-restrictions',
+    "Student attribute restrictions" : 'https://howdy.tamu.edu/api/section-student-attribute-restrictions',
+    "Classification restrictions"    : 'https://howdy.tamu.edu/api/section-classifications-restrictions',
+    "Campus restrictions"            : 'https://howdy.tamu.edu/api/section-campus-restrictions',
+}
+# Cache key of the course-section-details payload
+GENERAL_INFO_KEY = 'General info'
+# Details that move during registration; everything else is cached for LONG_DETAIL_TTL
+SHORT_TTL_DETAILS = {GENERAL_INFO_KEY, 'Meeting times with profs'}
+
+# Seconds allowed for a single term's course-sections download
+TERM_FETCH_TIMEOUT = 45
+# Seconds a loaded term stays in memory after it was last accessed
+TERM_IDLE_TIMEOUT = 30 * 60
+# Campus whose newest term is used where a route has no term parameter, and the term used before the list is known
+DEFAULT_CAMPUS = 'College Station'
+DEFAULT_TERM_CODE = '202531'
 
 class Howdy_API:
-    def __init__(self):
-        self.terms = self.get_all_terms()
-        self.term_codes_to_desc = {term['STVTERM_CODE']: term['STVTERM_DESC'] for term in self.terms}
-        self.classes = {term['STVTERM_CODE']: self.get_classes(term['STVTERM_CODE']) for term in self.terms}
+    """
+    Howdy catalog for every term in the live all-terms list.
+
+    Terms are loaded lazily: a term's sections are read from its snapshot (or
+    downloaded) the first time get_catalog() or one of the filters asks for it,
+    refreshed while it stays in use, and evicted once nobody has touched it for
+    idle_timeout seconds.
+
+    With a shared_catalog (see shared_catalog.py) several processes share one
+    catalog. The refresher (follower=False) fetches as usual, publishes every new
+    catalog version and loads the terms workers ask for. Followers never download
+    sections: they map the published versions and pick up new ones as the manifest
+    changes.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_REQUESTS, term_timeout=TERM_FETCH_TIMEOUT,
+                 snapshot_dir=SNAPSHOT_DIR, warm_start=True, detail_cache=None, idle_timeout=TERM_IDLE_TIMEOUT,
+                 shared_catalog=None, follower=False, seat_history=None):
+        self.client = HowdyClient(max_concurrency=max_concurrency)
+        self.detail_cache = detail_cache if detail_cache is not None else SectionDetailCache()
+        # {cache key: task} of detail requests in flight on the client loop
+        self._detail_requests = {}
+        self.term_timeout = term_timeout
+        self.idle_timeout = idle_timeout
+        self.snapshots = SnapshotStore(snapshot_dir)
+        self._snapshot_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='howdy-snapshots')
+        # Decodes course-sections dumps off the client loop, which keeps serving other requests meanwhile
+        self._decoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='howdy-decode')
+        self.terms = []
+        self.term_codes_to_desc = {}
+        self.classes = {}
+        self.fetched_at = {}
+        self.availability = {}
+        self.last_changes = {}
+        # {term_code: unix time the term was last accessed}
+        self.last_access = {}
+        # Serializes the swaps of classes/availability/fetched_at, and one load per term
+        self._state_lock = threading.Lock()
+        self._term_locks = {}
+        # {term_code: CourseSearchIndex}, built before a new catalog of the term is swapped in
+        self._search_indexes = {}
+        # {term_code: InstructorIndex}, likewise
+        self._instructor_indexes = {}
+        # Counters for how much work the payload and per-section hashes saved
+        self.fetch_stats = {'payloads': 0, 'unchanged_payloads': 0, 'sections': 0, 'unchanged_sections': 0}
+        # Measures dumps and details calls and picks between them in refresh_watched()
+        self.fetch_planner = FetchPlanner()
+        # Terms whose availability map was updated by targeted polls since their last dump
+        self._targeted_terms = set()
+        # Optional FileSeatHistory / MongoSeatHistory that every refresh appends seat changes to
+        self.seat_history = seat_history
+        self.shared_catalog = shared_catalog
+        self.follower = follower and shared_catalog is not None
+        # Follower bookkeeping: mapped version per term, last manifest seen, last request touch per term
+        self._shared_versions = {}
+        self._shared_mtime = None
+        self._shared_checked = 0
+        self._shared_requested = {}
+
+        if self.follower:
+            self._sync_shared(force=True)
+            print(f"Howdy API following shared catalog in {shared_catalog.directory} ({len(self.terms)} terms)")
+            return
+        if shared_catalog is not None:
+            threading.Thread(target=self._serve_shared_requests, name='howdy-shared-requests', daemon=True).start()
+
+        if warm_start and self._load_term_list():
+            print(f"Howdy API warm-started with {len(self.terms)} terms from snapshots, refreshing the list in the background")
+            threading.Thread(target=self.refresh_terms, name='howdy-warm-refresh', daemon=True).start()
+        else:
+            self.refresh_terms()
         #print(f"Howdy API initialized, loaded {len(self.terms)} terms: \n{'\n'.join([f\"{term['STVTERM_DESC']} ({term['STVTERM_CODE']})\" for term in self.terms])}\n")
 
+    def _set_terms(self, terms):
+        self.terms = terms
+        self.term_codes_to_desc = {term['STVTERM_CODE']: term['STVTERM_DESC'] for term in terms}
 
-    def get_all_terms(current=True):
-        res = requests.get(ALL_TERMS_URL)
-        if res.status_code != 200:
-            raise Exception(f"Failed to fetch term data from {ALL_TERMS_URL}")
+    def default_term_code(self, campus=DEFAULT_CAMPUS):
+        """Newest term whose description names the campus (e.g. "Fall 2025 - College Station"), or DEFAULT_TERM_CODE."""
+        codes = [term['STVTERM_CODE'] for term in self.terms if campus in term['STVTERM_DESC']]
+        return max(codes) if codes else DEFAULT_TERM_CODE
+
+    def _load_term_list(self):
+        """Load the term list from disk. Returns False if there is no snapshot of it."""
+        snapshot = self.snapshots.load_terms()
+        if snapshot is None:
+            return False
+        self._set_terms(snapshot[0])
+        return True
+
+    def _load_term_snapshot(self, term_code):
+        """Returns (SectionCatalog, fetched_at) from a term's snapshot, or None if it is missing or unreadable."""
+        term_snapshot = self.snapshots.load_raw(term_code)
+        if term_snapshot is None:
+            return None
+        data, fetched_at = term_snapshot
         try:
-            if current:
-                return [term for term in res.json() if any(semester in term['STVTERM_DESC'] for semester in SEMESTERS)]
+            return self._build_catalog([data], hashlib.blake2b(data, digest_size=16).hexdigest()), fetched_at
+        except json.JSONDecodeError as e:
+            print(f"Ignoring unreadable snapshot for term {term_code}: {e}")
+            return None
+
+    def refresh(self):
+        """Re-download the term list and the sections of every loaded term."""
+        self.refresh_terms()
+        self.refresh_classes()
+
+    def refresh_terms(self):
+        """Re-download the term list, keeping the cached one if Howdy fails to return it."""
+        if self.follower:
+            self._sync_shared(force=True)
+            return
+        try:
+            self._set_terms(self.get_all_terms())
+            self._snapshot_writer.submit(self.snapshots.save_terms, self.terms)
+            if self.shared_catalog is not None:
+                self._snapshot_writer.submit(self.shared_catalog.publish_terms, self.terms)
+        except Exception as e:
+            if not self.terms:
+                raise
+            print(f"Keeping cached term list: {str(e)}")
+
+    def get_catalog(self, term_code):
+        """
+        Returns a term's SectionCatalog, loading it on first access.
+
+        A term with a snapshot on disk is served from it right away and refreshed in
+        the background; otherwise it is downloaded before returning. Unknown terms
+        and terms that cannot be loaded give an empty catalog, which is not kept.
+        """
+        if self.follower:
+            # Also brings the term list up to date
+            self._sync_shared()
+        if self.term_codes_to_desc and term_code not in self.term_codes_to_desc:
+            # Checked first, so unknown terms leave no access time or want-file behind
+            return SectionCatalog.from_sections([])
+        self.last_access[term_code] = time.time()
+        if self.follower:
+            self._request_shared(term_code)
+        catalog = self.classes.get(term_code)
+        if catalog is not None:
+            return catalog
+
+        with self._state_lock:
+            lock = self._term_locks.setdefault(term_code, threading.Lock())
+        with lock:
+            catalog = self.classes.get(term_code)
+            if catalog is None:
+                catalog = self._load_term(term_code)
+        return catalog if catalog is not None else SectionCatalog.from_sections([])
+
+    def _load_term(self, term_code):
+        if self.follower:
+            return self._wait_for_shared(term_code)
+        snapshot = self._load_term_snapshot(term_code)
+        if snapshot is None:
+            print(f"Loading term {term_code} from Howdy")
+            self.refresh_classes([term_code])
+            return self.classes.get(term_code)
+
+        catalog, fetched_at = snapshot
+        indexes = self._build_indexes({term_code: catalog})
+        with self._state_lock:
+            self._install_indexes(indexes)
+            self.classes = {**self.classes, term_code: catalog}
+            self.availability = {**self.availability, term_code: catalog.availability_map()}
+            self.fetched_at[term_code] = fetched_at
+        self._publish(term_code, catalog, fetched_at)
+        print(f"Loaded term {term_code} from its snapshot, refreshing in the background")
+        threading.Thread(target=self.refresh_classes, args=([term_code],), name=f'howdy-load-{term_code}', daemon=True).start()
+        return catalog
+
+    def evict_idle_terms(self, keep=()):
+        """
+        Drop loaded terms nobody has accessed for idle_timeout seconds.
+
+        Args:
+            keep (iterable): Term codes to keep regardless of when they were last accessed
+
+        Returns:
+            list: The evicted term codes
+        """
+        cutoff = time.time() - self.idle_timeout
+        keep = set(keep)
+        with self._state_lock:
+            idle = [term_code for term_code in self.classes
+                    if term_code not in keep and self.last_access.get(term_code, 0) < cutoff]
+            if not idle:
+                return []
+            self.classes = {term_code: catalog for term_code, catalog in self.classes.items() if term_code not in idle}
+            self.availability = {term_code: terms for term_code, terms in self.availability.items() if term_code not in idle}
+            for term_code in idle:
+                self._targeted_terms.discard(term_code)
+                self._search_indexes.pop(term_code, None)
+                self._instructor_indexes.pop(term_code, None)
+                self.fetched_at.pop(term_code, None)
+                self.last_access.pop(term_code, None)
+                self._shared_versions.pop(term_code, None)
+        if self.shared_catalog is not None and not self.follower:
+            for term_code in idle:
+                self._snapshot_writer.submit(self.shared_catalog.unpublish, term_code)
+        print(f"Evicted idle terms: {', '.join(idle)}")
+        return idle
+
+    def refresh_classes(self, term_codes=None):
+        """
+        Re-download sections concurrently and persist the fresh ones as snapshots.
+
+        Idle terms are evicted first. Terms passed in explicitly count as accessed,
+        so they are loaded if needed and kept warm.
+
+        Args:
+            term_codes (iterable): Terms to refresh, defaults to every loaded term
+
+        Returns:
+            dict: {term_code: list of SectionChange} against the previous snapshot of each term
+        """
+        if self.follower:
+            return self._refresh_shared(term_codes)
+        if self.shared_catalog is not None:
+            self._note_shared_requests()
+        if term_codes is None:
+            self.evict_idle_terms()
+            term_codes = list(self.classes)
+        else:
+            term_codes = list(dict.fromkeys(term_codes))
+            now = time.time()
+            for term_code in term_codes:
+                self.last_access[term_code] = now
+            self.evict_idle_terms(keep=term_codes)
+        fresh = self._fetch_catalogs(term_codes)
+        fetched_at = time.time()
+
+        classes = {}
+        availability = {}
+        changes = {}
+        for term_code in term_codes:
+            previous = self.classes.get(term_code)
+            if fresh[term_code] is None:
+                if previous is None:
+                    # Never loaded; leave it unloaded so the next access tries again
+                    continue
+                classes[term_code] = previous
+                availability[term_code] = self.availability.get(term_code) or previous.availability_map()
+                continue
+
+            catalog = fresh[term_code]
+            classes[term_code] = catalog
+            self.fetched_at[term_code] = fetched_at
+            if catalog is not previous:
+                self._publish(term_code, catalog, fetched_at)
+            self.fetch_stats['payloads'] += 1
+            self.fetch_stats['sections'] += len(catalog)
+            if term_code in self._targeted_terms and term_code in self.availability:
+                # Targeted polls moved the map away from the previous catalog, so a catalog
+                # diff would miss sections they changed; re-base the map on this dump instead
+                self._targeted_terms.discard(term_code)
+                availability[term_code] = catalog.availability_map()
+                changes[term_code] = availability_changes(self.availability[term_code], availability[term_code])
+                self._record_seats(term_code, catalog, None, fetched_at)
+            elif catalog is previous and term_code in self.availability:
+                # Identical payload: keep the catalog, indexes and availability map as they are
+                self.fetch_stats['unchanged_payloads'] += 1
+                self.fetch_stats['unchanged_sections'] += len(catalog)
+                changes[term_code] = []
+                availability[term_code] = self.availability[term_code]
+            elif previous and term_code in self.availability:
+                crns = changed_crns(previous, catalog)
+                if crns is not None:
+                    self.fetch_stats['unchanged_sections'] += len(catalog) - sum(1 for crn in crns if crn in catalog.crn_index)
+                changes[term_code] = diff_catalogs(previous, catalog, crns)
+                availability[term_code] = apply_changes(dict(self.availability[term_code]), changes[term_code])
+                self._record_seats(term_code, catalog, [change.crn for change in changes[term_code]
+                                                        if change.direction != 'removed'], fetched_at)
             else:
-                return res.json()
+                availability[term_code] = catalog.availability_map()
+                self._record_seats(term_code, catalog, None, fetched_at)
+
+        indexes = self._build_indexes(classes)
+        with self._state_lock:
+            self._install_indexes(indexes)
+            self.classes = {**self.classes, **classes}
+            self.availability = {**self.availability, **availability}
+        self.last_changes = changes
+        return changes
+
+    def _record_seats(self, term_code, catalog, crns, fetched_at):
+        """Append the seat state of the given CRNs (None: every section) to the seat history, off the caller's thread."""
+        if self.seat_history is not None and (crns is None or crns):
+            self._snapshot_writer.submit(self.seat_history.record, term_code, catalog, crns, fetched_at)
+
+    def get_seat_history(self, term_code, crn, since=None):
+        """
+        A section's recorded seat observations with its fill rate and open fraction (see seat_history.summarize).
+
+        Returns:
+            dict, or None when no seat history is configured
+        """
+        if self.seat_history is None:
+            return None
+        return summarize(self.seat_history.history(term_code, crn, since))
+
+    def _publish(self, term_code, catalog, fetched_at):
+        """Hand a new catalog version to the shared catalog, off the caller's thread."""
+        if self.shared_catalog is not None and not self.follower:
+            self._snapshot_writer.submit(self.shared_catalog.publish, term_code, catalog, fetched_at)
+
+    def _note_shared_requests(self):
+        """Count workers' use of a term as an access. Returns the requested term codes."""
+        requested = self.shared_catalog.requested_terms(self.idle_timeout)
+        for term_code, requested_at in requested.items():
+            self.last_access[term_code] = max(self.last_access.get(term_code, 0), requested_at)
+        return requested
+
+    def _serve_shared_requests(self):
+        """Refresher loop: load every term a worker asked for that is not loaded yet."""
+        while True:
+            try:
+                for term_code in self._note_shared_requests():
+                    if term_code not in self.classes:
+                        self.get_catalog(term_code)
+            except Exception as e:
+                print(f"Failed to serve shared catalog requests: {e}")
+            time.sleep(MANIFEST_CHECK_INTERVAL)
+
+    def _request_shared(self, term_code):
+        now = time.monotonic()
+        if now - self._shared_requested.get(term_code, -REQUEST_TOUCH_INTERVAL) >= REQUEST_TOUCH_INTERVAL:
+            self._shared_requested[term_code] = now
+            try:
+                self.shared_catalog.request(term_code)
+            except OSError as e:
+                print(f"Could not request term {term_code} from the refresher: {e}")
+
+    def _sync_shared(self, force=False):
+        """Follower: map any newer published version of the loaded terms, at most once per MANIFEST_CHECK_INTERVAL."""
+        now = time.monotonic()
+        if not force and now - self._shared_checked < MANIFEST_CHECK_INTERVAL:
+            return
+        self._shared_checked = now
+        mtime = self.shared_catalog.manifest_mtime()
+        if mtime == self._shared_mtime:
+            return
+        self._shared_mtime = mtime
+        manifest = self.shared_catalog.manifest()
+        if manifest['terms']:
+            self._set_terms(manifest['terms'])
+        for term_code in list(self.classes):
+            entry = manifest['catalogs'].get(term_code)
+            if entry is not None and entry['version'] != self._shared_versions.get(term_code):
+                self._map_shared(term_code, entry)
+
+    def _map_shared(self, term_code, entry):
+        try:
+            version, catalog = self.shared_catalog.open(entry)
+        except (OSError, ValueError) as e:
+            # Superseded between reading the manifest and opening the file; the next sync maps the new one
+            print(f"Could not map shared catalog for term {term_code}: {e}")
+            return None
+        indexes = self._build_indexes({term_code: catalog})
+        with self._state_lock:
+            self._install_indexes(indexes)
+            self.classes = {**self.classes, term_code: catalog}
+            self.availability = {**self.availability, term_code: catalog.availability_map()}
+            self.fetched_at[term_code] = entry['fetched_at']
+            self._shared_versions[term_code] = version
+        return catalog
+
+    def _wait_for_shared(self, term_code):
+        """Follower: ask the refresher for a term and map it once published. Returns None on timeout."""
+        self._shared_requested.pop(term_code, None)
+        self._request_shared(term_code)
+        deadline = time.monotonic() + PUBLISH_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            entry = self.shared_catalog.manifest()['catalogs'].get(term_code)
+            if entry is not None:
+                catalog = self._map_shared(term_code, entry)
+                if catalog is not None:
+                    return catalog
+            time.sleep(PUBLISH_POLL_INTERVAL)
+        print(f"Refresher did not publish term {term_code} within {PUBLISH_WAIT_TIMEOUT}s")
+        return None
+
+    def _refresh_shared(self, term_codes):
+        """Follower refresh_classes: map the newest published versions and diff them against the old ones."""
+        if term_codes is not None:
+            for term_code in term_codes:
+                self.get_catalog(term_code)
+        self.evict_idle_terms(keep=term_codes or ())
+        previous = self.classes
+        self._sync_shared(force=True)
+
+        changes = {}
+        for term_code in (term_codes if term_codes is not None else list(self.classes)):
+            old, new = previous.get(term_code), self.classes.get(term_code)
+            if new is None:
+                continue
+            changes[term_code] = [] if old is None or old is new else diff_catalogs(old, new, changed_crns(old, new))
+        self.last_changes = changes
+        return changes
+
+    def get_all_terms(self):
+        status, text = self.client.run(self.client.request('GET', ALL_TERMS_URL))
+        if status != 200:
+            raise Exception(f"Failed to fetch term data from {ALL_TERMS_URL}")
+        try:
+            return json.loads(text)
         except:
             raise Exception(f"Failed to parse term data from {ALL_TERMS_URL}")
 
 
 
     def get_classes(self, term_code):
+        sections = self.client.run(self._fetch_classes(term_code))
+        if sections is None and term_code in self.classes:
+            print(f"Serving last good classes for term {term_code}")
+            return self.classes[term_code].to_sections()
+        return sections or []
+
+    async def _fetch_classes(self, term_code):
+        """Fetch one term's sections on the client loop. Returns None if the fetch failed."""
+        loop = asyncio.get_running_loop()
+        sections = []
+        parser = JSONArrayStream(sections.append)
+        if await self._download_classes(term_code, lambda chunk: loop.run_in_executor(self._decoder, parser.feed, chunk)) is None:
+            return None
+        try:
+            await loop.run_in_executor(self._decoder, parser.close)
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse JSON response for term {term_code}: {str(e)}")
+            return None
+        print(f"Successfully fetched {len(sections)} classes for term {term_code}")
+        return sections
+
+    def _fetch_catalogs(self, term_codes):
+        """Returns {term_code: SectionCatalog, or None if that term's fetch failed}."""
+        async def fetch_all():
+            return await asyncio.gather(*[self._fetch_catalog(term_code) for term_code in term_codes])
+
+        return dict(zip(term_codes, self.client.run(fetch_all())))
+
+    async def _fetch_catalog(self, term_code):
+        """
+        Download one term's course-sections dump and turn it into a SectionCatalog.
+
+        The body is hashed, decoded and spooled to the term's snapshot as it arrives, so it
+        is never held in memory whole. Decoding runs on the decoder thread, one chunk at a
+        time, so the client loop is never blocked by it. If it turns out to be byte-for-byte the payload the
+        current catalog was built from, the new catalog and snapshot are thrown away and the
+        current catalog is returned as is, so nothing is diffed, indexed or rewritten on disk.
+
+        Returns:
+            SectionCatalog (the current one if unchanged), or None if the fetch failed
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        builder, parser = self._catalog_parser()
+        snapshot = self.snapshots.writer(term_code)
+        loop = asyncio.get_running_loop()
+        size = 0
+
+        async def feed(chunk):
+            nonlocal size
+            size += len(chunk)
+            digest.update(chunk)
+            self._snapshot_writer.submit(snapshot.write, chunk)
+            await loop.run_in_executor(self._decoder, parser.feed, chunk)
+
+        started = time.monotonic()
+        if await self._download_classes(term_code, feed) is None:
+            self._snapshot_writer.submit(snapshot.abort)
+            return None
+        payload_hash = digest.hexdigest()
+        fetched_at = time.time()
+
+        previous = self.classes.get(term_code)
+        if previous is not None and previous.payload_hash == payload_hash:
+            print(f"Classes for term {term_code} unchanged since last fetch")
+            self.fetch_planner.observe_dump(term_code, size, time.monotonic() - started)
+            self._snapshot_writer.submit(snapshot.abort)
+            self._snapshot_writer.submit(self.snapshots.touch, term_code, fetched_at)
+            return previous
+
+        def finish():
+            parser.close()
+            builder.payload_hash = payload_hash
+            return builder.build()
+
+        try:
+            catalog = await loop.run_in_executor(self._decoder, finish)
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse JSON response for term {term_code}: {str(e)}")
+            self._snapshot_writer.submit(snapshot.abort)
+            return None
+        # Decoding is part of what a dump costs us, so it is timed along with the download
+        self.fetch_planner.observe_dump(term_code, size, time.monotonic() - started)
+        print(f"Successfully fetched {len(catalog)} classes for term {term_code}")
+        self._snapshot_writer.submit(snapshot.commit, len(catalog), fetched_at)
+        return catalog
+
+    @staticmethod
+    def _catalog_parser():
+        """Returns (SectionCatalogBuilder, JSONArrayStream that adds each decoded section to it with its hash)."""
+        builder = SectionCatalogBuilder()
+        return builder, JSONArrayStream(lambda section, text: builder.add(section, hash(text)), raw=True)
+
+    @classmethod
+    def _build_catalog(cls, chunks, payload_hash):
+        """Decode a course-sections body incrementally into a SectionCatalog with per-section hashes."""
+        builder, parser = cls._catalog_parser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+        builder.payload_hash = payload_hash
+        return builder.build()
+
+    async def _download_classes(self, term_code, on_chunk):
+        """
+        Download one term's course-sections dump, handing the body to on_chunk as it arrives.
+
+        Returns:
+            bool: True once the whole body was received, or None if the fetch failed
+        """
         print(f"\nFetching classes for term {term_code}...")
         try:
-            res = requests.post(CLASS_LIST_URL, json={"termCode":term_code})
-            print(f"Response status code: {res.status_code}")
-            
-            if res.status_code == 401:
+            status, text = await self.client.stream('POST', CLASS_LIST_URL, on_chunk, json={"termCode": term_code}, timeout=self.term_timeout)
+            print(f"Response status code: {status}")
+
+            if status == 401:
                 print(f"Unauthorized access to Howdy API for term {term_code}")
-                return []
-            elif res.status_code != 200:
+                return None
+            elif status != 200:
                 print(f"Failed to fetch class data from {CLASS_LIST_URL}")
-                print(f"Response content: {res.text}")
-                return []
-                
-            try:
-                data = res.json()
-                print(f"Successfully fetched {len(data)} classes for term {term_code}")
-                return data
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON response for term {term_code}: {str(e)}")
-                print(f"Raw response: {res.text[:500]}...")  # Print first 500 chars of response
-                return []
-                
-        except requests.exceptions.RequestException as e:
+                print(f"Response content: {text}")
+                return None
+            return True
+
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse JSON response for term {term_code}: {str(e)}")
+            return None
+        except HowdyUnavailable as e:
+            print(f"Skipping term {term_code}: {str(e)}")
+            return None
+        except asyncio.TimeoutError:
+            print(f"Request timed out after {self.term_timeout}s for term {term_code}")
+            return None
+        except aiohttp.ClientError as e:
             print(f"Request failed for term {term_code}: {str(e)}")
-            return []
+            return None
         except Exception as e:
             print(f"Unexpected error for term {term_code}: {str(e)}")
             import traceback
             traceback.print_exc()
-            return []
+            return None
 
     def get_term_general_info(self, term_code):
-        class_list = set()
-        if term_code not in self.classes:
-            return []
-        for c in self.classes[term_code]:
-            class_list.add((c['SWV_CLASS_SEARCH_SUBJECT'], c['SWV_CLASS_SEARCH_COURSE']))
-        return sorted(class_list, key=lambda x: (x[0], x[1]))
+        return self.get_search_index(term_code).courses
+
+    def _build_indexes(self, catalogs):
+        """
+        Build the search and instructor indexes of catalogs about to be swapped in, so no query has to.
+
+        Args:
+            catalogs (dict): {term_code: SectionCatalog}; ones already indexed are skipped
+
+        Returns:
+            tuple: ({term_code: CourseSearchIndex}, {term_code: InstructorIndex}), for _install_indexes()
+        """
+        catalogs = {term_code: catalog for term_code, catalog in catalogs.items()
+                    if getattr(self._search_indexes.get(term_code), 'catalog', None) is not catalog
+                    or getattr(self._instructor_indexes.get(term_code), 'catalog', None) is not catalog}
+        return ({term_code: CourseSearchIndex(catalog) for term_code, catalog in catalogs.items()},
+                {term_code: InstructorIndex(catalog) for term_code, catalog in catalogs.items()})
+
+    def _install_indexes(self, indexes):
+        """Put indexes from _build_indexes() in place. Caller holds _state_lock."""
+        search_indexes, instructor_indexes = indexes
+        self._search_indexes = {**self._search_indexes, **search_indexes}
+        self._instructor_indexes = {**self._instructor_indexes, **instructor_indexes}
+
+    def get_search_index(self, term_code):
+        """The term's CourseSearchIndex, built when its catalog was loaded."""
+        catalog = self.get_catalog(term_code)
+        index = self._search_indexes.get(term_code)
+        if index is None or index.catalog is not catalog:
+            # Unknown or unloaded term, or a catalog swapped in since get_catalog(); not worth keeping
+            index = CourseSearchIndex(catalog)
+        return index
+
+    def get_instructor_index(self, term_code):
+        """The term's InstructorIndex, built when its catalog was loaded."""
+        catalog = self.get_catalog(term_code)
+        index = self._instructor_indexes.get(term_code)
+        if index is None or index.catalog is not catalog:
+            # Unknown or unloaded term, or a catalog swapped in since get_catalog(); not worth keeping
+            index = InstructorIndex(catalog)
+        return index
+
+    def autocomplete_courses(self, term_code, query, limit=DEFAULT_SUGGESTIONS):
+        """Ranked course suggestions for partial input; see CourseSearchIndex.autocomplete."""
+        return self.get_search_index(term_code).autocomplete(query, limit)
     
 
     def filter_by_instructor(self, term_code, instructor):
         CV = None
-        out = []
-        for c in self.classes[term_code]:
-            if c['SWV_CLASS_SEARCH_INSTRCTR_JSON'] is not None:
-                instructors = recursive_parse_json(c['SWV_CLASS_SEARCH_INSTRCTR_JSON'])
-                for i in instructors:
-                    if instructor == i['NAME']:
-                        out.append(c)
-                        if i['HAS_CV'] == 'Y':
-                            CV = f"https://compass-ssb.tamu.edu/pls/PROD/bwykfupd.p_showdoc?doctype_in=CV&pidm_in={i['MORE']}"
-                        break
+        catalog = self.get_catalog(term_code)
+        out = catalog.by_instructor(instructor)
+        for c in out:
+            for i in c.instructors:
+                if instructor == i.raw_name:
+                    if i.has_cv:
+                        CV = i.cv_url
+                    break
         # grades = self.get_grade_distribution(c['SWV_CLASS_SEARCH_SUBJECT'], c['SWV_CLASS_SEARCH_COURSE'], instructor)
         # print(grades)
         return out, CV
 
     def filter_by_course(self, term_code, course):
         major, number = course.split(' ')
-        out = []
         major = major.upper()  # Ensure major is uppercase
         
         print(f"Filtering for course {major} {number} in term {term_code}")
         print(f"Classes loaded for term: {term_code in self.classes}")
         
-        # Reload classes for this term if we don't have them
-        if term_code not in self.classes or not self.classes[term_code]:
-            print(f"Loading classes for term {term_code}")
-            self.classes[term_code] = self.get_classes(term_code)
+        # Loads the term on first access
+        catalog = self.get_catalog(term_code)
         
         # Check data format by looking at the first item
-        if self.classes[term_code] and len(self.classes[term_code]) > 0:
-            sample = self.classes[term_code][0]
+        if len(catalog) > 0:
+            sample = catalog[0]
             print(f"Sample class data keys: {sample.keys()}")
         
-        matches_found = 0
-        
-        for c in self.classes[term_code]:
-            subject = c.get('SWV_CLASS_SEARCH_SUBJECT', '').upper()
-            course_num = c.get('SWV_CLASS_SEARCH_COURSE', '')
-            
-            if subject == major and course_num == number:
-                out.append(c)
-                matches_found += 1
-        
-        print(f"Found {matches_found} matches for {major} {number}")
+        out = catalog.by_course(major, number)
+        print(f"Found {len(out)} matches for {major} {number}")
         
         # Sort by availability (open sections first)
         return sorted(out, key=lambda x: x['STUSEAT_OPEN'] == 'Y')
     
     def get_all_instructors(self, term_code):
-        out = set()
-        for c in self.classes[term_code]:
-            if c['SWV_CLASS_SEARCH_INSTRCTR_JSON'] is not None:
-                instructors = recursive_parse_json(c['SWV_CLASS_SEARCH_INSTRCTR_JSON'])
-                for i in instructors:
-                    out.add(i['NAME'])
-        return sorted(out)
+        return sorted(self.get_catalog(term_code).instructor_index.keys())
+
+    def find_section(self, term_code, crn):
+        """Returns the section for a CRN in a term, or None if the term cannot be loaded or has no such CRN."""
+        return self.get_catalog(term_code).find_crn(crn)
+
+    def filter_by_campus(self, term_code, campus):
+        return self.get_catalog(term_code).by_campus(campus)
+
+    def filter_by_building(self, term_code, building):
+        return self.get_catalog(term_code).by_building(building)
+
+    def check_conflicts(self, term_code, crns):
+        """
+        Find the overlapping meetings in a set of sections.
+
+        Returns:
+            tuple: (list of Conflict, list of CRNs not found in the term)
+        """
+        catalog = self.get_catalog(term_code)
+        sections, missing = [], []
+        for crn in dict.fromkeys(str(crn) for crn in crns):
+            section = catalog.find_crn(crn)
+            if section is None:
+                missing.append(crn)
+            else:
+                sections.append(section)
+        return find_conflicts(sections), missing
+
+    def find_fitting_sections(self, term_code, course, crns, open_only=True):
+        """
+        Sections of a course ("CSCE 221") that fit around the sections in crns.
+
+        Returns:
+            tuple: (list of fitting SectionRows, list of CRNs not found in the term)
+        """
+        catalog = self.get_catalog(term_code)
+        subject, number = course.split(' ')
+        schedule = [catalog.find_crn(str(crn)) for crn in crns]
+        missing = [str(crn) for crn, section in zip(crns, schedule) if section is None]
+        busy_mask = combined_mask(section for section in schedule if section is not None)
+        return fitting_sections(catalog.by_course(subject, number), busy_mask, open_only), missing
+
+    def build_schedules(self, term_code, courses, open_only=False, limit=DEFAULT_SCHEDULE_LIMIT, preferences=None):
+        """
+        Conflict-free combinations of one section of every course, generated lazily.
+
+        Args:
+            term_code (str): Term to build the schedules in
+            courses (list): Courses like "CSCE 221"
+            open_only (bool): Only use sections with open seats
+            limit (int): Most schedules to generate
+            preferences (dict): See schedule.section_scorer
+
+        Returns:
+            tuple: (generator of (sections, score) from schedule.generate_schedules, list of courses with no sections)
+        """
+        catalog = self.get_catalog(term_code)
+        candidates = [catalog.by_course(*course.split(' ')) for course in courses]
+        missing = [course for course, sections in zip(courses, candidates) if not sections]
+        return generate_schedules(candidates, open_only, limit, section_scorer(preferences)), missing
 
     async def get_section_details(self, term_code: str, crn: str) -> dict:
+        """
+        General info plus every section-detail payload for one CRN.
+
+        Each payload is cached separately in self.detail_cache (see detail_cache.py):
+        meeting times and the general info expire after SHORT_DETAIL_TTL, the
+        restrictions, prereqs, attributes and bookstore links after LONG_DETAIL_TTL.
+        Only the payloads missing from the cache are fetched, over the shared client.
+        All payloads are looked up in one batch, off the client loop.
+        """
         error = []
+        keys = [GENERAL_INFO_KEY, *SECTION_DETAIL_LINKS]
+        cache_keys = [f"{term_code}:{crn}:{key}" for key in keys]
+        entries = await asyncio.get_running_loop().run_in_executor(None, self.detail_cache.get_stale_many, cache_keys)
+        # Expired entries are only kept as a fallback for payloads Howdy fails to return
+        cached = {key: entries[cache_key] for key, cache_key in zip(keys, cache_keys) if cache_key in entries}
+        now = time.time()
+        parts = {key: entry[0] for key, entry in cached.items() if entry[1] > now}
 
-        links = {
-            "Section attributes"             : 'https://howdy.tamu.edu/api/section-attributes',
-            "Section prereqs"                : 'https://howdy.tamu.edu/api/section-prereqs',
-            "Bookstore links"                : 'https://howdy.tamu.edu/api/section-bookstore-links',
-            "Meeting times with profs"       : 'https://howdy.tamu.edu/api/section-meeting-times-with-profs',
-            "Section program restrictions"   : 'https://howdy.tamu.edu/api/section-program-restrictions',
-            "Section college restrictions"   : 'https://howdy.tamu.edu/api/section-college-restrictions',
-            "Level restrictions"             : 'https://howdy.tamu.edu/api/section-level-restrictions',
-            "Degree restrictions"            : 'https://howdy.tamu.edu/api/section-degree-restrictions',
-            "Major restrictions"             : 'https://howdy.tamu.edu/api/section-major-restrictions',
-            "Minor restrictions"             : 'https://howdy.tamu.edu/api/section-minor-restrictions',
-            "Concentrations restrictions"    : 'https://howdy.tamu.edu/api/section-concentrations-restrictions',
-            "Field of study restrictions"    : 'https://howdy.tamu.edu/api/section-field-of-study-restrictions',
-            "Department restrictions"        : 'https://howdy.tamu.edu/api/section-department-restrictions',
-            "Cohort restrictions"            : 'https://howdy.tamu.edu/api/section-cohort-restrictions',
-            "Student attribute restrictions" : 'https://howdy.tamu.edu/api/section-student-attribute-restrictions',
-            "Classification restrictions"    : 'https://howdy.tamu.edu/api/section-classifications-restrictions',
-            "Campus restrictions"            : 'https://howdy.tamu.edu/api/section-campus-restrictions',
-        }
+        if GENERAL_INFO_KEY not in parts:
+            await self._fetch_section_details(term_code, crn, [GENERAL_INFO_KEY], parts, error)
+            stale_general = self._fill_stale_details(cached, [GENERAL_INFO_KEY], parts)
+        else:
+            stale_general = []
+        # Howdy still returns 200 for some reason if the response is invalid kms
+        if not parts.get(GENERAL_INFO_KEY):
+            return {'ERRORS': error}
 
-        general_info_link = f"https://howdy.tamu.edu/api/course-section-details?term={term_code}&subject=&course=&crn={crn}"
-        # Fetch general info
-            
-        async def fetch_all():
-            out = {}
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(general_info_link) as response:
-                        # Howdy still returns 200 for some reason if the response is invalid kms
-                        general_info = await response.json()
-                        if not general_info:
-                            error.append(f"Failed to fetch general info from {general_info_link}")
-                            return {}
-                        else:
-                            general_info['COURSE_NAME'] = f"{general_info['DEPT']} {general_info['COURSE_NUMBER']}"
-                        out.update(general_info)
-                except Exception as e:
-                    error.append(f"Exception when fetching general info: {e}")
-                    out = {}
-                    
-            async with aiohttp.ClientSession() as session:
-
-                # Define async tasks for each link
-                async def fetch_data(key, link):
-                    try:
-                        async with session.post(
-                            link,
-                            json={
-                                "term": term_code,
-                                "subject": None,
-                                "course": None,
-                                "crn": crn,
-                            },
-                        ) as res:
-                            if res.status != 200:
-                                error.append(f"Failed to fetch {key} data from {link}")
-                                data = {}
-                            else:
-                                text = await res.text()
-                                data = recursive_parse_json(text)
-                            out["OTHER_ATTRIBUTES"][key] = data
-                    except Exception as exc:
-                        error.append(f"{key} generated an exception: {exc}")
-                        out["OTHER_ATTRIBUTES"][key] = {}
-
-                is_valid_section = len(out) > 0
-
-                if is_valid_section:
-                    out['OTHER_ATTRIBUTES'] = {}
-                    tasks = [fetch_data(key, link) for key, link in links.items()]
-                    await asyncio.gather(*tasks)
-                    out['SYLLABUS'] = f"https://compass-ssb.tamu.edu/pls/PROD/bwykfupd.p_showdoc?doctype_in=SY&crn_in={crn}&termcode_in={term_code}"
-                    if out["OTHER_ATTRIBUTES"]['Meeting times with profs'] and out['OTHER_ATTRIBUTES']['Meeting times with profs']['SWV_CLASS_SEARCH_INSTRCTR_JSON']:
-                        instructor_info = out["OTHER_ATTRIBUTES"]['Meeting times with profs']['SWV_CLASS_SEARCH_INSTRCTR_JSON'][0]
-                        out['INSTRUCTOR'] = instructor_info['NAME'].rstrip(' (P)')
-                        instructor_info['CV'] = f"https://compass-ssb.tamu.edu/pls/PROD/bwykfupd.p_showdoc?doctype_in=CV&pidm_in={instructor_info['MORE']}"
-                    else:
-                        out['INSTRUCTOR'] = 'Not assigned'
-                    
-            return out
+        missing = [key for key in SECTION_DETAIL_LINKS if key not in parts]
+        if missing:
+            await self._fetch_section_details(term_code, crn, missing, parts, error)
+        stale = self._fill_stale_details(cached, missing, parts)
 
-        # Run the async fetch_all function in the event loop
-        out = await fetch_all()
+        # Cached payloads are shared, so copy anything that gets modified below
+        general_info = parts[GENERAL_INFO_KEY]
+        out = dict(general_info)
+        out['COURSE_NAME'] = f"{general_info['DEPT']} {general_info['COURSE_NUMBER']}"
+        other_attributes = {key: parts.get(key, {}) for key in SECTION_DETAIL_LINKS}
 
-        # Update the output with the fetched data
-        for key, value in out.items():
-            out[key] = value
+        out['SYLLABUS'] = f"https://compass-ssb.tamu.edu/pls/PROD/bwykfupd.p_showdoc?doctype_in=SY&crn_in={crn}&termcode_in={term_code}"
+        meeting_times = other_attributes['Meeting times with profs']
+        if meeting_times and meeting_times['SWV_CLASS_SEARCH_INSTRCTR_JSON']:
+            instructors = list(meeting_times['SWV_CLASS_SEARCH_INSTRCTR_JSON'])
+            instructor_info = dict(instructors[0])
+            out['INSTRUCTOR'] = instructor_info['NAME'].rstrip(' (P)')
+            instructor_info['CV'] = f"https://compass-ssb.tamu.edu/pls/PROD/bwykfupd.p_showdoc?doctype_in=CV&pidm_in={instructor_info['MORE']}"
+            instructors[0] = instructor_info
+            other_attributes['Meeting times with profs'] = dict(meeting_times, SWV_CLASS_SEARCH_INSTRCTR_JSON=instructors)
+        else:
+            out['INSTRUCTOR'] = 'Not assigned'
+
+        out.update(other_attributes)
 
-        # Handle OTHER_ATTRIBUTES if present
-        if 'OTHER_ATTRIBUTES' in out:
-            out.update(out['OTHER_ATTRIBUTES'])
-            del out['OTHER_ATTRIBUTES']
-            
         # Handle Meeting times with profs if present
         if 'Meeting times with profs' in out:
-            out.update(out['Meeting times with profs'])
-            del out['Meeting times with profs']
+            out.update(out.pop('Meeting times with profs'))
 
         # Parse SWV_CLASS_SEARCH_JSON_CLOB into a readable message
         if "SWV_CLASS_SEARCH_JSON_CLOB" in out and isinstance(out["SWV_CLASS_SEARCH_JSON_CLOB"], list):
@@ -251,22 +834,207 @@ class Howdy_API:
             out["MEETING_MESSAGE"] = "\n".join(meeting_parts)
 
         out['ERRORS'] = error
+        if stale or stale_general:
+            out['STALE'] = True
             
         return out
-    
-    def get_availability(self):
-        self.classes = {term['STVTERM_CODE']: self.get_classes(term['STVTERM_CODE']) for term in self.terms}
-        out = {}
-
-        for term in self.terms:
-            t = {}
-            for c in self.classes[term['STVTERM_CODE']]:
-                t[c['SWV_CLASS_SEARCH_CRN']] = c['STUSEAT_OPEN'] == 'Y'
-            
-            out[term['STVTERM_CODE']] = t
 
-        return out
+    def iter_section_details(self, pairs):
+        """
+        get_section_details for many sections at once, for Flask views: every section runs
+        on the client loop and results are yielded in completion order.
+
+        Duplicate pairs are fetched once, and upstream requests for the same payload are
+        shared between sections and concurrent callers. Every request goes through the
+        client's semaphore-bounded pool.
+
+        Args:
+            pairs (iterable): (term_code, crn) tuples
+
+        Yields:
+            tuple: (term_code, crn, details) in completion order
+        """
+        futures = {asyncio.run_coroutine_threadsafe(self.get_section_details(term_code, crn), self.client.loop): (term_code, crn)
+                   for term_code, crn in self._unique_pairs(pairs)}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                term_code, crn = futures[future]
+                yield term_code, crn, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    def _unique_pairs(pairs):
+        return list(dict.fromkeys((str(term_code), str(crn)) for term_code, crn in pairs))
+
+    @staticmethod
+    def _fill_stale_details(cached, keys, parts):
+        """Fall back to expired cache entries for payloads Howdy did not return. Returns the keys served stale."""
+        stale = []
+        for key in keys:
+            if key not in parts and key in cached:
+                parts[key] = cached[key][0]
+                stale.append(key)
+        return stale
+
+    async def _fetch_section_details(self, term_code, crn, keys, parts, error):
+        """Fetch the given detail payloads over the shared client, cache the ones that succeed and add them to parts."""
+        async def fetch_all():
+            return await asyncio.gather(*[self._shared_section_detail(term_code, crn, key) for key in keys])
+
+        results = await self.client.run_async(fetch_all())
+        now = time.time()
+        for key, (value, message) in zip(keys, results):
+            if value is MISS:
+                error.append(message)
+                continue
+            ttl = SHORT_DETAIL_TTL if key in SHORT_TTL_DETAILS else LONG_DETAIL_TTL
+            self.detail_cache.set(f"{term_code}:{crn}:{key}", value, now + ttl)
+            parts[key] = value
+
+    async def _shared_section_detail(self, term_code, crn, key):
+        """_fetch_section_detail, sharing one in-flight request between everyone asking for the same payload."""
+        cache_key = f"{term_code}:{crn}:{key}"
+        task = self._detail_requests.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_section_detail(term_code, crn, key))
+            self._detail_requests[cache_key] = task
+            task.add_done_callback(lambda _: self._detail_requests.pop(cache_key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_section_detail(self, term_code, crn, key):
+        """Fetch one detail payload on the client loop. Returns (payload, None), or (MISS, error message)."""
+        if key == GENERAL_INFO_KEY:
+            try:
+                status, text = await self.client.request(
+                    'GET', SECTION_DETAILS_URL, params={'term': term_code, 'subject': '', 'course': '', 'crn': crn})
+                general_info = json.loads(text) if status == 200 else None
+            except Exception as e:
+                return MISS, f"Exception when fetching general info: {e}"
+            if not general_info:
+                return MISS, f"Failed to fetch general info from {SECTION_DETAILS_URL}?term={term_code}&crn={crn}"
+            return general_info, None
+
+        link = SECTION_DETAIL_LINKS[key]
+        try:
+            status, text = await self.client.request(
+                'POST', link, json={"term": term_code, "subject": None, "course": None, "crn": crn})
+        except Exception as exc:
+            return MISS, f"{key} generated an exception: {exc}"
+        if status != 200:
+            return MISS, f"Failed to fetch {key} data from {link}"
+        return recursive_parse_json(text), None
     
+    def refresh_watched(self, watched):
+        """
+        Learn the current state of watched CRNs, refreshing each term the cheaper way.
+
+        The fetch planner decides per term between the full course-sections dump (see
+        refresh_classes) and one course-section-details call per watched CRN. Targeted
+        refreshes only update self.availability; the term's catalog stays at its last dump
+        until the planner next picks one.
+
+        Args:
+            watched (dict): {term_code: iterable of watched CRNs}
+
+        Returns:
+            dict: {term_code: list of SectionChange}, like refresh_classes
+        """
+        if self.follower:
+            return self.refresh_classes(watched)
+        now = time.time()
+        for term_code in watched:
+            self.last_access[term_code] = now
+        plans = [self.fetch_planner.plan(term_code, crns, term_code in self.classes and term_code in self.availability)
+                 for term_code, crns in watched.items()]
+        for plan in plans:
+            print(f"Refreshing term {plan.term_code} by {plan.strategy} ({len(plan.crns)} watched CRNs, {plan.reason})")
+        dump_terms = [plan.term_code for plan in plans if plan.strategy == DUMP]
+        changes = self.refresh_classes(dump_terms) if dump_terms else {}
+        targeted = [plan for plan in plans if plan.strategy == TARGETED]
+        if targeted:
+            changes.update(self._refresh_targeted(targeted))
+        self.last_changes = changes
+        return changes
+
+    def _refresh_targeted(self, plans):
+        """Fetch the seat state of each planned CRN and apply what moved to self.availability."""
+        pairs = [(plan.term_code, crn) for plan in plans for crn in plan.crns]
+
+        async def fetch_all():
+            return await asyncio.gather(*[self._fetch_seat_state(term_code, crn) for term_code, crn in pairs])
+
+        states = dict(zip(pairs, self.client.run(fetch_all())))
+        fetched_at = time.time()
+        changes = {}
+        availability = {}
+        for plan in plans:
+            term_availability = self.availability.get(plan.term_code)
+            if term_availability is None:
+                # Evicted while the details were in flight
+                continue
+            # Unknown states (failed or unreadable) keep the last known one
+            observed = {crn: states[(plan.term_code, crn)] for crn in plan.crns
+                        if states[(plan.term_code, crn)] is not None}
+            term_changes = availability_changes({crn: term_availability.get(crn) for crn in observed},
+                                                {crn: is_open for crn, (is_open, _) in observed.items()})
+            changes[plan.term_code] = term_changes
+            if term_changes:
+                availability[plan.term_code] = apply_changes(dict(term_availability), term_changes)
+                self._targeted_terms.add(plan.term_code)
+            if self.seat_history is not None and observed:
+                self._snapshot_writer.submit(self.seat_history.record_observed, plan.term_code,
+                                             list(observed.items()), fetched_at)
+        with self._state_lock:
+            self.availability = {**self.availability, **availability}
+        return changes
+
+    async def _fetch_seat_state(self, term_code, crn):
+        """
+        Seat state of one section from a fresh course-section-details call, measured for the fetch planner.
+
+        Returns:
+            tuple: (is_open, {seat field: value}), or None if the call failed or the payload has no seat fields
+        """
+        started = time.monotonic()
+        try:
+            status, text = await self.client.request(
+                'GET', SECTION_DETAILS_URL, params={'term': term_code, 'subject': '', 'course': '', 'crn': crn})
+            general_info = json.loads(text) if status == 200 and text else None
+        except Exception as e:
+            print(f"Failed to fetch seat state of CRN {crn} (Term {term_code}): {e}")
+            return None
+        self.fetch_planner.observe_detail(len(text), time.monotonic() - started)
+        if not isinstance(general_info, dict) or not general_info:
+            return None
+        # Fresh anyway, so the details routes get it for free
+        self.detail_cache.set(f"{term_code}:{crn}:{GENERAL_INFO_KEY}", general_info, time.time() + SHORT_DETAIL_TTL)
+        is_open = seat_state(general_info)
+        if is_open is None:
+            if self.fetch_planner.targeted_supported:
+                print("course-section-details carries no seat state; the fetch planner will only use dumps")
+                self.fetch_planner.targeted_supported = False
+            return None
+        return is_open, {key: value for key, value in general_info.items() if key != 'STUSEAT_OPEN' and is_seat_field(key)}
+
+    def get_availability(self, term_codes=None):
+        """Refresh the given terms (default: every loaded term) and return the {term: {crn: open}} map."""
+        self.refresh_classes(term_codes)
+        return self.availability
+
+    def get_fetch_stats(self):
+        """
+        How often refreshes were short-circuited by the payload and per-section hashes.
+
+        Returns:
+            dict: The raw counters plus payload_skip_rate and section_skip_rate (0-1)
+        """
+        stats = dict(self.fetch_stats)
+        stats['payload_skip_rate'] = stats['unchanged_payloads'] / stats['payloads'] if stats['payloads'] else 0.0
+        stats['section_skip_rate'] = stats['unchanged_sections'] / stats['sections'] if stats['sections'] else 0.0
+        return stats
+
     def get_grade_distribution(self, dept, number, prof=None):
         url = "https://anex.us/grades/getData/"
         data = {
@@ -0,0 +1,131 @@
+"""
+Micro-benchmark for CustomHelpers.recursive_parse_json.
+
+Compares the current decoder against the previous exception-driven version on real
+Howdy payloads and checks that both return the same result. Payloads come from the
+on-disk catalog snapshots (see snapshots.py) and, when a term and CRN are given,
+from the 17 section-detail endpoints used by Howdy_API.get_section_details.
+
+Usage:
+    python bench_parse_json.py [TERM_CODE CRN] [--repeat N]
+"""
+import argparse
+import json
+import math
+import os
+import time
+import requests
+import CustomHelpers
+from CustomHelpers import recursive_parse_json
+from snapshots import SnapshotStore, SNAPSHOT_DIR
+
+DETAIL_ENDPOINTS = [
+    'section-attributes', 'section-prereqs', 'section-bookstore-links',
+    'section-meeting-times-with-profs', 'section-program-restrictions',
+    'section-college-restrictions', 'section-level-restrictions',
+    'section-degree-restrictions', 'section-major-restrictions',
+    'section-minor-restrictions', 'section-concentrations-restrictions',
+    'section-field-of-study-restrictions', 'section-department-restrictions',
+    'section-cohort-restrictions', 'section-student-attribute-restrictions',
+    'section-classifications-restrictions', 'section-campus-restrictions',
+]
+
+
+def legacy_recursive_parse_json(json_str):
+    """The decoder as it was before the fast path, kept as the baseline."""
+    try:
+        parsed = json.loads(json_str)
+        if isinstance(parsed, dict):
+            return {k: legacy_recursive_parse_json(v) for k, v in parsed.items()}
+        elif isinstance(parsed, list):
+            return [legacy_recursive_parse_json(element) for element in parsed]
+        else:
+            return parsed
+    except (json.JSONDecodeError, TypeError):
+        return json_str
+
+
+def snapshot_payloads(directory):
+    """
+    Re-encode every stored term as the response text Howdy would have sent: once as
+    the whole course-sections list, and once as one document per section, which is
+    the shape of the section-detail responses (string leaves, nested JSON strings).
+    """
+    store = SnapshotStore(directory)
+    payloads = []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('term-') and name.endswith('.json.gz'):
+            term_code = name[len('term-'):-len('.json.gz')]
+            snapshot = store.load(term_code)
+            if snapshot:
+                sections = snapshot[0]
+                payloads.append((f"course-sections {term_code}", [json.dumps(sections)]))
+                payloads.append((f"per-section {term_code} (x{len(sections)})",
+                                 [json.dumps(section) for section in sections]))
+    return payloads
+
+
+def detail_payloads(term_code, crn):
+    payloads = []
+    body = {'term': term_code, 'subject': None, 'course': None, 'crn': crn}
+    with requests.Session() as session:
+        for endpoint in DETAIL_ENDPOINTS:
+            res = session.post(f"https://howdy.tamu.edu/api/{endpoint}", json=body, timeout=30)
+            if res.status_code == 200:
+                payloads.append((endpoint, [res.text]))
+    return payloads
+
+
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def timed(fn, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('term_code', nargs='?')
+    parser.add_argument('crn', nargs='?')
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = snapshot_payloads(args.snapshots) if os.path.isdir(args.snapshots) else []
+    if args.term_code and args.crn:
+        payloads += detail_payloads(args.term_code, args.crn)
+    if not payloads:
+        parser.error(f"no snapshots in {args.snapshots}; pass TERM_CODE CRN to fetch section details")
+
+    print(f"backend: {'orjson' if CustomHelpers.orjson else 'json'}")
+    print(f"{'payload':<44}{'KiB':>9}{'legacy ms':>12}{'new ms':>10}{'speedup':>9}")
+    total_old = total_new = 0.0
+    for name, texts in payloads:
+        for text in texts:
+            if not same(legacy_recursive_parse_json(text), recursive_parse_json(text)):
+                raise SystemExit(f"decoders disagree on {name}")
+        old = timed(legacy_recursive_parse_json, texts, args.repeat)
+        new = timed(recursive_parse_json, texts, args.repeat)
+        total_old += old
+        total_new += new
+        print(f"{name:<44}{sum(map(len, texts)) / 1024:>9.1f}{old * 1000:>12.2f}{new * 1000:>10.2f}{old / new:>8.1f}x")
+    print(f"{'total':<53}{total_old * 1000:>12.2f}{total_new * 1000:>10.2f}{total_old / total_new:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+from collections import namedtuple
+
+# Section fields whose names contain any of these markers are treated as seat/enrollment data
+SEAT_FIELD_MARKERS = ('SEAT', 'ENRL', 'WAIT', 'CAPACITY')
+
+# direction is 'opened', 'closed', 'added', 'removed', or None when only seat counts moved.
+# fields maps each changed seat field to an (old, new) tuple.
+SectionChange = namedtuple('SectionChange', ['crn', 'direction', 'is_open', 'fields'])
+
+
+def is_seat_field(key):
+    return key == 'STUSEAT_OPEN' or any(marker in key for marker in SEAT_FIELD_MARKERS)
+
+
+def is_open(section):
+    return section.get('STUSEAT_OPEN') == 'Y'
+
+
+def availability_map(sections):
+    """Build the {crn: is_open} map for one term's sections."""
+    return {section['SWV_CLASS_SEARCH_CRN']: is_open(section) for section in sections}
+
+
+def _seat_fields(section):
+    return {key: value for key, value in section.items() if is_seat_field(key)}
+
+
+def diff_sections(old_sections, new_sections):
+    """
+    Compare two payloads of the same term and report the sections whose seat state changed.
+
+    Args:
+        old_sections (list): Previous snapshot of the term's sections
+        new_sections (list): Freshly fetched sections
+
+    Returns:
+        list: SectionChange for every CRN whose STUSEAT_OPEN or seat counts differ,
+              plus CRNs that appeared or disappeared
+    """
+    old_by_crn = {section['SWV_CLASS_SEARCH_CRN']: section for section in old_sections}
+    changes = []
+
+    for section in new_sections:
+        crn = section['SWV_CLASS_SEARCH_CRN']
+        old = old_by_crn.pop(crn, None)
+        now_open = is_open(section)
+
+        if old is None:
+            fields = {key: (None, value) for key, value in _seat_fields(section).items()}
+            changes.append(SectionChange(crn, 'added', now_open, fields))
+            continue
+
+        fields = {}
+        for key, value in section.items():
+            if is_seat_field(key) and old.get(key) != value:
+                fields[key] = (old.get(key), value)
+        if not fields:
+            continue
+
+        was_open = is_open(old)
+        if now_open and not was_open:
+            direction = 'opened'
+        elif was_open and not now_open:
+            direction = 'closed'
+        else:
+            direction = None
+        changes.append(SectionChange(crn, direction, now_open, fields))
+
+    for crn, old in old_by_crn.items():
+        fields = {key: (value, None) for key, value in _seat_fields(old).items()}
+        changes.append(SectionChange(crn, 'removed', False, fields))
+
+    return changes
+
+
+def changed_crns(old_catalog, new_catalog):
+    """
+    CRNs whose source text differs between two SectionCatalogs, judged by their row hashes.
+
+    Returns:
+        set: CRNs that were added, removed or re-serialized differently,
+             or None if either catalog was built without row hashes
+    """
+    if old_catalog.row_hashes is None or new_catalog.row_hashes is None:
+        return None
+    old_hashes = {old_catalog.crn(i): row_hash for i, row_hash in enumerate(old_catalog.row_hashes)}
+    changed = set()
+    for i, row_hash in enumerate(new_catalog.row_hashes):
+        crn = new_catalog.crn(i)
+        if old_hashes.pop(crn, None) != row_hash:
+            changed.add(crn)
+    changed.update(old_hashes)
+    return changed
+
+
+def diff_catalogs(old_catalog, new_catalog, crns=None):
+    """
+    diff_sections for two SectionCatalogs that only field-compares the given CRNs.
+
+    Args:
+        old_catalog (SectionCatalog): Previous catalog of the term
+        new_catalog (SectionCatalog): Freshly built catalog
+        crns (set): CRNs that may have changed, usually from changed_crns(); None compares every section
+
+    Returns:
+        list: SectionChange, as from diff_sections
+    """
+    if crns is None:
+        return diff_sections(old_catalog, new_catalog)
+    old_sections = [row for row in map(old_catalog.find_crn, crns) if row is not None]
+    new_sections = [row for row in map(new_catalog.find_crn, crns) if row is not None]
+    return diff_sections(old_sections, new_sections)
+
+
+def availability_changes(old_availability, new_availability):
+    """
+    SectionChange for every CRN whose open state differs between two {crn: is_open} maps.
+
+    Only STUSEAT_OPEN is reported in fields, since the maps carry no seat counts.
+    """
+    changes = []
+    for crn, is_open in new_availability.items():
+        was_open = old_availability.get(crn)
+        if was_open == is_open:
+            continue
+        direction = 'added' if was_open is None else 'opened' if is_open else 'closed'
+        old_flag = None if was_open is None else 'Y' if was_open else 'N'
+        changes.append(SectionChange(crn, direction, is_open, {'STUSEAT_OPEN': (old_flag, 'Y' if is_open else 'N')}))
+    for crn, was_open in old_availability.items():
+        if crn not in new_availability:
+            changes.append(SectionChange(crn, 'removed', False, {'STUSEAT_OPEN': ('Y' if was_open else 'N', None)}))
+    return changes
+
+
+def apply_changes(availability, changes):
+    """Update a {crn: is_open} map in place from a list of SectionChange."""
+    for change in changes:
+        if change.direction == 'removed':
+            availability.pop(change.crn, None)
+        else:
+            availability[change.crn] = change.is_open
+    return availability
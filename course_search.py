@@ -0,0 +1,120 @@
+import re
+from bisect import bisect_left
+from collections import namedtuple
+
+TITLE_KEY = 'SWV_CLASS_SEARCH_TITLE'
+# Results autocomplete() returns unless told otherwise
+DEFAULT_SUGGESTIONS = 10
+# Share of a query's trigrams a course must contain to count as a fuzzy match
+MIN_TRIGRAM_SIMILARITY = 0.4
+
+# Ranks, best first: exact course code, code prefix, title word prefixes, fuzzy trigram match
+EXACT_MATCH, CODE_PREFIX, TITLE_PREFIX, FUZZY_MATCH = 4, 3, 2, 1
+
+CourseEntry = namedtuple('CourseEntry', ['subject', 'course', 'title'])
+WORD = re.compile(r'[A-Z0-9]+')
+
+
+def _normalize(text):
+    return ' '.join(WORD.findall(text.upper()))
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CourseSearchIndex:
+    """
+    Autocomplete index over one term's courses, built once per catalog.
+
+    Course codes are kept in sorted lists ("CSCE 312" and "CSCE312") and title words
+    in a sorted (word, entry) list, so prefix lookups are a bisect plus a short scan.
+    A trigram index over "SUBJECT NUMBER TITLE" catches typos and partial words.
+
+    Args:
+        catalog (SectionCatalog): Term to index; kept so callers can tell when it is stale
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        titles = {}
+        for (subject, course), indexes in catalog.course_index.items():
+            title = None
+            for index in indexes:
+                title = catalog._raw(index, TITLE_KEY)
+                if title or TITLE_KEY not in catalog.keys:
+                    break
+            titles[(subject, course)] = title or ''
+
+        self.courses = sorted(titles)
+        self.entries = [CourseEntry(subject, course, titles[(subject, course)]) for subject, course in self.courses]
+        self._codes = sorted((f"{entry.subject} {entry.course}", i) for i, entry in enumerate(self.entries))
+        self._compact_codes = sorted((f"{entry.subject}{entry.course}", i) for i, entry in enumerate(self.entries))
+        words = set()
+        self._trigrams = {}
+        for i, entry in enumerate(self.entries):
+            text = _normalize(f"{entry.subject} {entry.course} {entry.title}")
+            for word in text.split(' ')[2:]:
+                words.add((word, i))
+            for trigram in _trigrams(text):
+                self._trigrams.setdefault(trigram, []).append(i)
+        self._words = sorted(words)
+
+    @staticmethod
+    def _prefixed(pairs, prefix):
+        """Entry ids of (key, id) pairs whose key starts with prefix."""
+        start = bisect_left(pairs, (prefix,))
+        out = []
+        for key, i in pairs[start:]:
+            if not key.startswith(prefix):
+                break
+            out.append(i)
+        return out
+
+    def autocomplete(self, query, limit=DEFAULT_SUGGESTIONS):
+        """
+        Ranked course suggestions for partial input like "csce 3", "csce31" or "data struc".
+
+        Returns:
+            list: (rank, CourseEntry), best first; rank is EXACT_MATCH, CODE_PREFIX, TITLE_PREFIX or FUZZY_MATCH
+        """
+        text = _normalize(query)
+        if not text:
+            return []
+        ranks = {}
+
+        def add(ids, rank):
+            for i in ids:
+                if ranks.get(i, 0) < rank:
+                    ranks[i] = rank
+
+        add(self._prefixed(self._codes, text), CODE_PREFIX)
+        add(self._prefixed(self._compact_codes, text.replace(' ', '')), CODE_PREFIX)
+        for i in self._prefixed(self._codes, text):
+            if f"{self.entries[i].subject} {self.entries[i].course}" == text:
+                ranks[i] = EXACT_MATCH
+
+        tokens = text.split(' ')
+        matching = None
+        for token in tokens:
+            ids = set(self._prefixed(self._words, token))
+            matching = ids if matching is None else matching & ids
+            if not matching:
+                break
+        add(matching or (), TITLE_PREFIX)
+
+        counts = {}
+        if len(ranks) < limit:
+            query_trigrams = _trigrams(text)
+            for trigram in query_trigrams:
+                for i in self._trigrams.get(trigram, ()):
+                    counts[i] = counts.get(i, 0) + 1
+            needed = MIN_TRIGRAM_SIMILARITY * len(query_trigrams)
+            fuzzy = sorted((i for i, count in counts.items() if count >= needed and i not in ranks),
+                           key=lambda i: -counts[i])
+            add(fuzzy[:limit - len(ranks)], FUZZY_MATCH)
+
+        # Fuzzy matches with more trigrams in common come first
+        best = sorted(ranks, key=lambda i: (-ranks[i], -counts.get(i, 0), self.courses[i]))[:limit]
+        return [(ranks[i], self.entries[i]) for i in best]
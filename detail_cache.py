@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Seconds a cached section-detail payload stays valid
+SHORT_DETAIL_TTL = 60            # meeting times, seats
+LONG_DETAIL_TTL = 12 * 60 * 60   # restrictions, prereqs, attributes, bookstore links
+# Entries kept by the in-memory tier before the least recently used are dropped
+DETAIL_CACHE_SIZE = 20000
+
+# Returned by get() when a key is missing or expired, since None is a valid payload
+MISS = object()
+
+
+class SectionDetailCache:
+    """
+    In-memory LRU cache with a per-entry TTL for section-detail payloads.
+
+    Values are stored as they are and handed back without copying, so callers must
+    treat them as read-only.
+
+    Args:
+        maxsize (int): Maximum number of entries before the least recently used are evicted
+    """
+
+    def __init__(self, maxsize=DETAIL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (value, expires_at), or MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                # Expired entries are kept for get_stale until the LRU pushes them out
+                return MISS
+            self._entries.move_to_end(key)
+            return entry
+
+    def get_stale(self, key):
+        """Like get(), but also returns an expired entry. Used while Howdy is unavailable."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return MISS if entry is None else entry
+
+    def get_stale_many(self, keys):
+        """get_stale() for many keys. Returns {key: (value, expires_at)} of the ones present."""
+        now = time.time()
+        entries = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[1] > now:
+                        self._entries.move_to_end(key)
+                    entries[key] = entry
+        return entries
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class MongoDetailCache:
+    """
+    Section-detail cache kept in a MongoDB collection, shared by every process.
+
+    Expired documents are removed by a TTL index on expires_at, so get_stale only
+    finds them until the next TTL sweep.
+
+    Args:
+        collection: pymongo collection to store the entries in
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index('expires_at', expireAfterSeconds=0)
+        except Exception as e:
+            print(f"Could not create TTL index on section-detail cache: {e}")
+
+    def get(self, key):
+        entry = self.get_stale(key)
+        if entry is MISS or entry[1] <= time.time():
+            return MISS
+        return entry
+
+    def get_stale(self, key):
+        return self.get_stale_many([key]).get(key, MISS)
+
+    def get_stale_many(self, keys):
+        """All of the keys in one query. Returns {key: (value, expires_at)} of the ones present."""
+        try:
+            docs = list(self.collection.find({'_id': {'$in': list(keys)}}))
+        except Exception as e:
+            print(f"Section-detail cache lookup failed: {e}")
+            return {}
+        # pymongo hands back naive datetimes in UTC
+        return {doc['_id']: (doc['value'], doc['expires_at'].replace(tzinfo=timezone.utc).timestamp()) for doc in docs}
+
+    def set(self, key, value, expires_at):
+        try:
+            self.collection.replace_one(
+                {'_id': key},
+                {'_id': key, 'value': value, 'expires_at': datetime.fromtimestamp(expires_at, timezone.utc)},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"Section-detail cache write failed: {e}")
+
+
+class TieredDetailCache:
+    """
+    Chain of caches checked fastest first. A hit in a slower tier is copied into the
+    faster ones with its remaining TTL; writes go to every tier.
+
+    Args:
+        tiers (list): Caches with get(key) / get_stale(key) / get_stale_many(keys) / set(key, value, expires_at),
+                      fastest first
+    """
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+
+    def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is not MISS:
+                for faster in self.tiers[:i]:
+                    faster.set(key, *entry)
+                return entry
+        return MISS
+
+    def get_stale(self, key):
+        for tier in self.tiers:
+            entry = tier.get_stale(key)
+            if entry is not MISS:
+                return entry
+        return MISS
+
+    def get_stale_many(self, keys):
+        """
+        get_stale() for many keys, with one lookup per tier for the keys the faster tiers
+        had no valid entry for. Valid hits are copied into the faster tiers like get() does.
+        """
+        now = time.time()
+        entries = {}
+        for i, tier in enumerate(self.tiers):
+            missing = [key for key in keys if key not in entries or entries[key][1] <= now]
+            if not missing:
+                break
+            for key, entry in tier.get_stale_many(missing).items():
+                if key in entries and entries[key][1] >= entry[1]:
+                    continue
+                entries[key] = entry
+                if entry[1] > now:
+                    for faster in self.tiers[:i]:
+                        faster.set(key, *entry)
+        return entries
+
+    def set(self, key, value, expires_at):
+        for tier in self.tiers:
+            tier.set(key, value, expires_at)
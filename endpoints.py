@@ -1,24 +1,33 @@
 import api 
 from dotenv import load_dotenv
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateMany
 import time
 import asyncio
 import json
 import argparse
 import signal
 import sys
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS, cross_origin
 import threading
 from flask_mail import Mail, Message
 from email.message import EmailMessage
 from functools import wraps
 import re
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import anex  # Import the anex module
+from instructor_identity import name_key
+from detail_cache import SectionDetailCache, MongoDetailCache, TieredDetailCache
+from shared_catalog import SharedCatalogStore
+from seat_history import MongoSeatHistory
+from alert_registry import AlertRegistry
+from poll_scheduler import PollScheduler
+from mailer import get_mailer
+from outbox import NotificationOutbox, notification_key
+from schedule import conflict_to_dict, DEFAULT_SCHEDULE_LIMIT
+from course_search import DEFAULT_SUGGESTIONS
 import random
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
@@ -46,12 +55,26 @@ print(f"Email credentials loaded - Sender: {sender_email}, Password: {'******' i
 
 mongo_uri = os.getenv('MONGO_URI')
 
-api = api.Howdy_API()
 client = MongoClient(mongo_uri)
 db = client['AggieClassAlert']
 collection = db['CRNS']
 email_collection = db['Emails']  # New collection for emails
 users_collection = db['Users']   # Collection for user accounts
+# Active alerts kept in memory for the monitor, following changes to the collection
+alert_registry = AlertRegistry(collection)
+# Per-term polling intervals for the monitor, within a capped fetch budget
+poll_scheduler = PollScheduler()
+# Every email and SMS goes out through one pool of persistent SMTP connections
+mailer = get_mailer()
+# With HOWDY_SHARED_CATALOG_DIR set, the process started with HOWDY_CATALOG_REFRESHER=1 fetches
+# and publishes the catalog and every other worker maps it from there (see shared_catalog.py)
+shared_catalog_dir = os.getenv('HOWDY_SHARED_CATALOG_DIR')
+shared_catalog = SharedCatalogStore(shared_catalog_dir) if shared_catalog_dir else None
+# Section details are cached in memory first, then in Mongo so restarts and other workers share them
+# Seat changes seen by each refresh go to a Mongo time-series collection every worker can query
+api = api.Howdy_API(detail_cache=TieredDetailCache([SectionDetailCache(), MongoDetailCache(db['SectionDetails'])]),
+                    shared_catalog=shared_catalog, follower=os.getenv('HOWDY_CATALOG_REFRESHER') != '1',
+                    seat_history=MongoSeatHistory(db))
 
 def require_api_key(view_function):
     @wraps(view_function)
@@ -193,12 +216,9 @@ def add_alert():
     
     try:
         # Check if the CRN exists for this term
-        if api and hasattr(api, 'classes') and term_code in api.classes:
-            found = False
-            for c in api.classes[term_code]:
-                if c.get('SWV_CLASS_SEARCH_CRN') == crn:
-                    found = True
-                    break
+        if api:
+            # Loads the term if this is the first time anyone asked for it
+            found = api.find_section(term_code, crn) is not None
             
             if not found:
                 print(f"⚠️ WARNING: CRN {crn} was not found in term {term_code}.")
@@ -325,6 +345,7 @@ def add_alert():
                     update_fields['notified_via_sms'] = notified_via_sms
                 if 'last_checked' in data:
                     update_fields['last_checked'] = last_checked
+                update_fields['updated_at'] = time.time()
                     
                 collection.update_one(
                     {'_id': existing_user_alert['_id']},
@@ -355,7 +376,8 @@ def add_alert():
             'notified': notified,
             'notified_at': notified_at,
             'notified_via_sms': notified_via_sms,
-            'last_checked': last_checked
+            'last_checked': last_checked,
+            'updated_at': time.time()
         }
         
         print(f"Creating new alert with provided data: {alert}")
@@ -444,245 +466,255 @@ def run_flask():
     """Run the Flask API server"""
     app.run(host='localhost', port=3000, debug=False)
 
+def notification_job(alert):
+    """Outbox job for an open alert, keyed by the alert and the opening it saw."""
+    return {'key': notification_key(alert), 'alert_id': alert['_id'], 'email': alert['email'],
+            'crn': alert['CRN'], 'term': alert['Term']}
+
+def compose_notification(email, jobs):
+    """
+    Build the availability email for a recipient's notification jobs, plus an SMS copy
+    to their carrier gateway when they have a verified phone.
+
+    Returns:
+        tuple: (list of EmailMessage, email first; whether an SMS is included)
+    """
+    available_crns = [{'crn': job['crn'], 'term': job['term']} for job in jobs]
+    print(f"\nSending notification to {email} about {len(available_crns)} available CRNs")
+    
+    # Create email content
+    subject = "Class Availability Alert"
+    body = f"Hello,\n\nOne or more of your course alerts are now available:\n\n"
+    
+    for alert in available_crns:
+        crn = alert['crn']
+        term = alert['term']
+        term_name = api.term_codes_to_desc.get(term, f"Term {term}")
+        body += f"CRN: {crn} (Term: {term_name}) is now AVAILABLE!\n"
+    
+    body += "\nPlease log in to register as soon as possible as spaces may fill quickly.\n\n"
+    body += "Thank you for using Aggie Class Alert!"
+    
+    # Look up user data to get phone details if available
+    user_data = None
+    try:
+        user_data = users_collection.find_one({'email': email})
+        if user_data:
+            print(f"Found user data for {email}: phone_number={user_data.get('phone_number')}, phone_carrier={user_data.get('phone_carrier')}, phone_verified={user_data.get('phone_verified')}")
+        else:
+            print(f"No user data found for {email}")
+    except Exception as user_err:
+        print(f"Error looking up user data: {str(user_err)}")
+    
+    # Check if user has verified phone for also sending SMS via email
+    sms_recipient = None
+    if user_data and user_data.get('phone_verified') and user_data.get('phone_number') and user_data.get('phone_carrier'):
+        # Define carrier domains
+        carrier_domains = {
+            'verizon': '@vtext.com',
+            'att': '@txt.att.net',
+            'tmobile': '@tmomail.net',
+            'sprint': '@messaging.sprintpcs.com',
+            'cricket': '@mms.cricketwireless.net',
+            'boost': '@sms.myboostmobile.com',
+            'uscellular': '@email.uscc.net',
+            'metro': '@mymetropcs.com',
+        }
+    
+        # Format phone number and get carrier
+        phone_number = user_data.get('phone_number')
+        carrier = user_data.get('phone_carrier')
+    
+        # Extract exactly 10 digits
+        digits_only = ''.join(char for char in phone_number if char.isdigit())
+        if len(digits_only) >= 10:
+            formatted_phone = digits_only[-10:]  # Take the last 10 digits
+    
+            # Get carrier domain
+            carrier_key = carrier.lower()
+            if carrier_key in carrier_domains:
+                carrier_domain = carrier_domains[carrier_key]
+                sms_recipient = f"{formatted_phone}{carrier_domain}"
+                print(f"Will also send SMS to: {sms_recipient}")
+            else:
+                print(f"Unknown carrier: {carrier}, cannot create SMS recipient")
+        else:
+            print(f"Phone number doesn't have enough digits: {phone_number}")
+    
+    # Create simple message
+    msg = EmailMessage()
+    msg.set_content(body)
+    msg["Subject"] = subject
+    msg["From"] = sender_email
+    msg["To"] = email
+    
+    # Print debug info
+    print(f"Queueing email to {email}")
+    print(f"Subject: {subject}")
+    print(f"Body (preview): {body[:100]}...")
+    messages = [msg]
+    
+    # If we have an SMS recipient, send a second email to the SMS gateway
+    if sms_recipient:
+        # Simplify SMS content to be just "CRN [number] is available"
+        crn_list = [alert['crn'] for alert in available_crns]
+        if len(crn_list) == 1:
+            sms_content = f"CRN {crn_list[0]} is available"
+        else:
+            # For multiple CRNs, list each one on a separate line
+            sms_content = "\n".join([f"CRN {crn} is available" for crn in crn_list])
+    
+        # Create SMS message
+        sms_msg = EmailMessage()
+        sms_msg.set_content(sms_content)
+        sms_msg["Subject"] = "Aggie Class Alert"  # Set subject as requested
+        sms_msg["From"] = sender_email
+        sms_msg["To"] = sms_recipient
+    
+        print(f"Also queueing SMS to {sms_recipient}")
+        print(f"SMS content: {sms_content}")
+        messages.append(sms_msg)
+    return messages, sms_recipient is not None
+
+# Seat openings are written here as jobs and delivered by its worker threads
+outbox = NotificationOutbox(db, collection, mailer, compose_notification, on_notified=alert_registry.discard)
 async def monitor_crns(interval=60):
     """
     Continuously monitor all CRNs in the database
     
+    Each term is fetched on its own schedule (see PollScheduler); alerts are re-evaluated
+    after every fetch and at least every interval seconds.
+    
     Args:
-        interval: Time in seconds between checks
+        interval: Longest time in seconds between checks
     """
     global running
     
     try:
         print(f"Starting continuous monitoring of all CRNs in database")
-        print(f"Checking every {interval} seconds. Press Ctrl+C to stop.")
+        print(f"Checking at least every {interval} seconds. Press Ctrl+C to stop.")
+        
+        # Alerts that have been checked at least once; after that an alert is only
+        # re-checked when its section changes or while it is open (its notification job
+        # may still be pending)
+        evaluated_alert_ids = set()
         
-        # Track when we last fetched class data
-        last_fetch_time = 0
-        cached_availability = None
+        # Seeded once; afterwards the registry follows the collection in the background
+        alert_registry.start()
+        outbox.start()
         
         while running:
-            # Get all active CRNs from MongoDB
-            active_alerts = list(collection.find({'active': True}))
+            # Active alerts grouped by (term, CRN), from memory
+            alerts_by_section = alert_registry.by_section()
             
-            if not active_alerts:
+            if not alerts_by_section:
                 print("No active CRNs to monitor. Waiting...")
                 await asyncio.sleep(interval)
                 continue
             
-            current_time = time.time()
-            
-            # Get the availability for all terms - only fetch new class data if it's been more than the interval time
-            if current_time - last_fetch_time >= interval or cached_availability is None:
-                print(f"Fetching fresh class data (interval: {interval}s)")
-                cached_availability = api.get_availability()
-                last_fetch_time = current_time
+            # Only terms with active alerts whose interval has passed are refreshed (and kept loaded)
+            alert_counts = alert_registry.term_counts()
+            due_terms = poll_scheduler.due_terms(alert_counts)
+            if due_terms:
+                print(f"Fetching fresh class data for {', '.join(due_terms)}")
+                # The planner picks between each term's full dump and per-CRN details calls
+                changes = api.refresh_watched({term_code: [crn for section_term, crn in alerts_by_section if section_term == term_code]
+                                               for term_code in due_terms})
+                for term_code in due_terms:
+                    poll_scheduler.record(term_code, len(changes.get(term_code, ())))
             else:
-                print(f"Using cached class data ({int(current_time - last_fetch_time)}s since last fetch)")
+                print("Using cached class data; no term is due")
+                changes = {}
             
-            # Use the cached availability data
-            availability = cached_availability
-            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+            # Only sections whose seat state moved since the last snapshot need re-evaluation
+            changed_sections = {(term_code, change.crn) for term_code, term_changes in changes.items() for change in term_changes}
+            print(f"{len(changed_sections)} sections changed since the last snapshot")
+            active_ids = alert_registry.ids()
+            evaluated_alert_ids &= active_ids
+            outbox.retain(active_ids)
             
-            # Count alerts with SMS enabled
-            sms_enabled_alerts = [alert for alert in active_alerts if alert.get('use_phone', False)]
-            print(f"Found {len(sms_enabled_alerts)} alerts with SMS notifications enabled")
-            
-            # Group alerts by email for more efficient notifications
-            alerts_by_email = {}
+            availability = api.availability
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
             
-            # Print phone fields for each alert
-            for alert in active_alerts:
-                use_phone = alert.get('use_phone', False)
-                if use_phone:
-                    print(f"\nSMS-enabled alert: CRN {alert.get('CRN')} (Term {alert.get('Term')})")
-                    print(f"- Email: {alert.get('email')}")
-                    print(f"- Phone number: {alert.get('phone_number')}")
-                    print(f"- Phone verified: {alert.get('phone_verified')}")
-                    print(f"- Phone carrier: {alert.get('phone_carrier')}")
+            # Count alerts with SMS enabled (phone details are read from the user when sending)
+            sms_enabled_alerts = sum(alert.get('use_phone', False) for alerts in alerts_by_section.values() for alert in alerts)
+            print(f"Monitoring {len(alert_registry)} alerts ({alert_registry.mode}), {sms_enabled_alerts} with SMS notifications enabled")
             
-            # Check each CRN
-            for alert in active_alerts:
-                crn = alert['CRN']
-                term_code = alert['Term']
-                email = alert.get('email', '')
-                previous_status = alert.get('status', False)
+            # Evaluate each (term, CRN) once for all of its watchers
+            status_updates = []
+            updated_alerts = []
+            notification_jobs = []
+            opened_at = time.time()
+            for (term_code, crn), section_alerts in alerts_by_section.items():
+                # Skip alerts whose section is unchanged, unless they are new or still waiting on a notification
+                if (term_code, crn) not in changed_sections:
+                    section_alerts = [alert for alert in section_alerts
+                                      if alert['_id'] not in evaluated_alert_ids or alert.get('status', False)]
+                    if not section_alerts:
+                        continue
+                if term_code not in availability:
+                    # Not fetched yet (e.g. held back by the budget); evaluate once it is
+                    continue
+                evaluated_alert_ids.update(alert['_id'] for alert in section_alerts)
                 
-                if term_code in availability and crn in availability[term_code]:
-                    status = availability[term_code][crn]
-                    print(f"[{timestamp}] CRN {crn} (Term {term_code}): {'Available' if status else 'Not available'}")
-                    
-                    # Update the status in the database
-                    collection.update_one(
-                        {'CRN': crn, 'Term': term_code, 'active': True},
-                        {'$set': {'status': status, 'last_checked': time.time()}}
-                    )
-                    
-                    # Group by email for notifications - send email when course is available
-                    if email and status:
-                        if email not in alerts_by_email:
-                            alerts_by_email[email] = []
-                        
-                        alerts_by_email[email].append({
-                            'crn': crn,
-                            'term': term_code,
-                            'status': status
-                        })
-                else:
+                if crn not in availability[term_code]:
                     print(f"[{timestamp}] CRN {crn} (Term {term_code}): Not found")
+                    continue
+                status = availability[term_code][crn]
+                print(f"[{timestamp}] CRN {crn} (Term {term_code}): {'Available' if status else 'Not available'} "
+                      f"({len(section_alerts)} alerts)")
+                
+                # One write per section, and only when some watcher's stored status is out of date.
+                # Alerts that just saw their section open get opened_at, which keys their notification.
+                if any(alert.get('status', False) != status for alert in section_alerts):
+                    changed_fields = {'status': status, 'last_checked': time.time(), 'updated_at': time.time()}
+                    if status:
+                        changed_fields['opened_at'] = opened_at
+                    status_updates.append(UpdateMany(
+                        {'CRN': crn, 'Term': term_code, 'active': True, 'status': {'$ne': status}},
+                        {'$set': changed_fields}
+                    ))
+                    updated_alerts.append((section_alerts, status))
+                
+                # Queue a notification for every open alert; the outbox drops openings it already has
+                if status:
+                    for alert in section_alerts:
+                        if alert.get('email') and alert.get('status', False) == status:
+                            notification_jobs.append(notification_job(alert))
             
-            # Send notifications grouped by email
-            if alerts_by_email:
-                print(f"\n----- SENDING EMAIL NOTIFICATIONS -----")
-            for email, alerts in alerts_by_email.items():
-                available_crns = [alert for alert in alerts if alert['status']]
-                if available_crns:
-                    print(f"\nSending notification to {email} about {len(available_crns)} available CRNs")
-                    
-                    try:
-                        # Create email content
-                        subject = "Class Availability Alert"
-                        body = f"Hello,\n\nOne or more of your course alerts are now available:\n\n"
-                        
-                        for alert in available_crns:
-                            crn = alert['crn']
-                            term = alert['term']
-                            term_name = api.term_codes_to_desc.get(term, f"Term {term}")
-                            body += f"CRN: {crn} (Term: {term_name}) is now AVAILABLE!\n"
-                        
-                        body += "\nPlease log in to register as soon as possible as spaces may fill quickly.\n\n"
-                        body += "Thank you for using Aggie Class Alert!"
-                        
-                        # Look up user data to get phone details if available
-                        user_data = None
-                        try:
-                            user_data = users_collection.find_one({'email': email})
-                            if user_data:
-                                print(f"Found user data for {email}: phone_number={user_data.get('phone_number')}, phone_carrier={user_data.get('phone_carrier')}, phone_verified={user_data.get('phone_verified')}")
-                            else:
-                                print(f"No user data found for {email}")
-                        except Exception as user_err:
-                            print(f"Error looking up user data: {str(user_err)}")
-                        
-                        # Check if user has verified phone for also sending SMS via email
-                        sms_recipient = None
-                        if user_data and user_data.get('phone_verified') and user_data.get('phone_number') and user_data.get('phone_carrier'):
-                            # Define carrier domains
-                            carrier_domains = {
-                                'verizon': '@vtext.com',
-                                'att': '@txt.att.net',
-                                'tmobile': '@tmomail.net',
-                                'sprint': '@messaging.sprintpcs.com',
-                                'cricket': '@mms.cricketwireless.net',
-                                'boost': '@sms.myboostmobile.com',
-                                'uscellular': '@email.uscc.net',
-                                'metro': '@mymetropcs.com',
-                            }
-                            
-                            # Format phone number and get carrier
-                            phone_number = user_data.get('phone_number')
-                            carrier = user_data.get('phone_carrier')
-                            
-                            # Extract exactly 10 digits
-                            digits_only = ''.join(char for char in phone_number if char.isdigit())
-                            if len(digits_only) >= 10:
-                                formatted_phone = digits_only[-10:]  # Take the last 10 digits
-                                
-                                # Get carrier domain
-                                carrier_key = carrier.lower()
-                                if carrier_key in carrier_domains:
-                                    carrier_domain = carrier_domains[carrier_key]
-                                    sms_recipient = f"{formatted_phone}{carrier_domain}"
-                                    print(f"Will also send SMS to: {sms_recipient}")
-                                else:
-                                    print(f"Unknown carrier: {carrier}, cannot create SMS recipient")
-                            else:
-                                print(f"Phone number doesn't have enough digits: {phone_number}")
-                        
-                        # SIMPLIFIED EMAIL SENDING
-                        try:
-                            # Create simple message
-                            from email.message import EmailMessage
-                            msg = EmailMessage()
-                            msg.set_content(body)
-                            msg["Subject"] = subject
-                            msg["From"] = sender_email
-                            msg["To"] = email
-                            
-                            # Print debug info
-                            print(f"Preparing to send email to {email}")
-                            print(f"Subject: {subject}")
-                            print(f"Body (preview): {body[:100]}...")
-                            
-                            # Send using SSL
-                            smtp_server = "smtp.gmail.com"
-                            port = 465  # Using SSL
-                            
-                            import smtplib
-                            with smtplib.SMTP_SSL(smtp_server, port) as server:
-                                server.login(sender_email, password)
-                                server.send_message(msg)
-                                
-                                # If we have an SMS recipient, send a second email to the SMS gateway
-                                if sms_recipient:
-                                    # Create more concise content for SMS
-                                    sms_content = "Aggie Class Alert: "
-                                    
-                                    # Add CRNs to the message
-                                    crn_list = [alert['crn'] for alert in available_crns]
-                                    if len(crn_list) == 1:
-                                        sms_content += f"CRN {crn_list[0]} is available"
-                                    else:
-                                        # For multiple CRNs, list each one on a separate line
-                                        sms_content += "\n".join([f"CRN {crn} is available" for crn in crn_list])
-                                    
-                                    # Create SMS message
-                                    sms_msg = EmailMessage()
-                                    
-                                    # Simplify SMS content to be just "CRN [number] is available"
-                                    if len(crn_list) == 1:
-                                        sms_content = f"CRN {crn_list[0]} is available"
-                                    else:
-                                        # For multiple CRNs, list each one on a separate line
-                                        sms_content = "\n".join([f"CRN {crn} is available" for crn in crn_list])
-                                    
-                                    sms_msg.set_content(sms_content)
-                                    sms_msg["Subject"] = "Aggie Class Alert"  # Set subject as requested
-                                    sms_msg["From"] = sender_email
-                                    sms_msg["To"] = sms_recipient
-                                    
-                                    print(f"Also sending SMS to {sms_recipient}")
-                                    print(f"SMS subject: Aggie Class Alert")
-                                    print(f"SMS content: {sms_content}")
-                                    
-                                    # Send the SMS message
-                                    server.send_message(sms_msg)
-                                    print(f"✅ SMS sent successfully to {sms_recipient}!")
-                                
-                            print(f"✅ Email sent successfully to {email}!")
-                            
-                            # Deactivate alerts after successful notification
-                            for alert in available_crns:
-                                crn = alert['crn']
-                                term = alert['term']
-                                result = collection.update_one(
-                                    {'CRN': crn, 'Term': term, 'email': email, 'active': True},
-                                    {'$set': {'active': False, 'notified': True, 'notified_at': time.time(), 'notified_via_sms': sms_recipient is not None}}
-                                )
-                                print(f"Deactivated alert for CRN {crn} (Term {term}) for {email} - Modified: {result.modified_count}")
-                        
-                        except Exception as e:
-                            print(f"❌ Failed to send email: {str(e)}")
-                            import traceback
-                            traceback.print_exc()
-                    except Exception as e:
-                        print(f"❌ Failed to send email to {email}: {e}")
+            if status_updates:
+                try:
+                    result = collection.bulk_write(status_updates, ordered=False)
+                    print(f"Updated status of {result.modified_count} alerts across {len(status_updates)} sections")
+                    for section_alerts, status in updated_alerts:
+                        alert_registry.set_status(section_alerts, status, opened_at if status else None)
+                        if status:
+                            # Only openings that are persisted get a job, so their key is stable across cycles
+                            notification_jobs.extend(notification_job(dict(alert, opened_at=opened_at))
+                                                     for alert in section_alerts
+                                                     if alert.get('email') and alert.get('status', False) != status)
+                except Exception as e:
+                    print(f"Failed to update alert statuses: {e}")
+                    # Not persisted, so re-evaluate these alerts next cycle even if their section is unchanged
+                    for section_alerts, status in updated_alerts:
+                        evaluated_alert_ids.difference_update(alert['_id'] for alert in section_alerts)
+            
+            # Openings become outbox jobs; the outbox workers deliver them and deactivate the alerts
+            if notification_jobs:
+                try:
+                    queued = outbox.enqueue(notification_jobs)
+                    print(f"Queued {queued} new notifications ({len(notification_jobs)} alerts open)")
+                except Exception as e:
+                    # The alerts stay open, so the next cycle enqueues them again
+                    print(f"Failed to queue notifications: {e}")
             else:
                 print("No email notifications to send.")
             
-            # Wait for the next check
-            print(f"\nWaiting {interval} seconds until next check...")
-            await asyncio.sleep(interval)
+            # Wait until the next term is due
+            wait = poll_scheduler.next_due(alert_registry.term_counts())
+            wait = interval if wait is None else min(interval, max(1, wait))
+            print(f"\nWaiting {wait:.0f} seconds until next check...")
+            await asyncio.sleep(wait)
     except Exception as e:
         print(f"An error occurred in monitor_crns: {e}")
         import traceback
@@ -957,6 +989,25 @@ def handle_login_options():
 def handle_users_check_options(email):
     return '', 200
 
+# RMP fields reported when a professor has no RateMyProfessors data
+EMPTY_RMP_DATA = {
+    "overall_rating": None,
+    "would_take_again": None,
+    "difficulty": None,
+    "comments": {},
+    "found": False
+}
+
+def section_meeting_info(section):
+    """Format a section's pre-decoded meetings the way the professor search returns them"""
+    return [{
+        'days': meeting.days or 'N/A',
+        'start_time': meeting.begin_time or 'N/A',
+        'end_time': meeting.end_time or 'N/A',
+        'building': meeting.building or 'N/A',
+        'room': meeting.room or 'N/A'
+    } for meeting in section.meetings]
+
 @app.route('/api/professors/search', methods=['GET'])
 @require_google_auth
 def search_professors():
@@ -976,44 +1027,22 @@ def search_professors():
         return jsonify({'error': 'Department and course code are required'}), 400
     
     try:
-        # Find Fall 2025 term code
-        fall_term_code = None
-        for term in api.terms:
-            if "Fall" in term['STVTERM_DESC']:
-                fall_term_code = term['STVTERM_CODE']
-                print(f"Found Fall term: {term['STVTERM_DESC']} ({fall_term_code})")
-                break
-                
-        if not fall_term_code:
-            print("Warning: Could not find Fall term, using first available term")
-            fall_term_code = api.terms[0]['STVTERM_CODE'] if api.terms else None
+        # Current College Station term (not the first "Fall" term, which may be a Half Year or Galveston term)
+        fall_term_code = api.default_term_code()
+        print(f"Using term: {api.term_codes_to_desc.get(fall_term_code, '')} ({fall_term_code})")
         
         # Use the anex module to find professors
-        professors_data = anex.find_profs(department, course_code)
-        
-        # Helper function to extract last name properly
-        def extract_last_name(name):
-            # Handle special cases like "LAST F"
-            if re.match(r'^[A-Z]+\s+[A-Z]$', name):
-                # This matches the format "LAST F"
-                return name.split()[0]
-            
-            # For other formats, get the last part of the name
-            # Handle hyphenated last names by considering the entire last token
-            parts = name.split()
-            if parts:
-                return parts[-1]
-            return name
-
-        # Extract all last names from historical professors data
-        historical_last_names = {}
+        professors_data = anex.find_profs(department, course_code, api)
+        
+        # Historical (anex) names are joined against the term's instructor identities by name key
         for prof_name in professors_data.keys():
-            last_name = extract_last_name(prof_name)
-            historical_last_names[prof_name] = last_name.lower()  # Store lowercase for easier comparison
-            print(f"Historical professor: {prof_name}, extracted last name: {last_name}")
+            print(f"Historical professor: {prof_name}, name key: {name_key(prof_name).key}")
         
-        # Dictionary to track all instructors found in current sections
+        # Current instructors of this course, keyed by display name
         current_instructors = {}
+        # {InstructorIdentity: [sections of this course they teach]}, built in one pass over the sections
+        sections_by_identity = {}
+        sections = []
         
         # Ensure proper formatting with a space between department and course code
         course_string = f"{department} {course_code}"
@@ -1027,427 +1056,106 @@ def search_professors():
                 if not re.match(r'^[A-Z]{2,4} \d{3}$', course_string):
                     print(f"⚠️ Warning: Course string '{course_string}' may not match expected format 'DEPT ###'")
                 
-                # Make sure the API is properly initialized for this term
-                if hasattr(api, 'classes') and fall_term_code in api.classes and api.classes[fall_term_code]:
-                    print(f"Using cached class data for term {fall_term_code}")
-                else:
-                    print(f"Loading classes for term {fall_term_code}")
-                    # Ensure classes are loaded for this term
-                    api.get_classes(fall_term_code)
-                
-                # Get filtered course sections
-                sections = api.filter_by_course("202531", course_string)
+                # Get filtered course sections (loads the term on first access)
+                sections = api.filter_by_course(fall_term_code, course_string)
+                instructor_index = api.get_instructor_index(fall_term_code)
                 print(f"Found {len(sections)} sections for {course_string} in upcoming semester")
                 
-                # Simple, direct approach to extract instructors from each section
-                print("\n===== DIRECT EXTRACTION OF INSTRUCTORS FROM SECTIONS =====")
+                print("\n===== INSTRUCTORS FROM SECTIONS =====")
                 for section in sections:
                     section_number = section.get('SWV_CLASS_SEARCH_SECTION', '')
                     crn = section.get('SWV_CLASS_SEARCH_CRN', '')
                     
-                    # Try to get instructor JSON
-                    instructor_json_str = section.get('SWV_CLASS_SEARCH_INSTRCTR_JSON', None)
+                    if not section.instructors:
+                        print(f"No instructor data found in section {section_number} (CRN {crn})")
+                        continue
                     
-                    if instructor_json_str:
-                        print(f"Section {section_number} (CRN {crn}) - Found instructor JSON: {instructor_json_str}")
-                        
-                        # Try to extract with regex
-                        if isinstance(instructor_json_str, str):
-                            matches = re.findall(r'"NAME"\s*:\s*"([^"]+)"', instructor_json_str)
-                            for match in matches:
-                                full_name = match.replace(' (P)', '')
-                                last_name = extract_last_name(full_name).lower()
-                                
-                                print(f"✓ Found instructor (via regex): {full_name}, Last name: {last_name}")
-                                
-                                # Add to current instructors
-                                current_instructors[full_name] = {
-                                    'full_name': full_name,
-                                    'last_name': last_name,
-                                    'section': section_number,
-                                    'crn': crn,
-                                    'term_code': fall_term_code,
-                                    'term_desc': api.term_codes_to_desc.get(fall_term_code, '')
-                                }
+                    for instructor in section.instructors:
+                        identity = instructor_index.identity_of(instructor)
+                        if identity is None:
+                            continue
+                        print(f"→ Section {section_number} (CRN {crn}): '{instructor.raw_name}' is {identity.key} (pidms {sorted(map(str, identity.pidms))})")
+                        sections_by_identity.setdefault(identity, []).append(section)
+                        current_instructors.setdefault(identity.name, {
+                            'full_name': identity.name,
+                            'last_name': identity.last_name,
+                            'identity': identity,
+                            'section': section_number,
+                            'crn': crn,
+                            'term_code': fall_term_code,
+                            'term_desc': api.term_codes_to_desc.get(fall_term_code, '')
+                        })
                 
                 print(f"\nExtracted {len(current_instructors)} instructors from {len(sections)} sections")
-                
-                # DIRECT DEBUG OUTPUT - Print every section with all fields to see the raw data
-                print("\n===== RAW SECTION DATA DUMP (FIRST 3 SECTIONS) =====")
-                for i, section in enumerate(sections[:3]):
-                    print(f"SECTION {i+1}: CRN {section.get('SWV_CLASS_SEARCH_CRN', '')} - Section {section.get('SWV_CLASS_SEARCH_SECTION', '')}")
-                    for key, value in sorted(section.items()):
-                        if 'INSTRUCTOR' in key.upper() or 'FACULTY' in key.upper() or 'PROF' in key.upper() or 'TEACHER' in key.upper():
-                            print(f"  !!! {key}: {value}")
-                        else:
-                            print(f"  {key}: {value}")
-                
-                # Add a detailed inspection of the first section to debug
-                if sections and len(sections) > 0:
-                    print("\n===== DETAILED SECTION DATA INSPECTION =====")
-                    first_section = sections[0]
-                    print(f"First section keys: {sorted(first_section.keys())}")
-                    
-                    # Check for instructor-related fields
-                    instructor_related_keys = [key for key in first_section.keys() 
-                                              if 'INSTRUCT' in key.upper() or 'FACULTY' in key.upper() or 'PROF' in key.upper()]
-                    
-                    if instructor_related_keys:
-                        print(f"Found instructor-related fields: {instructor_related_keys}")
-                        for key in instructor_related_keys:
-                            print(f"  {key}: {first_section.get(key)}")
-                    else:
-                        print("No instructor-related fields found in section data")
-                    
-                    # Print all fields of the first section for detailed inspection
-                    print("\nAll fields of first section:")
-                    for key, value in sorted(first_section.items()):
-                        print(f"  {key}: {value}")
-                    print("=" * 40)
-                
-                # Process instructor information from sections
-                for section in sections:
-                    section_number = section.get('SWV_CLASS_SEARCH_SECTION', '')
-                    crn = section.get('SWV_CLASS_SEARCH_CRN', '')
-                    
-                    # Try multiple possible field names for instructor data
-                    instructor_json_str = None
-                    tried_fields = []
-                    
-                    for field in ['SWV_CLASS_SEARCH_INSTRCTR_JSON', 'INSTRCTR_JSON', 'INSTRUCTOR_JSON', 'SWV_INSTRCTR', 'INSTRUCTOR']:
-                        tried_fields.append(field)
-                        if field in section and section[field]:
-                            instructor_json_str = section[field]
-                            print(f"Found instructor data in field '{field}' for section {section_number}")
-                            break
-                    
-                    if not instructor_json_str:
-                        print(f"No instructor data found in section {section_number} (CRN {crn}). Tried fields: {', '.join(tried_fields)}")
-                        
-                        # Fallback: Search through all fields for any value that looks like a person's name
-                        print(f"Searching through all fields for potential instructor names in section {section_number}...")
-                        
-                        # Look for keys that have "instructor" or similar in their name
-                        potential_instructor_fields = [k for k in section.keys() 
-                                                     if ('INSTRUCT' in k.upper() or 'PROF' in k.upper() or 'FACULTY' in k.upper() or 'TEACHER' in k.upper())]
-                        
-                        # Look through all fields that contain text and have space and capitalization pattern of names
-                        for field, value in section.items():
-                            if isinstance(value, str) and ' ' in value:
-                                # Check if it looks like a name (has multiple words with capital letters)
-                                words = value.split()
-                                if len(words) >= 2 and all(w[0].isupper() for w in words if w):
-                                    print(f"Found potential instructor name in field '{field}': {value}")
-                                    potential_instructor_fields.append(field)
-                        
-                        for field in potential_instructor_fields:
-                            value = section.get(field)
-                            if value and isinstance(value, str):
-                                # Try to parse it as an instructor name
-                                name = value.strip()
-                                # Remove (P) designation if present
-                                name = name.replace(' (P)', '')
-                                
-                                if name and ' ' in name:  # Must have at least two parts (first and last name)
-                                    instructor_last_name = extract_last_name(name).lower()
-                                    print(f"→ Section {section_number} (CRN {crn}): Extracted potential instructor '{name}' from field '{field}', last name: '{instructor_last_name}'")
-                                    
-                                    # Store in a dictionary for easy lookup
-                                    current_instructors[name] = {
-                                        'full_name': name,
-                                        'last_name': instructor_last_name,
-                                        'section': section_number,
-                                        'crn': crn,
-                                        'term_code': fall_term_code,
-                                        'term_desc': api.term_codes_to_desc.get(fall_term_code, ''),
-                                        'extraction_method': 'field_analysis',
-                                        'source_field': field
-                                    }
-                        
-                        # If we still didn't find anything, continue to the next section
-                        if not instructor_json_str:
-                            continue
-                    
-                    # If we have a JSON string to process, let's do that
-                    try:
-                        # Make sure we have proper JSON - handle both string and object
-                        if isinstance(instructor_json_str, str):
-                            try:
-                                # For JSON strings like: "[{\"NAME\":\"Sandeep Kumar (P)\",\"MORE\":2938931,\"HAS_CV\":\"Y\"}]"
-                                # Need to handle escaped quotes properly
-                                instructor_json_str = instructor_json_str.replace('\\"', '"')
-                                
-                                # If the string is already wrapped in quotes from the API response, remove them
-                                if instructor_json_str.startswith('"') and instructor_json_str.endswith('"'):
-                                    instructor_json_str = instructor_json_str[1:-1]
-                                    
-                                print(f"Cleaned JSON string: {instructor_json_str}")
-                                instructor_json = json.loads(instructor_json_str)
-                                print(f"Successfully parsed JSON for Section {section_number}: {instructor_json}")
-                            except json.JSONDecodeError as e:
-                                print(f"ERROR parsing JSON for Section {section_number}: {e}")
-                                print(f"Problematic JSON: {instructor_json_str}")
-                                
-                                # Try to directly extract instructor data from the string
-                                # Looking for patterns like {"NAME":"David K. Houngninou (P)","MORE":939540,"HAS_CV":"Y"}
-                                pattern = r'"NAME"\s*:\s*"([^"]+)"'
-                                name_matches = re.findall(pattern, instructor_json_str)
-                                
-                                if name_matches:
-                                    for raw_name in name_matches:
-                                        print(f"Extracted instructor name from string: {raw_name}")
-                                        
-                                        # Remove (P) designation if present
-                                        name = raw_name.replace(' (P)', '')
-                                        
-                                        if name:
-                                            try:
-                                                # Extract the last name from the instructor name
-                                                instructor_last_name = extract_last_name(name).lower()
-                                                
-                                                print(f"→ Section {section_number} (CRN {crn}): Extracted instructor '{name}' from '{raw_name}', last name: '{instructor_last_name}'")
-                                                
-                                                # Store in a dictionary for easy lookup
-                                                current_instructors[name] = {
-                                                    'full_name': name,
-                                                    'last_name': instructor_last_name,
-                                                    'section': section_number,
-                                                    'crn': crn,
-                                                    'term_code': fall_term_code,
-                                                    'term_desc': api.term_codes_to_desc.get(fall_term_code, ''),
-                                                    'extraction_method': 'regex'
-                                                }
-                                            except Exception as e:
-                                                print(f"Error processing instructor name '{name}': {e}")
-                                instructor_json = []
-                        else:
-                            instructor_json = instructor_json_str
-                        
-                        # Debug - how many instructors found
-                        print(f"Found {len(instructor_json)} instructors in section {section_number}")
-                        
-                        for i, instructor in enumerate(instructor_json):
-                            # Debug - what's in each instructor object
-                            print(f"Instructor {i+1} data: {instructor}")
-                            
-                            # Extract name and remove (P) designation if present
-                            raw_name = instructor.get('NAME', '')
-                            name = raw_name.replace(' (P)', '')
-                            
-                            if name:
-                                # Extract the last name from the instructor name (format: "First Last")
-                                instructor_last_name = extract_last_name(name).lower()
-                                
-                                print(f"→ Section {section_number} (CRN {crn}): Extracted instructor '{name}' from '{raw_name}', last name: '{instructor_last_name}'")
-                                
-                                # Store in a dictionary for easy lookup
-                                current_instructors[name] = {
-                                    'full_name': name,
-                                    'last_name': instructor_last_name,
-                                    'section': section_number,
-                                    'crn': crn,
-                                    'term_code': fall_term_code,
-                                    'term_desc': api.term_codes_to_desc.get(fall_term_code, '')
-                                }
-                            else:
-                                print(f"WARNING: Empty instructor name in section {section_number}")
-                    except Exception as e:
-                        print(f"Error processing instructor JSON for section {section_number}: {e}")
-                        import traceback
-                        traceback.print_exc()
             except Exception as e:
                 print(f"Error getting current term sections: {e}")
         
-        # Log all current instructors with a prominent indicator 
-        print("\n")
-        print("🔴🔴🔴 ALL LOGGED: ALL CURRENT INSTRUCTORS 🔴🔴🔴")
-        print("=" * 80)
-        print(f"Total current instructors found: {len(current_instructors)}")
-        print(json.dumps({name: {"last_name": data['last_name'], "section": data['section'], "crn": data['crn']} 
-                           for name, data in current_instructors.items()}, indent=2))
-        print("=" * 80)
-        print("🔴🔴🔴 END OF CURRENT INSTRUCTORS LOG 🔴🔴🔴\n")
-        
-        # Print a debug summary of the extracted names
-        print("\n===== DEBUGGING NAME EXTRACTION =====")
-        print(f"Historical professors last names ({len(historical_last_names)}):")
-        for full_name, last_name in historical_last_names.items():
-            print(f"  {full_name} -> {last_name}")
-        
-        print(f"\nCurrent section instructors ({len(current_instructors)}):")
-        for full_name, data in current_instructors.items():
-            print(f"  {full_name} -> {data['last_name']}")
- 
-        # Create simplified lists of just the last names for easier matching
-        historical_last_names_list = list(set(last_name for _, last_name in historical_last_names.items()))
-        current_last_names_list = list(set(data['last_name'] for _, data in current_instructors.items()))
-        
-        print(f"\nSimplified historical last names ({len(historical_last_names_list)}):")
-        print(f"  {', '.join(sorted(historical_last_names_list))}")
-        
-        print(f"\nSimplified current last names ({len(current_last_names_list)}):")
-        print(f"  {', '.join(sorted(current_last_names_list))}")
-        
-        # Step 2: Now do the matching between historical professors and current instructors
-        matches = []
-        print("\n===== CHECKING ALL POSSIBLE MATCHES =====")
-        
-        # Track which historical professors have been matched
-        matched_historical_professors = set()
-        
-        # First check which historical last names match with any current last name
-        matching_last_names = set()
-        for hist_last in historical_last_names_list:
-            matches_found = False
-            for curr_last in current_last_names_list:
-                if hist_last == curr_last:
-                    matching_last_names.add(hist_last)
-                    matches_found = True
-            
-            match_indicator = "✓" if matches_found else "❌"
-            print(f"{match_indicator} Historical last name '{hist_last}' found in current instructors: {matches_found}")
-        
-        # Then match the specific professors
-        for hist_name, hist_last in historical_last_names.items():
-            # Check if this professor's last name is in the matching last names set
-            if hist_last in matching_last_names:
-                # Find all current instructors with this last name
-                matching_instructors = [(curr_name, curr_data) for curr_name, curr_data in current_instructors.items() 
-                                        if curr_data['last_name'] == hist_last]
-                
-                if matching_instructors:
-                    matched_historical_professors.add(hist_name)
-                    
-                    for curr_name, curr_data in matching_instructors:
-                        matches.append({
-                            'historical_name': hist_name,
-                            'historical_last': hist_last,
-                            'current_name': curr_name, 
-                            'current_last': curr_data['last_name'],
-                            'section': curr_data['section'],
-                            'crn': curr_data['crn']
-                        })
-                    
-                    print(f"✓ {hist_name} ({hist_last}) matched with {len(matching_instructors)} current instructor(s)")
-                    for curr_name, curr_data in matching_instructors:
-                        print(f"   - {curr_name} ({curr_data['last_name']}) Section: {curr_data['section']}, CRN: {curr_data['crn']}")
-                else:
-                    print(f"⚠️ No instructors found with last name '{hist_last}' (unexpected)")
+        # Step 2: Hash join of historical professors against the identities teaching this course
+        matches = {}
+        print("\n===== MATCHING HISTORICAL PROFESSORS =====")
+        for hist_name in professors_data:
+            identities = [identity for identity in (instructor_index.match(hist_name) if sections_by_identity else ())
+                          if identity in sections_by_identity]
+            if identities:
+                matches[hist_name] = identities
+                print(f"✓ {hist_name} matched {', '.join(identity.name for identity in identities)}")
             else:
-                print(f"❌ {hist_name} ({hist_last}) - No matching current instructors")
-        
-        # Log all matches with a prominent indicator
-        print("\n")
-        print("🔴🔴🔴 ALL LOGGED: INITIAL MATCHES ARRAY 🔴🔴🔴")
-        print("=" * 80)
-        print(f"Total matches: {len(matches)}")
-        print(json.dumps(matches, indent=2))
-        print("=" * 80)
-        print("🔴🔴🔴 END OF MATCHES ARRAY LOG 🔴🔴🔴\n")
-        
-        # For debugging purposes, check which historical professors were not matched
-        unmatched_professors = []
-        for hist_name in historical_last_names:
-            if hist_name not in matched_historical_professors:
-                unmatched_professors.append(hist_name)
-        
-        if unmatched_professors:
-            print(f"\n⚠️ The following {len(unmatched_professors)} historical professors weren't matched to any section:")
-            for name in unmatched_professors:
-                print(f"  - {name} (last name: {historical_last_names[name]})")
-                
-        print(f"Found {len(matches)} total matches out of {len(historical_last_names)} historical professors")
-        print("=====================================\n")
-        
-        # Print a consolidated list of matched last names for easier debugging
-        print("\n===== MATCHED LAST NAMES =====")
-        matched_last_names = set()
-        for match in matches:
-            matched_last_names.add(match['historical_last'])
-        
-        print("List of last names that matched:")
-        for last_name in sorted(matched_last_names):
-            print(f"  - {last_name}")
-            
-        print("\nDetailed matches by last name:")
-        for last_name in sorted(matched_last_names):
-            print(f"  Last name: {last_name.upper()}")
-            for match in matches:
-                if match['historical_last'] == last_name:
-                    print(f"    ✓ {match['historical_name']} <-> {match['current_name']} (Section {match['section']}, CRN {match['crn']})")
-        
-        # Log matched_historical_professors with a prominent indicator
-        print("\n")
-        print("🔴🔴🔴 ALL LOGGED: MATCHED HISTORICAL PROFESSORS 🔴🔴🔴")
-        print("=" * 80)
-        print(f"Total matched professors: {len(matched_historical_professors)}")
-        print(json.dumps(list(matched_historical_professors), indent=2))
-        print("=" * 80)
-        print("🔴🔴🔴 END OF MATCHED PROFESSORS LOG 🔴🔴🔴\n")
-        
-        print("!" * 80)
-        print("\n")
+                print(f"❌ {hist_name} - No matching current instructors")
+        matched_identities = {identity for identities in matches.values() for identity in identities}
+        print(f"Found {len(matches)} matches out of {len(professors_data)} historical professors")
+        
+        def identity_sections(identities):
+            """Every section of the course taught by any of the identities, one entry per section number"""
+            professor_sections = []
+            seen = set()
+            for identity in identities:
+                for section in sections_by_identity.get(identity, ()):
+                    section_number = section.get('SWV_CLASS_SEARCH_SECTION', '')
+                    if section_number in seen:
+                        continue
+                    seen.add(section_number)
+                    professor_sections.append({
+                        'section': section_number,
+                        'crn': section.get('SWV_CLASS_SEARCH_CRN', ''),
+                        'meetings': section_meeting_info(section) or None,
+                        'is_available': section.get('STUSEAT_OPEN', 'N') == 'Y'
+                    })
+            return professor_sections
+        
+        def rmp_rating(name):
+            if not RMP_AVAILABLE:
+                print(f"Skipping RMP data for {name} - module not available")
+                return dict(EMPTY_RMP_DATA)
+            try:
+                print(f"\n===== GETTING RMP DATA for {name} =====")
+                rmp_data = RMP.get_professor_rating(name, department)
+                print(f"RMP data for {name}: {rmp_data}")
+                return rmp_data
+            except Exception as rmp_err:
+                print(f"Error getting RMP data for {name}: {rmp_err}")
+                return dict(EMPTY_RMP_DATA)
         
         # Format the data for frontend
         formatted_professors = []
         
         # First add all professors with historical data
         for prof_name, data in professors_data.items():
-            overall_gpa = data['overall']
-            regular_gpa = data['regular']
-            honors_gpa = data['honors']
-            
-            # Check if professor is teaching in the upcoming semester
-            # A professor is teaching if they're in the matched_historical_professors set
-            teaching_next_term = prof_name in matched_historical_professors
-            teaching_info = None
-            matched_current_name = ""
-            
-            # Extract last name from historical data format
-            hist_last_name = historical_last_names[prof_name]
-            
-            # If teaching next term, find the matching instructor information
-            if teaching_next_term:
-                # Store all matched current names to check multiple instructor variations
-                matched_current_names = []
-                
-                # Look through all matches to find ALL matches for this professor
-                for match in matches:
-                    if match['historical_name'] == prof_name:
-                        # Store every match we find, not just the first one
-                        matched_current_names.append(match['current_name'])
-                        # Still use the first one for the teaching_info field
-                        if not teaching_info:
-                            matched_current_name = match['current_name']
-                            teaching_info = current_instructors[match['current_name']]
-            
-            # Get RateMyProfessor data
-            rmp_data = {
-                "overall_rating": None,
-                "would_take_again": None, 
-                "difficulty": None,
-                "comments": {},
-                "found": False
-            }
+            identities = matches.get(prof_name, [])
+            teaching_next_term = bool(identities)
+            teaching_info = current_instructors[identities[0].name] if identities else None
             
             # Only check RMP for professors who are actually teaching next term
-            if teaching_next_term and RMP_AVAILABLE:
-                try:
-                    print(f"\n===== GETTING RMP DATA for {prof_name} ({hist_last_name}) =====")
-                    rmp_data = RMP.get_professor_rating(prof_name, department)
-                    print(f"RMP data for {prof_name} ({hist_last_name}): {rmp_data}")
-                except Exception as rmp_err:
-                    print(f"Error getting RMP data for {prof_name}: {rmp_err}")
-            elif not teaching_next_term:
-                print(f"Skipping RMP data for {prof_name} - not teaching next term")
+            if teaching_next_term:
+                rmp_data = rmp_rating(identities[0].name)
             else:
-                print(f"Skipping RMP data for {prof_name} - module not available")
+                print(f"Skipping RMP data for {prof_name} - not teaching next term")
+                rmp_data = dict(EMPTY_RMP_DATA)
             
             professor = {
                 'name': prof_name,
-                'average_gpa': round(overall_gpa, 2),
-                'regular_gpa': round(regular_gpa, 2) if data['has_regular'] else None,
-                'honors_gpa': round(honors_gpa, 2) if data['has_honors'] else None,
+                'average_gpa': round(data['overall'], 2),
+                'regular_gpa': round(data['regular'], 2) if data['has_regular'] else None,
+                'honors_gpa': round(data['honors'], 2) if data['has_honors'] else None,
                 'has_regular': data['has_regular'],
                 'has_honors': data['has_honors'],
                 'regular_count': data['regular_count'],
@@ -1455,8 +1163,8 @@ def search_professors():
                 'department': department,
                 'courses': [f"{department} {course_code}"],
                 'teaching_next_term': teaching_next_term,
-                'last_name': hist_last_name,
-                'matched_with': matched_current_name if teaching_next_term else "",
+                'last_name': name_key(prof_name).last_name,
+                'matched_with': identities[0].name if teaching_next_term else "",
                 # Add RateMyProfessor data
                 'rmp_rating': rmp_data['overall_rating'],
                 'rmp_would_take_again': rmp_data['would_take_again'], 
@@ -1467,243 +1175,28 @@ def search_professors():
             }
             
             # Add teaching info if available
-            if teaching_next_term and teaching_info:
+            if teaching_info:
                 professor.update({
                     'section': teaching_info.get('section', ''),
                     'crn': teaching_info.get('crn', ''),
                     'term_code': teaching_info.get('term_code', ''),
                     'term_desc': teaching_info.get('term_desc', '')
                 })
-                
-                # COLLECT ALL SECTIONS FOR THIS PROFESSOR
-                # Start fresh with an empty array of sections
-                professor_sections = []
-                
-                # First, gather the professor's last name(s) to check against all sections
-                professor_last_names = set()
-                professor_last_names.add(hist_last_name)  # Add the historical last name
-                
-                # Also add all last names from matched current instructors
-                if matched_current_names:
-                    for curr_name in matched_current_names:
-                        if curr_name in current_instructors:
-                            professor_last_names.add(current_instructors[curr_name]['last_name'])
-                
-                print(f"\n===== COLLECTING ALL SECTIONS FOR PROFESSOR: {prof_name} =====")
-                print(f"Checking for sections with last names: {', '.join(sorted(professor_last_names))}")
-                
-                # DIRECT APPROACH: Check all sections from the API response
-                if 'sections' in locals() and sections:
-                    print("Checking all API sections for matching instructors...")
-                    
-                    for section in sections:
-                        section_number = section.get('SWV_CLASS_SEARCH_SECTION', '')
-                        crn = section.get('SWV_CLASS_SEARCH_CRN', '')
-                        
-                        # Skip if this section is already in our list
-                        if any(ps['section'] == section_number for ps in professor_sections):
-                            continue
-                        
-                        # Check if this section has our professor
-                        instructor_json_str = section.get('SWV_CLASS_SEARCH_INSTRCTR_JSON', None)
-                        if instructor_json_str:
-                            instructor_found = False
-                            
-                            # Parse instructor JSON if needed
-                            try:
-                                # Handle both string and object formats
-                                instructors = []
-                                if isinstance(instructor_json_str, str):
-                                    # Clean up JSON string and parse it
-                                    cleaned_json = instructor_json_str.replace('\\"', '"')
-                                    if cleaned_json.startswith('"') and cleaned_json.endswith('"'):
-                                        cleaned_json = cleaned_json[1:-1]
-                                    instructors = json.loads(cleaned_json)
-                                    if not isinstance(instructors, list):
-                                        instructors = [instructors]
-                                else:
-                                    # Direct object
-                                    if isinstance(instructor_json_str, list):
-                                        instructors = instructor_json_str
-                                    else:
-                                        instructors = [instructor_json_str]
-                                
-                                # Check each instructor in this section
-                                for instructor in instructors:
-                                    if 'NAME' in instructor:
-                                        instructor_name = instructor['NAME'].replace(' (P)', '')
-                                        instructor_last_name = extract_last_name(instructor_name).lower()
-                                        
-                                        # Check if this instructor matches our professor
-                                        if instructor_last_name in professor_last_names:
-                                            print(f"  ✓ Found match in section {section_number}: {instructor_name} (last name: {instructor_last_name})")
-                                            
-                                            # Extract meeting time information if available
-                                            meeting_info = []
-                                            try:
-                                                if section.get('SWV_CLASS_SEARCH_JSON_CLOB'):
-                                                    meeting_json = section.get('SWV_CLASS_SEARCH_JSON_CLOB')
-                                                    if isinstance(meeting_json, str):
-                                                        meeting_json = json.loads(meeting_json)
-                                                    
-                                                    if isinstance(meeting_json, list):
-                                                        for meeting in meeting_json:
-                                                            # Build day string
-                                                            days = []
-                                                            if meeting.get('SSRMEET_MON_DAY'): days.append('M')
-                                                            if meeting.get('SSRMEET_TUE_DAY'): days.append('T')
-                                                            if meeting.get('SSRMEET_WED_DAY'): days.append('W')
-                                                            if meeting.get('SSRMEET_THU_DAY'): days.append('R')
-                                                            if meeting.get('SSRMEET_FRI_DAY'): days.append('F')
-                                                            if meeting.get('SSRMEET_SAT_DAY'): days.append('S')
-                                                            if meeting.get('SSRMEET_SUN_DAY'): days.append('U')
-                                                            
-                                                            meeting_info.append({
-                                                                'days': ''.join(days) if days else 'N/A',
-                                                                'start_time': meeting.get('SSRMEET_BEGIN_TIME', 'N/A'),
-                                                                'end_time': meeting.get('SSRMEET_END_TIME', 'N/A'),
-                                                                'building': meeting.get('SSRMEET_BLDG_CODE', 'N/A'),
-                                                                'room': meeting.get('SSRMEET_ROOM_CODE', 'N/A')
-                                                            })
-                                            except Exception as meeting_err:
-                                                print(f"Error extracting meeting info for section {section_number}: {meeting_err}")
-                                            
-                                            section_info = {
-                                                'section': section_number,
-                                                'crn': crn,
-                                                'meetings': meeting_info if meeting_info else None,
-                                                'is_available': section.get('STUSEAT_OPEN', 'N') == 'Y'
-                                            }
-                                            
-                                            professor_sections.append(section_info)
-                                            instructor_found = True
-                                            break
-                            except Exception as e:
-                                # Try regex as fallback if JSON parsing fails
-                                try:
-                                    pattern = r'"NAME"\s*:\s*"([^"]+)"'
-                                    name_matches = re.findall(pattern, instructor_json_str if isinstance(instructor_json_str, str) else str(instructor_json_str))
-                                    
-                                    for raw_name in name_matches:
-                                        instructor_name = raw_name.replace(' (P)', '')
-                                        instructor_last_name = extract_last_name(instructor_name).lower()
-                                        
-                                        # Check if this instructor matches our professor
-                                        if instructor_last_name in professor_last_names:
-                                            print(f"  ✓ Found match in section {section_number} (via regex): {instructor_name} (last name: {instructor_last_name})")
-                                            
-                                            # Extract meeting time information if available
-                                            meeting_info = []
-                                            try:
-                                                if section.get('SWV_CLASS_SEARCH_JSON_CLOB'):
-                                                    meeting_json = section.get('SWV_CLASS_SEARCH_JSON_CLOB')
-                                                    if isinstance(meeting_json, str):
-                                                        meeting_json = json.loads(meeting_json)
-                                                    
-                                                    if isinstance(meeting_json, list):
-                                                        for meeting in meeting_json:
-                                                            # Build day string
-                                                            days = []
-                                                            if meeting.get('SSRMEET_MON_DAY'): days.append('M')
-                                                            if meeting.get('SSRMEET_TUE_DAY'): days.append('T')
-                                                            if meeting.get('SSRMEET_WED_DAY'): days.append('W')
-                                                            if meeting.get('SSRMEET_THU_DAY'): days.append('R')
-                                                            if meeting.get('SSRMEET_FRI_DAY'): days.append('F')
-                                                            if meeting.get('SSRMEET_SAT_DAY'): days.append('S')
-                                                            if meeting.get('SSRMEET_SUN_DAY'): days.append('U')
-                                                            
-                                                            meeting_info.append({
-                                                                'days': ''.join(days) if days else 'N/A',
-                                                                'start_time': meeting.get('SSRMEET_BEGIN_TIME', 'N/A'),
-                                                                'end_time': meeting.get('SSRMEET_END_TIME', 'N/A'),
-                                                                'building': meeting.get('SSRMEET_BLDG_CODE', 'N/A'),
-                                                                'room': meeting.get('SSRMEET_ROOM_CODE', 'N/A')
-                                                            })
-                                            except Exception as meeting_err:
-                                                print(f"Error extracting meeting info for section {section_number}: {meeting_err}")
-                                            
-                                            section_info = {
-                                                'section': section_number,
-                                                'crn': crn,
-                                                'meetings': meeting_info if meeting_info else None,
-                                                'is_available': section.get('STUSEAT_OPEN', 'N') == 'Y'
-                                            }
-                                            
-                                            professor_sections.append(section_info)
-                                            instructor_found = True
-                                            break
-                                            break
-                                except Exception as regex_err:
-                                    print(f"Error trying to extract instructor via regex: {regex_err}")
-                
-                # Log summary of all found sections
-                print(f"\nFound {len(professor_sections)} total sections for {prof_name}:")
-                for i, section in enumerate(professor_sections):
-                    print(f"  [{i+1}] Section {section['section']} (CRN: {section['crn']})")
-                
-                # Add highlighted summary of all sections
-                print("\n" + "*" * 80)
-                print(f"SECTION SUMMARY FOR PROFESSOR: {prof_name}")
-                print(f"Total Sections Found: {len(professor_sections)}")
-                print("Sections:")
-                for i, section in enumerate(professor_sections):
-                    print(f"  [{i+1}] Section {section['section']} (CRN: {section['crn']})")
-                print("*" * 80 + "\n")
-                
-                # Log professor_sections with a prominent indicator
-                print("\n")
-                print(f"🔴🔴🔴 ALL LOGGED: SECTIONS FOR PROFESSOR {prof_name} 🔴🔴🔴")
-                print("=" * 80)
-                print(f"Professor: {prof_name}")
-                print(f"Historical Last Name: {hist_last_name}")
-                print(f"Teaching Next Term: {teaching_next_term}")
-                print(f"Total Sections Found: {len(professor_sections)}")
-                print(json.dumps(professor_sections, indent=2))
-                print("=" * 80)
-                print("🔴🔴🔴 END OF PROFESSOR SECTIONS LOG 🔴🔴🔴\n")
-                
-                if len(professor_sections) > 0:
+                professor_sections = identity_sections(identities)
+                print(f"Found {len(professor_sections)} sections for {prof_name}")
+                if professor_sections:
                     professor['courses'] = professor_sections
             
             formatted_professors.append(professor)
         
-        # Now add professors from current sections that don't have historical data
-        print(f'current professors: {current_instructors}')
+        # Now add instructors of current sections that no historical professor matched
         for curr_name, curr_data in current_instructors.items():
-            # Skip if this professor already has historical data
-            if any(p['name'] == curr_name for p in formatted_professors):
+            identity = curr_data['identity']
+            if identity in matched_identities:
                 print(f"Skipping {curr_name} - already has historical data")
                 continue
-                
-            # Also check if this professor's last name matches any historical professor's last name
-            # This handles cases where the name format might be slightly different
-            curr_last_name = curr_data['last_name']
-            has_historical_data = False
-            for prof in formatted_professors:
-                if prof['last_name'].lower() == curr_last_name.lower():
-                    print(f"Skipping {curr_name} - matches historical professor {prof['name']} by last name")
-                    has_historical_data = True
-                    break
-            
-            if has_historical_data:
-                continue
             
-            # Get RateMyProfessor data
-            rmp_data = {
-                "overall_rating": None,
-                "would_take_again": None, 
-                "difficulty": None,
-                "comments": {},
-                "found": False
-            }
-            
-            if RMP_AVAILABLE:
-                try:
-                    print(f"\n===== GETTING RMP DATA for {curr_name} ({curr_data['last_name']}) =====")
-                    rmp_data = RMP.get_professor_rating(curr_data['full_name'], department)
-                    print(f"RMP data for {curr_name} ({curr_data['last_name']}): {rmp_data}")
-                except Exception as rmp_err:
-                    print(f"Error getting RMP data for {curr_name}: {rmp_err}")
+            rmp_data = rmp_rating(curr_name)
             
             professor = {
                 'name': curr_name,
@@ -1732,158 +1225,13 @@ def search_professors():
                 'term_desc': curr_data.get('term_desc', '')
             }
             
-            # COLLECT ALL SECTIONS FOR THIS PROFESSOR
-            professor_sections = []
-            
-            # DIRECT APPROACH: Check all sections from the API response
-            if 'sections' in locals() and sections:
-                print("Checking all API sections for matching instructors...")
-                
-                for section in sections:
-                    section_number = section.get('SWV_CLASS_SEARCH_SECTION', '')
-                    crn = section.get('SWV_CLASS_SEARCH_CRN', '')
-                    
-                    # Skip if this section is already in our list
-                    if any(ps['section'] == section_number for ps in professor_sections):
-                        continue
-                    
-                    # Check if this section has our professor
-                    instructor_json_str = section.get('SWV_CLASS_SEARCH_INSTRCTR_JSON', None)
-                    if instructor_json_str:
-                        instructor_found = False
-                        
-                        # Parse instructor JSON if needed
-                        try:
-                            # Handle both string and object formats
-                            instructors = []
-                            if isinstance(instructor_json_str, str):
-                                # Clean up JSON string and parse it
-                                cleaned_json = instructor_json_str.replace('\\"', '"')
-                                if cleaned_json.startswith('"') and cleaned_json.endswith('"'):
-                                    cleaned_json = cleaned_json[1:-1]
-                                instructors = json.loads(cleaned_json)
-                                if not isinstance(instructors, list):
-                                    instructors = [instructors]
-                            else:
-                                # Direct object
-                                if isinstance(instructor_json_str, list):
-                                    instructors = instructor_json_str
-                                else:
-                                    instructors = [instructor_json_str]
-                            
-                            # Check each instructor in this section
-                            for instructor in instructors:
-                                if 'NAME' in instructor:
-                                    instructor_name = instructor['NAME'].replace(' (P)', '')
-                                    instructor_last_name = extract_last_name(instructor_name).lower()
-                                    
-                                    # Check if this instructor matches our professor
-                                    if instructor_last_name == curr_data['last_name']:
-                                        print(f"  ✓ Found match in section {section_number}: {instructor_name} (last name: {instructor_last_name})")
-                                        
-                                        # Extract meeting time information if available
-                                        meeting_info = []
-                                        try:
-                                            if section.get('SWV_CLASS_SEARCH_JSON_CLOB'):
-                                                meeting_json = section.get('SWV_CLASS_SEARCH_JSON_CLOB')
-                                                if isinstance(meeting_json, str):
-                                                    meeting_json = json.loads(meeting_json)
-                                                
-                                                if isinstance(meeting_json, list):
-                                                    for meeting in meeting_json:
-                                                        # Build day string
-                                                        days = []
-                                                        if meeting.get('SSRMEET_MON_DAY'): days.append('M')
-                                                        if meeting.get('SSRMEET_TUE_DAY'): days.append('T')
-                                                        if meeting.get('SSRMEET_WED_DAY'): days.append('W')
-                                                        if meeting.get('SSRMEET_THU_DAY'): days.append('R')
-                                                        if meeting.get('SSRMEET_FRI_DAY'): days.append('F')
-                                                        if meeting.get('SSRMEET_SAT_DAY'): days.append('S')
-                                                        if meeting.get('SSRMEET_SUN_DAY'): days.append('U')
-                                                        
-                                                        meeting_info.append({
-                                                            'days': ''.join(days) if days else 'N/A',
-                                                            'start_time': meeting.get('SSRMEET_BEGIN_TIME', 'N/A'),
-                                                            'end_time': meeting.get('SSRMEET_END_TIME', 'N/A'),
-                                                            'building': meeting.get('SSRMEET_BLDG_CODE', 'N/A'),
-                                                            'room': meeting.get('SSRMEET_ROOM_CODE', 'N/A')
-                                                        })
-                                        except Exception as meeting_err:
-                                            print(f"Error extracting meeting info for section {section_number}: {meeting_err}")
-                                        
-                                        section_info = {
-                                            'section': section_number,
-                                            'crn': crn,
-                                            'meetings': meeting_info if meeting_info else None,
-                                            'is_available': section.get('STUSEAT_OPEN', 'N') == 'Y'
-                                        }
-                                        
-                                        professor_sections.append(section_info)
-                                        instructor_found = True
-                                        break
-                        except Exception as e:
-                            # Try regex as fallback if JSON parsing fails
-                            try:
-                                pattern = r'"NAME"\s*:\s*"([^"]+)"'
-                                name_matches = re.findall(pattern, instructor_json_str if isinstance(instructor_json_str, str) else str(instructor_json_str))
-                                
-                                for raw_name in name_matches:
-                                    instructor_name = raw_name.replace(' (P)', '')
-                                    instructor_last_name = extract_last_name(instructor_name).lower()
-                                    
-                                    # Check if this instructor matches our professor
-                                    if instructor_last_name == curr_data['last_name']:
-                                        print(f"  ✓ Found match in section {section_number} (via regex): {instructor_name} (last name: {instructor_last_name})")
-                                        
-                                        # Extract meeting time information if available
-                                        meeting_info = []
-                                        try:
-                                            if section.get('SWV_CLASS_SEARCH_JSON_CLOB'):
-                                                meeting_json = section.get('SWV_CLASS_SEARCH_JSON_CLOB')
-                                                if isinstance(meeting_json, str):
-                                                    meeting_json = json.loads(meeting_json)
-                                                
-                                                if isinstance(meeting_json, list):
-                                                    for meeting in meeting_json:
-                                                        # Build day string
-                                                        days = []
-                                                        if meeting.get('SSRMEET_MON_DAY'): days.append('M')
-                                                        if meeting.get('SSRMEET_TUE_DAY'): days.append('T')
-                                                        if meeting.get('SSRMEET_WED_DAY'): days.append('W')
-                                                        if meeting.get('SSRMEET_THU_DAY'): days.append('R')
-                                                        if meeting.get('SSRMEET_FRI_DAY'): days.append('F')
-                                                        if meeting.get('SSRMEET_SAT_DAY'): days.append('S')
-                                                        if meeting.get('SSRMEET_SUN_DAY'): days.append('U')
-                                                        
-                                                        meeting_info.append({
-                                                            'days': ''.join(days) if days else 'N/A',
-                                                            'start_time': meeting.get('SSRMEET_BEGIN_TIME', 'N/A'),
-                                                            'end_time': meeting.get('SSRMEET_END_TIME', 'N/A'),
-                                                            'building': meeting.get('SSRMEET_BLDG_CODE', 'N/A'),
-                                                            'room': meeting.get('SSRMEET_ROOM_CODE', 'N/A')
-                                                        })
-                                        except Exception as meeting_err:
-                                            print(f"Error extracting meeting info for section {section_number}: {meeting_err}")
-                                        
-                                        section_info = {
-                                            'section': section_number,
-                                            'crn': crn,
-                                            'meetings': meeting_info if meeting_info else None,
-                                            'is_available': section.get('STUSEAT_OPEN', 'N') == 'Y'
-                                        }
-                                        
-                                        professor_sections.append(section_info)
-                                        instructor_found = True
-                                        break
-                                        break
-                            except Exception as regex_err:
-                                print(f"Error trying to extract instructor via regex: {regex_err}")
-            
-            if len(professor_sections) > 0:
+            professor_sections = identity_sections([identity])
+            if professor_sections:
                 professor['courses'] = professor_sections
             
             formatted_professors.append(professor)
         
+        
         return jsonify({
             'professors': formatted_professors
         }), 200
@@ -1892,6 +1240,211 @@ def search_professors():
         print(f"Error searching for professors: {str(e)}")
         return jsonify({'error': f"An error occurred: {str(e)}"}), 500
 
+# Most sections one /api/sections/details request may ask for
+MAX_DETAIL_BATCH = 50
+
+@app.route('/api/sections/details', methods=['POST'])
+@require_google_auth
+def get_sections_details():
+    """
+    API endpoint to get the details of several sections at once.
+
+    Expects {"sections": [{"term": "202531", "crn": "12345"}, ...]} and streams back
+    one JSON object per line ({"term", "crn", "details"}) as each section completes.
+    """
+    data = request.json
+    if not data or not isinstance(data.get('sections'), list) or not data['sections']:
+        return jsonify({'error': 'A non-empty list of sections is required'}), 400
+    if len(data['sections']) > MAX_DETAIL_BATCH:
+        return jsonify({'error': f'At most {MAX_DETAIL_BATCH} sections can be requested at once'}), 400
+
+    pairs = []
+    for section in data['sections']:
+        if not isinstance(section, dict) or 'crn' not in section:
+            return jsonify({'error': 'Every section needs a CRN'}), 400
+        crn = str(section['crn'])
+        if not crn.isdigit():
+            return jsonify({'error': 'CRN must contain only numbers'}), 400
+        pairs.append((str(section.get('term', '202531')), crn))
+
+    def generate():
+        try:
+            for term_code, crn, details in api.iter_section_details(pairs):
+                yield json.dumps({'term': term_code, 'crn': crn, 'details': details}) + '\n'
+        except Exception as e:
+            print(f"Error streaming section details: {str(e)}")
+            yield json.dumps({'error': f"An error occurred: {str(e)}"}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/sections/history', methods=['GET'])
+@require_google_auth
+def get_section_history():
+    """API endpoint to get a section's seat history, fill rate and share of time it was open"""
+    crn = request.args.get('crn', '')
+    term_code = request.args.get('term', '202531')
+    if not crn.isdigit():
+        return jsonify({'error': 'CRN must contain only numbers'}), 400
+    try:
+        since = float(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'since must be a Unix timestamp'}), 400
+    try:
+        history = api.get_seat_history(term_code, crn, since)
+        if history is None:
+            return jsonify({'error': 'Seat history is not enabled'}), 404
+        return jsonify(dict(history, term=term_code, crn=crn)), 200
+    except Exception as e:
+        print(f"Error getting seat history: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+# Most suggestions one autocomplete request may ask for
+MAX_SUGGESTIONS = 25
+
+@app.route('/api/courses/autocomplete', methods=['GET'])
+@require_google_auth
+def autocomplete_courses():
+    """API endpoint to suggest courses for partial input like "csce 3" or "data struc" """
+    query = request.args.get('q', '').strip()
+    term_code = request.args.get('term', '202531')
+    if not query:
+        return jsonify({'courses': []}), 200
+    try:
+        limit = max(1, min(int(request.args.get('limit', DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    try:
+        suggestions = api.autocomplete_courses(term_code, query, limit)
+        return jsonify({'courses': [{
+            'subject': entry.subject,
+            'course': entry.course,
+            'title': entry.title,
+            'rank': rank
+        } for rank, entry in suggestions]}), 200
+    except Exception as e:
+        print(f"Error autocompleting courses: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+# Most CRNs a schedule request may contain
+MAX_SCHEDULE_CRNS = 20
+
+def schedule_crns(data):
+    """Validated CRN list of a schedule request, or an error message"""
+    crns = data.get('crns') if data else None
+    if not isinstance(crns, list):
+        return None, 'A list of CRNs is required'
+    if len(crns) > MAX_SCHEDULE_CRNS:
+        return None, f'At most {MAX_SCHEDULE_CRNS} CRNs can be checked at once'
+    crns = [str(crn) for crn in crns]
+    if not all(crn.isdigit() for crn in crns):
+        return None, 'CRN must contain only numbers'
+    return crns, None
+
+def schedule_section_info(section):
+    """Summary of a section for the schedule endpoints"""
+    return {
+        'crn': section.get('SWV_CLASS_SEARCH_CRN', ''),
+        'course': f"{section.get('SWV_CLASS_SEARCH_SUBJECT', '')} {section.get('SWV_CLASS_SEARCH_COURSE', '')}",
+        'section': section.get('SWV_CLASS_SEARCH_SECTION', ''),
+        'instructors': [instructor.name for instructor in section.instructors],
+        'meetings': section_meeting_info(section),
+        'is_available': section.get('STUSEAT_OPEN', 'N') == 'Y'
+    }
+
+@app.route('/api/schedule/conflicts', methods=['POST'])
+@require_google_auth
+def get_schedule_conflicts():
+    """
+    API endpoint to check a set of sections for overlapping meetings.
+
+    Expects {"term": "202531", "crns": ["12345", ...]} and returns every overlapping
+    pair with the days and times they share.
+    """
+    data = request.json
+    crns, error = schedule_crns(data)
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        conflicts, missing = api.check_conflicts(str(data.get('term', '202531')), crns)
+        return jsonify({'conflicts': [conflict_to_dict(conflict) for conflict in conflicts], 'missing': missing}), 200
+    except Exception as e:
+        print(f"Error checking schedule conflicts: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/schedule/fits', methods=['POST'])
+@require_google_auth
+def get_fitting_sections():
+    """
+    API endpoint to find the sections of a course that fit around an existing schedule.
+
+    Expects {"term": "202531", "course": "CSCE 221", "crns": [...], "open_only": true}.
+    """
+    data = request.json
+    crns, error = schedule_crns(data)
+    if error:
+        return jsonify({'error': error}), 400
+    course = str(data.get('course', '')).strip().upper()
+    if not re.match(r'^[A-Z]{2,4} \d{3}$', course):
+        return jsonify({'error': 'Course must look like "CSCE 221"'}), 400
+    try:
+        sections, missing = api.find_fitting_sections(str(data.get('term', '202531')), course, crns,
+                                                      open_only=bool(data.get('open_only', True)))
+        return jsonify({'sections': [schedule_section_info(section) for section in sections], 'missing': missing}), 200
+    except Exception as e:
+        print(f"Error finding fitting sections: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+# Most courses and schedules one /api/schedule/build request may ask for
+MAX_SCHEDULE_COURSES = 8
+MAX_SCHEDULE_RESULTS = 1000
+
+@app.route('/api/schedule/build', methods=['POST'])
+@require_google_auth
+def build_schedules():
+    """
+    API endpoint to list every conflict-free combination of sections for a set of courses.
+
+    Expects {"term": "202531", "courses": ["CSCE 221", ...], "open_only": false, "limit": 200,
+    "preferences": {"instructors": [...], "earliest": "09:00", "latest": "17:00"}} and streams
+    back one JSON object per line ({"score", "sections"}), best-scoring first where possible.
+    """
+    data = request.json
+    courses = data.get('courses') if data else None
+    if not isinstance(courses, list) or not courses:
+        return jsonify({'error': 'A non-empty list of courses is required'}), 400
+    if len(courses) > MAX_SCHEDULE_COURSES:
+        return jsonify({'error': f'At most {MAX_SCHEDULE_COURSES} courses can be scheduled at once'}), 400
+    courses = list(dict.fromkeys(str(course).strip().upper() for course in courses))
+    if not all(re.match(r'^[A-Z]{2,4} \d{3}$', course) for course in courses):
+        return jsonify({'error': 'Courses must look like "CSCE 221"'}), 400
+    try:
+        limit = max(1, min(int(data.get('limit', DEFAULT_SCHEDULE_LIMIT)), MAX_SCHEDULE_RESULTS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be a number'}), 400
+    preferences = data.get('preferences')
+    if preferences is not None and not isinstance(preferences, dict):
+        return jsonify({'error': 'preferences must be an object'}), 400
+
+    try:
+        schedules, missing = api.build_schedules(str(data.get('term', '202531')), courses,
+                                                 open_only=bool(data.get('open_only', False)), limit=limit,
+                                                 preferences=preferences)
+    except Exception as e:
+        print(f"Error building schedules: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+    if missing:
+        return jsonify({'error': f"No sections found for {', '.join(missing)}"}), 404
+
+    def generate():
+        try:
+            for sections, score in schedules:
+                yield json.dumps({'score': score, 'sections': [schedule_section_info(section) for section in sections]}) + '\n'
+        except Exception as e:
+            print(f"Error streaming schedules: {str(e)}")
+            yield json.dumps({'error': f"An error occurred: {str(e)}"}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/status', methods=['GET'])
 @require_google_auth
 def get_status():
@@ -1904,7 +1457,13 @@ def get_status():
             'modules': {
                 'anex': True,  # anex is always available
                 'rmp': RMP_AVAILABLE
-            }
+            },
+            'howdy_fetch': api.get_fetch_stats(),
+            'howdy_client': api.client.stats(),
+            'poll_scheduler': poll_scheduler.stats(alert_registry.term_counts()),
+            'fetch_planner': api.fetch_planner.stats(),
+            'mailer': mailer.stats(),
+            'notification_outbox': outbox.stats()
         }
         
         return jsonify(status), 200
@@ -1993,12 +1552,9 @@ def verify_phone():
         # Print debug info
         print(f"Sending verification code {verification_code} to {sms_email}")
         
-        # Send the email via SMTP
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(sender_email, password)
-            server.send_message(message)
-            #server.sendmail(sender_email, sms_email, message.as_string())
-            print(f"Verification code sent successfully to {sms_email}")
+        # Queue the email; the mailer sends it over a pooled SMTP connection
+        mailer.send(message)
+        print(f"Verification code queued for {sms_email}")
         
         # Store the verification details in the session or a temporary database
         verification_data = {
@@ -2471,24 +2027,9 @@ def send_sms():
         # Debug email credentials
         print(f"Using email credentials - From: {sender_email}, Password length: {len(password) if password else 0}")
         
-        # Send the email via SMTP_SSL
-        try:
-            print(f"Connecting to SMTP server: smtp.gmail.com:465")
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                print("SMTP_SSL connection established")
-                print(f"Attempting login with email: {sender_email}")
-                server.login(sender_email, password)
-                print("SMTP login successful")
-                
-                print(f"Sending message to: {sms_email}")
-                server.send_message(message_obj)
-                #server.sendmail(sender_email, sms_email, message_obj.as_string())
-                print("Message sent successfully")
-        except Exception as smtp_error:
-            print(f"SMTP ERROR: {str(smtp_error)}")
-            raise smtp_error
-        
-        print(f"SMS sent successfully to {formatted_phone}")
+        # Queue the email; the mailer sends it over a pooled SMTP connection
+        mailer.send(message_obj)
+        print(f"SMS queued for {formatted_phone}")
         
         # Log the notification
         if 'Notifications' not in db.list_collection_names():
@@ -2505,7 +2046,7 @@ def send_sms():
         print("Notification logged in database")
         
         print("===== SEND SMS ENDPOINT COMPLETED SUCCESSFULLY =====\n")
-        return jsonify({'success': True, 'message': f'SMS sent to {formatted_phone}'}), 200
+        return jsonify({'success': True, 'message': f'SMS queued for {formatted_phone}'}), 200
     
     except Exception as e:
         print(f"ERROR in send_sms: {str(e)}")
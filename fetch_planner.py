@@ -0,0 +1,141 @@
+import time
+from collections import namedtuple, deque
+from catalog_diff import is_seat_field
+
+OPEN_KEY = 'STUSEAT_OPEN'
+# Strategies: the whole course-sections dump, or one course-section-details call per watched CRN
+DUMP, TARGETED = 'dump', 'targeted'
+# Bytes worth one second of latency when adding transfer size to the measured cost
+TRANSFER_BYTES_PER_SECOND = 5 * 1024 * 1024
+# Weight of the newest measurement in the moving averages
+COST_SMOOTHING = 0.3
+# Estimates of one details call until it has been measured
+DEFAULT_DETAIL_LATENCY = 0.3
+DEFAULT_DETAIL_BYTES = 4 * 1024
+# Targeted must cost less than this share of a dump to switch to it, and more than a dump to switch back
+SWITCH_MARGIN = 0.8
+# Seconds after which a targeted term gets a full dump anyway, to pick up new sections and seat counts
+FULL_REFRESH_INTERVAL = 15 * 60
+# Decisions kept for inspection
+DECISION_LOG_SIZE = 100
+
+# One term's decision; costs are in seconds of latency plus transfer time, None while unmeasured
+FetchPlan = namedtuple('FetchPlan', ['term_code', 'strategy', 'crns', 'dump_cost', 'targeted_cost', 'reason'])
+
+
+def seat_state(general_info):
+    """Open state of a section from its course-section-details payload, or None if it has no seat fields."""
+    if OPEN_KEY in general_info:
+        return general_info[OPEN_KEY] == 'Y'
+    for key, value in general_info.items():
+        if is_seat_field(key) and ('AVAIL' in key or 'REM' in key):
+            try:
+                return int(value) > 0
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def _smooth(previous, value):
+    return value if previous is None else COST_SMOOTHING * value + (1 - COST_SMOOTHING) * previous
+
+
+class FetchPlanner:
+    """
+    Chooses per term and refresh between downloading the whole course-sections dump
+    and asking course-section-details for each watched CRN.
+
+    The dump's cost is measured per term and the cost of one details call across all
+    terms (both as moving averages of latency plus bytes / TRANSFER_BYTES_PER_SECOND),
+    so the choice follows from the number of distinct watched CRNs: a term watched
+    for a handful of sections is polled section by section, and moves back to the dump
+    as its alerts grow. A margin around the break-even point keeps a term from
+    flapping. A term is always dumped when it has no loaded baseline yet, every
+    FULL_REFRESH_INTERVAL, and once details payloads turn out to carry no seat state.
+    """
+
+    def __init__(self):
+        # {term_code: {'latency', 'bytes', 'fetched_at'}}
+        self.dumps = {}
+        self.detail_latency = None
+        self.detail_bytes = None
+        self.detail_calls = 0
+        self.targeted_supported = True
+        # {term_code: strategy of its last plan}
+        self.strategies = {}
+        self.decisions = deque(maxlen=DECISION_LOG_SIZE)
+
+    @staticmethod
+    def _cost(latency, size):
+        return latency + size / TRANSFER_BYTES_PER_SECOND
+
+    def observe_dump(self, term_code, size, latency):
+        """Record a completed course-sections download (bytes, seconds including decoding)."""
+        dump = self.dumps.setdefault(term_code, {'latency': None, 'bytes': None, 'fetched_at': None})
+        dump['latency'] = _smooth(dump['latency'], latency)
+        dump['bytes'] = _smooth(dump['bytes'], size)
+        dump['fetched_at'] = time.time()
+
+    def observe_detail(self, size, latency):
+        """Record one course-section-details call."""
+        self.detail_latency = _smooth(self.detail_latency, latency)
+        self.detail_bytes = _smooth(self.detail_bytes, size)
+        self.detail_calls += 1
+
+    def dump_cost(self, term_code):
+        dump = self.dumps.get(term_code)
+        if dump is None or dump['latency'] is None:
+            return None
+        return self._cost(dump['latency'], dump['bytes'])
+
+    def detail_cost(self):
+        return self._cost(self.detail_latency if self.detail_latency is not None else DEFAULT_DETAIL_LATENCY,
+                          self.detail_bytes if self.detail_bytes is not None else DEFAULT_DETAIL_BYTES)
+
+    def plan(self, term_code, crns, loaded, now=None):
+        """
+        Decide how to refresh one term.
+
+        Args:
+            term_code (str): Term to refresh
+            crns (iterable): Watched CRNs of the term
+            loaded (bool): Whether the term has an availability map to update in place
+
+        Returns:
+            FetchPlan
+        """
+        now = now or time.time()
+        crns = sorted(set(crns))
+        dump_cost = self.dump_cost(term_code)
+        targeted_cost = len(crns) * self.detail_cost()
+        fetched_at = self.dumps.get(term_code, {}).get('fetched_at')
+
+        if not loaded or dump_cost is None:
+            strategy, reason = DUMP, 'no baseline'
+        elif not self.targeted_supported:
+            strategy, reason = DUMP, 'details carry no seat state'
+        elif fetched_at is None or now - fetched_at >= FULL_REFRESH_INTERVAL:
+            strategy, reason = DUMP, 'periodic full refresh'
+        elif self.strategies.get(term_code) == TARGETED:
+            strategy = TARGETED if targeted_cost <= dump_cost else DUMP
+            reason = 'cheaper' if strategy == TARGETED else 'watched CRNs outgrew targeted'
+        else:
+            strategy = TARGETED if targeted_cost < dump_cost * SWITCH_MARGIN else DUMP
+            reason = 'cheaper' if strategy == TARGETED else 'dump cheaper'
+
+        self.strategies[term_code] = strategy
+        plan = FetchPlan(term_code, strategy, crns, dump_cost, targeted_cost, reason)
+        self.decisions.append({'at': now, 'term': term_code, 'strategy': strategy, 'watched_crns': len(crns),
+                               'dump_cost': dump_cost, 'targeted_cost': targeted_cost, 'reason': reason})
+        return plan
+
+    def stats(self):
+        """Measured costs, each term's current strategy and the recent decisions, newest last."""
+        return {
+            'targeted_supported': self.targeted_supported,
+            'detail': {'avg_latency': self.detail_latency, 'avg_bytes': self.detail_bytes,
+                       'calls': self.detail_calls, 'cost': self.detail_cost()},
+            'dumps': {term_code: dict(dump, cost=self.dump_cost(term_code)) for term_code, dump in self.dumps.items()},
+            'strategies': dict(self.strategies),
+            'decisions': list(self.decisions),
+        }
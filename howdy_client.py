@@ -0,0 +1,305 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import aiohttp
+
+# Maximum number of requests in flight against Howdy at once
+MAX_CONCURRENT_REQUESTS = 4
+# Seconds before a single request (e.g. one term's course-sections dump) is abandoned
+REQUEST_TIMEOUT = 45
+# Bytes read from the socket at a time when streaming a response body
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Token bucket: steady requests per second, burst size, and the floor the rate backs off to
+REQUESTS_PER_SECOND = 20
+REQUEST_BURST = 20
+MIN_REQUESTS_PER_SECOND = 1
+# Retries after the first attempt, with full-jitter exponential backoff between them
+RETRY_ATTEMPTS = 2
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8
+# Consecutive failures that open the circuit, and seconds before a trial request is let through
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+
+class HowdyUnavailable(Exception):
+    """Raised without contacting Howdy while the circuit breaker is open."""
+
+
+class _PartialResponse(Exception):
+    """A streamed body failed after some of it was handed out, so it cannot be retried."""
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for the client loop that adapts to upstream health:
+    the rate halves on every failed attempt and creeps back up on successes.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=REQUEST_BURST, min_rate=MIN_REQUESTS_PER_SECOND):
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def slow_down(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """
+    Fails fast once Howdy has failed threshold times in a row. After reset_timeout
+    seconds a single trial request is let through; its outcome closes or re-opens
+    the circuit.
+    """
+
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def allow(self):
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+        if self.state == 'half_open' and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def end_trial(self):
+        """Forget a trial request that ended without telling us anything about Howdy."""
+        self._trial_running = False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.threshold:
+            if self.state != 'open':
+                print(f"Howdy circuit open after {self.failures} consecutive failures")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+
+class HowdyClient:
+    """
+    Shared, pooled HTTP client for howdy.tamu.edu.
+
+    The client owns a private event loop running on a daemon thread and one
+    keep-alive aiohttp session on that loop, so synchronous callers (Howdy_API,
+    Flask views) and async callers (the monitor loop) all reuse the same
+    connection pool.
+
+    Every request is paced by an adaptive TokenBucket, retried with jittered
+    exponential backoff on timeouts, connection errors, 429 and 5xx, and refused
+    with HowdyUnavailable while the CircuitBreaker is open. Per-endpoint latency
+    and error counters are available from stats().
+
+    Args:
+        max_concurrency (int): Cap on simultaneous upstream requests
+        timeout (int): Default per-request timeout in seconds
+        retries (int): Retries after the first attempt
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_REQUESTS, timeout=REQUEST_TIMEOUT, retries=RETRY_ATTEMPTS):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.bucket = TokenBucket()
+        self.breaker = CircuitBreaker()
+        self.endpoint_stats = {}
+        self.loop = asyncio.new_event_loop()
+        self._session = None
+        self._semaphore = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name='howdy-client', daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the client loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def run_async(self, coro):
+        """Run a coroutine on the client loop from another event loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _stats_for(self, url):
+        endpoint = urlsplit(url).path
+        if endpoint not in self.endpoint_stats:
+            self.endpoint_stats[endpoint] = {'requests': 0, 'errors': 0, 'retries': 0, 'rejected': 0,
+                                             'total_latency': 0.0, 'max_latency': 0.0}
+        return self.endpoint_stats[endpoint]
+
+    async def _send(self, url, attempt):
+        """
+        Run attempt(session) under the rate limit, retry policy and circuit breaker.
+
+        Returns:
+            tuple: (status code, body) of the first healthy response, or of the last
+                   attempt if every attempt got a 429/5xx
+        """
+        stats = self._stats_for(url)
+        session = await self._get_session()
+        for attempt_number in range(self.retries + 1):
+            if not self.breaker.allow():
+                stats['rejected'] += 1
+                raise HowdyUnavailable(f"Howdy circuit is open, not requesting {urlsplit(url).path}")
+
+            error = None
+            try:
+                await self.bucket.acquire()
+                started = time.monotonic()
+                async with self._semaphore:
+                    status, body = await attempt(session)
+            except (asyncio.TimeoutError, aiohttp.ClientError, _PartialResponse) as e:
+                error = e
+            except BaseException:
+                # Not Howdy's fault (e.g. on_chunk raised, or the caller was cancelled)
+                self.breaker.end_trial()
+                raise
+            latency = time.monotonic() - started
+            stats['requests'] += 1
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+
+            if error is None and status != 429 and status < 500:
+                self.breaker.record_success()
+                self.bucket.speed_up()
+                return status, body
+
+            stats['errors'] += 1
+            self.breaker.record_failure()
+            self.bucket.slow_down()
+            if isinstance(error, _PartialResponse):
+                raise error.__cause__
+            if attempt_number == self.retries:
+                if error is not None:
+                    raise error
+                return status, body
+            stats['retries'] += 1
+            await asyncio.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt_number)))
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        """
+        Perform a single request through the shared pool.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            timeout (int): Per-request timeout in seconds, defaults to the client timeout
+            **kwargs: Passed through to aiohttp (json=..., params=...)
+
+        Returns:
+            tuple: (status code, response body as text)
+
+        Raises:
+            HowdyUnavailable: If the circuit breaker is open
+        """
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+        async def attempt(session):
+            async with session.request(method, url, timeout=client_timeout, **kwargs) as res:
+                return res.status, await res.text()
+
+        return await self._send(url, attempt)
+
+    async def stream(self, method, url, on_chunk, timeout=None, chunk_size=STREAM_CHUNK_SIZE, **kwargs):
+        """
+        Perform a request and hand a successful response body to on_chunk piece by piece
+        instead of buffering it. A failure before the first chunk is retried like
+        request(); one after it is raised, since on_chunk has already seen part of the body.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            on_chunk (callable): Called with each chunk of bytes of a 200 response; if it returns an
+                                 awaitable, it is awaited before the next chunk is read
+            timeout (int): Per-request timeout in seconds, defaults to the client timeout
+            chunk_size (int): Maximum bytes per chunk
+            **kwargs: Passed through to aiohttp (json=..., params=...)
+
+        Returns:
+            tuple: (status code, None) when the body was streamed, otherwise (status code, body as text)
+
+        Raises:
+            HowdyUnavailable: If the circuit breaker is open
+        """
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+        async def attempt(session):
+            async with session.request(method, url, timeout=client_timeout, **kwargs) as res:
+                if res.status != 200:
+                    return res.status, await res.text()
+                delivered = False
+                try:
+                    async for chunk in res.content.iter_chunked(chunk_size):
+                        delivered = True
+                        result = on_chunk(chunk)
+                        if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                            await result
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    if delivered:
+                        raise _PartialResponse() from e
+                    raise
+                return res.status, None
+
+        return await self._send(url, attempt)
+
+    def stats(self):
+        """
+        Per-endpoint counters plus the limiter and breaker state.
+
+        Returns:
+            dict: {'endpoints': {path: counters and avg_latency}, 'rate_limit', 'circuit'}
+        """
+        endpoints = {}
+        for endpoint, counters in list(self.endpoint_stats.items()):
+            endpoint_stats = dict(counters)
+            endpoint_stats['avg_latency'] = counters['total_latency'] / counters['requests'] if counters['requests'] else 0.0
+            endpoints[endpoint] = endpoint_stats
+        return {
+            'endpoints': endpoints,
+            'rate_limit': round(self.bucket.rate, 2),
+            'circuit': self.breaker.state,
+        }
+
+    def close(self):
+        """Close the pooled session and stop the client loop."""
+        async def _close():
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+        self.run(_close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
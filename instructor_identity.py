@@ -0,0 +1,137 @@
+import re
+import unicodedata
+from collections import namedtuple
+
+# Name parts that are not the last name
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'phd', 'md'}
+ANEX_NAME = re.compile(r'^([A-Za-z\'\- ]+?)\s+([A-Za-z])$')
+
+# key is "last first-initial", e.g. "smith j"; first_initial is '' when the source gave none
+NameKey = namedtuple('NameKey', ['key', 'last_name', 'first_initial'])
+
+
+def _fold(text):
+    """Lowercase ASCII with accents, apostrophes and periods removed"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r"['.]", '', text.lower()).strip()
+
+
+def name_key(name):
+    """
+    Canonical NameKey of an instructor name from any of our sources:
+    Howdy ("First M. Last (P)"), anex ("LAST F") or RateMyProfessors ("First Last").
+    """
+    name = (name or '').replace('(P)', '').strip()
+    if ',' in name:
+        last, _, first = name.partition(',')
+        name = f"{first.strip()} {last.strip()}"
+    anex = ANEX_NAME.match(name)
+    if anex and anex.group(1).isupper():
+        # Multi-word last names keep their final word, like the Howdy form below
+        last, first_initial = _fold(anex.group(1)).split()[-1], _fold(anex.group(2))
+    else:
+        parts = [part for part in re.split(r'\s+', _fold(name)) if part and part not in NAME_SUFFIXES]
+        if not parts:
+            return NameKey('', '', '')
+        last = parts[-1]
+        first_initial = parts[0][0] if len(parts) > 1 else ''
+    return NameKey(f"{last} {first_initial}".strip(), last, first_initial)
+
+
+class InstructorIdentity:
+    """
+    One instructor of a term, merged from every name and pidm Howdy shows for them.
+
+    Attributes:
+        key (str): Canonical "last first-initial" key
+        last_name (str), first_initial (str): Parts of the key
+        name (str): Display name as Howdy gives it, without " (P)"
+        aliases (set): Every raw name seen for this instructor
+        pidms (set): Howdy pidms (the MORE field)
+        sections (list): Catalog row indexes the instructor teaches
+    """
+
+    __slots__ = ('key', 'last_name', 'first_initial', 'name', 'aliases', 'pidms', 'sections', 'cv_url')
+
+    def __init__(self, name_key, name):
+        self.key, self.last_name, self.first_initial = name_key
+        self.name = name
+        self.aliases = set()
+        self.pidms = set()
+        self.sections = []
+        self.cv_url = None
+
+    def __repr__(self):
+        return f"InstructorIdentity({self.key!r}, {self.name!r}, pidms={sorted(map(str, self.pidms))})"
+
+
+class InstructorIndex:
+    """
+    Instructor identities of one term, built once per catalog.
+
+    Instructors are merged by Howdy pidm first and by canonical name key otherwise,
+    so "John A. Smith" and "John Smith" with the same pidm are one person, while two
+    Smiths with different first initials (or different pidms) stay apart. Matching a
+    grade, section or RMP name against the term is then a dict lookup on its name key.
+
+    Args:
+        catalog (SectionCatalog): Term to index; kept so callers can tell when it is stale
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.by_key = {}
+        self.by_pidm = {}
+        self.by_last_name = {}
+        # {(raw_name, pidm): identity}; one displayed name can belong to several people
+        self._by_record = {}
+
+        # Every (raw name, pidm) pair and the sections it appears on, from all of the name's sections
+        records = {}
+        for raw_name, indexes in catalog.instructor_index.items():
+            for index in indexes:
+                for instructor in catalog.instructors(index):
+                    if instructor.raw_name == raw_name:
+                        record = records.setdefault((raw_name, instructor.pidm), [instructor, []])
+                        record[1].append(index)
+
+        for (raw_name, pidm), (instructor, indexes) in records.items():
+            identity = self.by_pidm.get(pidm) if pidm is not None else None
+            if identity is None:
+                key = name_key(instructor.name)
+                # Same name key: merge unless both sides have a pidm and they differ
+                identity = next((candidate for candidate in self.by_key.get(key.key, ())
+                                 if pidm is None or not candidate.pidms), None)
+                if identity is None:
+                    identity = InstructorIdentity(key, instructor.name)
+                    self.by_key.setdefault(key.key, []).append(identity)
+                    self.by_last_name.setdefault(key.last_name, []).append(identity)
+            if pidm is not None:
+                self.by_pidm.setdefault(pidm, identity)
+                identity.pidms.add(pidm)
+            identity.aliases.add(raw_name)
+            identity.cv_url = identity.cv_url or instructor.cv_url
+            identity.sections.extend(indexes)
+            self._by_record[(raw_name, pidm)] = identity
+
+        for identities in self.by_key.values():
+            for identity in identities:
+                identity.sections = sorted(set(identity.sections))
+
+    def identity_of(self, instructor):
+        """The identity of an Instructor record from this catalog, or None."""
+        return self._by_record.get((instructor.raw_name, instructor.pidm))
+
+    def match(self, name):
+        """
+        Identities a name from another source (anex, RMP, user input) refers to.
+
+        A name with a first initial only matches that initial; a bare last name
+        matches every instructor with it.
+        """
+        key = name_key(name)
+        if not key.last_name:
+            return []
+        if key.first_initial:
+            return list(self.by_key.get(key.key, ()))
+        return list(self.by_last_name.get(key.last_name, ()))
@@ -0,0 +1,119 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a top-level JSON array.
+
+    Bytes are fed in as they arrive from the network and every element is handed to
+    on_item as soon as it has been fully received, so the whole document never has
+    to sit in memory as one string or one list. Only the element currently being
+    received is buffered.
+
+    Args:
+        on_item (callable): Called with each decoded element, in order
+        encoding (str): Character encoding of the fed bytes
+        raw (bool): Also pass each element's source text, as on_item(item, text)
+    """
+
+    def __init__(self, on_item, encoding='utf-8', raw=False):
+        self.on_item = on_item
+        self.raw = raw
+        self.count = 0
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._done = False
+
+    def _skip_whitespace(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def _parse(self, final):
+        while not self._done:
+            self._skip_whitespace()
+            if self._pos >= len(self._buffer):
+                return
+
+            if not self._started:
+                if self._buffer[self._pos] != '[':
+                    raise self._error('Expecting a JSON array')
+                self._started = True
+                self._pos += 1
+                continue
+
+            if self.count == 0 and self._buffer[self._pos] == ']':
+                self._pos += 1
+                self._done = True
+                return
+
+            try:
+                item, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                return  # element not fully received yet
+
+            # Only accept the element once its separator has arrived, so a number
+            # split across two chunks is not taken for a shorter one
+            separator = end
+            while separator < len(self._buffer) and self._buffer[separator] in _WHITESPACE:
+                separator += 1
+            if separator >= len(self._buffer):
+                if final:
+                    raise self._error("Expecting ',' delimiter or ']'")
+                return
+            if self._buffer[separator] not in ',]':
+                if not final and isinstance(item, (int, float)):
+                    return  # e.g. '-1.' of '-1.5' parsed as -1
+                self._pos = separator
+                raise self._error("Expecting ',' delimiter or ']'")
+
+            start, self._pos = self._pos, separator + 1
+            self._done = self._buffer[separator] == ']'
+            self.count += 1
+            if self.raw:
+                self.on_item(item, self._buffer[start:end])
+            else:
+                self.on_item(item)
+
+    def feed(self, chunk):
+        """Add the next chunk of bytes and emit every element it completes."""
+        text = self._decoder.decode(chunk)
+        if self._done:
+            if text.strip(_WHITESPACE):
+                raise self._error('Extra data')
+            return
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        self._parse(final=False)
+
+    def close(self):
+        """
+        Signal the end of the input.
+
+        Returns:
+            int: Number of elements emitted
+
+        Raises:
+            json.JSONDecodeError: If the input was not one complete JSON array
+        """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        self._parse(final=True)
+        self._skip_whitespace()
+        if not self._done:
+            raise self._error('Unterminated JSON array')
+        if self._pos < len(self._buffer):
+            raise self._error('Extra data')
+        return self.count
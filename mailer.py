@@ -0,0 +1,189 @@
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 465  # SSL
+# Persistent connections, one per worker thread
+MAILER_POOL_SIZE = 2
+# Attempts per message; each failed attempt drops and reopens the connection
+MAX_SEND_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1
+# Seconds a connection may sit unused before it is closed (Gmail drops idle sessions anyway)
+IDLE_TIMEOUT = 4 * 60
+# Seconds of idleness after which a connection is checked with NOOP before use
+NOOP_AFTER = 30
+CONNECT_TIMEOUT = 20
+
+
+class Mailer:
+    """
+    Sends email through a small pool of persistent, logged-in SMTP connections.
+
+    send() puts the message on a queue and returns a Future right away; worker threads,
+    each holding one connection, drain the queue. A connection is opened and logged in
+    on first use, checked with NOOP after NOOP_AFTER idle seconds, closed after
+    IDLE_TIMEOUT, and replaced whenever a send fails, with the message retried up to
+    MAX_SEND_ATTEMPTS times. Refused recipients and non-SMTP errors are not retried,
+    but like every failure they are set on the message's Future.
+
+    Args:
+        username (str), password (str): SMTP login, normally the sender address
+        pool_size (int): Number of connections and worker threads
+    """
+
+    def __init__(self, username, password, host=SMTP_HOST, port=SMTP_PORT, pool_size=MAILER_POOL_SIZE):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self._queue = queue.Queue()
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'connects': 0,
+                       'total_latency': 0.0, 'max_latency': 0.0, 'total_send_time': 0.0, 'last_error': None}
+
+    def _start(self):
+        with self._start_lock:
+            if self._workers:
+                return
+            for i in range(self.pool_size):
+                worker = threading.Thread(target=self._work, name=f"mailer-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def send(self, message):
+        """
+        Queue an EmailMessage for delivery.
+
+        Returns:
+            Future: Resolves to the send latency in seconds (queueing included), or raises the last SMTP error
+        """
+        self._start()
+        future = Future()
+        with self._stats_lock:
+            self._stats['queued'] += 1
+        self._queue.put((message, future, time.monotonic()))
+        return future
+
+    def _count(self, **changes):
+        with self._stats_lock:
+            for key, value in changes.items():
+                self._stats[key] += value
+
+    def _connect(self):
+        server = smtplib.SMTP_SSL(self.host, self.port, timeout=CONNECT_TIMEOUT)
+        try:
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._count(connects=1)
+        return server
+
+    @staticmethod
+    def _close(server):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _alive(server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _work(self):
+        server = None
+        last_used = 0
+        while True:
+            try:
+                message, future, queued_at = self._queue.get(timeout=IDLE_TIMEOUT)
+            except queue.Empty:
+                self._close(server)
+                server = None
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            error = None
+            for attempt in range(MAX_SEND_ATTEMPTS):
+                try:
+                    if server is not None and time.monotonic() - last_used > NOOP_AFTER and not self._alive(server):
+                        self._close(server)
+                        server = None
+                    if server is None:
+                        server = self._connect()
+                    started = time.monotonic()
+                    server.send_message(message)
+                    last_used = time.monotonic()
+                    error = None
+                    break
+                except smtplib.SMTPRecipientsRefused as e:
+                    # The connection is fine; retrying will not help
+                    error = e
+                    break
+                except Exception as e:
+                    # SMTP and socket errors, but also anything else (e.g. a malformed message):
+                    # the future must be resolved and this worker must survive either way
+                    error = e
+                    self._close(server)
+                    server = None
+                    if not isinstance(e, (smtplib.SMTPException, OSError)):
+                        break
+                    if attempt + 1 < MAX_SEND_ATTEMPTS:
+                        self._count(retries=1)
+                        time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+
+            try:
+                if error is None:
+                    latency = last_used - queued_at
+                    with self._stats_lock:
+                        self._stats['sent'] += 1
+                        self._stats['total_latency'] += latency
+                        self._stats['total_send_time'] += last_used - started
+                        self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+                    future.set_result(latency)
+                else:
+                    print(f"Failed to send email to {message.get('To')}: {error}")
+                    with self._stats_lock:
+                        self._stats['failed'] += 1
+                        self._stats['last_error'] = str(error)
+                    future.set_exception(error)
+            except Exception as e:
+                print(f"Mailer worker could not report a send result: {e}")
+                if not future.done():
+                    future.set_exception(e)
+
+    def stats(self):
+        """Counters plus queue depth, average latency (queued to sent) and average SMTP send time."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_latency'] = stats['total_latency'] / stats['sent'] if stats['sent'] else 0.0
+        stats['avg_send_time'] = stats['total_send_time'] / stats['sent'] if stats['sent'] else 0.0
+        return stats
+
+
+_default_mailer = None
+_default_lock = threading.Lock()
+
+
+def get_mailer():
+    """The process-wide Mailer, logged in with the sender_email / password environment variables."""
+    global _default_mailer
+    with _default_lock:
+        if _default_mailer is None:
+            password = os.getenv('password')
+            _default_mailer = Mailer(os.getenv('sender_email'), password.strip() if password else '')
+        return _default_mailer
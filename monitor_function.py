@@ -5,9 +5,11 @@ import json
 import requests
 from dotenv import load_dotenv
 from pymongo import MongoClient
-import smtplib
+import threading
+from email.message import EmailMessage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from mailer import get_mailer
 
 print("MONITOR_FUNCTION.PY IS BEING USED")
 
@@ -29,6 +31,36 @@ email_collection = db['Emails']
 
 running = True
 
+# Notifications go out through the shared pool of persistent SMTP connections
+mailer = get_mailer()
+# Ids of alerts whose notification is queued in the mailer
+pending_notifications = set()
+pending_lock = threading.Lock()
+
+def alerts_notified(email, available_crns, via_sms):
+    """Done-callback for a queued notification email: deactivate its alerts if it was sent, else let them retry."""
+    def done(future):
+        try:
+            if future.exception() is not None:
+                print(f"❌ Failed to send email to {email}: {future.exception()}")
+                return
+            print(f"✅ Email sent successfully to {email}!")
+            # Deactivate alerts after successful notification
+            for alert in available_crns:
+                result = collection.update_one(
+                    {'_id': alert['id'], 'active': True},
+                    {'$set': {'active': False, 'notified': True, 'notified_at': time.time(), 'notified_via_sms': via_sms,
+                              'updated_at': time.time()}}
+                )
+                print(f"Deactivated alert for CRN {alert['crn']} (Term {alert['term']}) for {email} - Modified: {result.modified_count}")
+        except Exception as e:
+            print(f"Failed to deactivate notified alerts for {email}: {e}")
+        finally:
+            with pending_lock:
+                pending_notifications.difference_update(alert['id'] for alert in available_crns)
+
+    return done
+
 async def monitor_crns(interval=60):
     """
     Background task to continuously monitor CRNs in the database.
@@ -61,8 +93,8 @@ async def monitor_crns(interval=60):
                 await asyncio.sleep(interval)
                 continue
             
-            # Get the availability for all terms
-            availability = howdy_api.get_availability()
+            # Get the availability for every term with an active alert
+            availability = howdy_api.get_availability({alert['Term'] for alert in active_alerts})
             timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
             
             print(f"\n---------- ALERT PROCESSING CYCLE: {timestamp} ----------")
@@ -101,15 +133,18 @@ async def monitor_crns(interval=60):
                     # Update the status in the database
                     collection.update_one(
                         {'CRN': crn, 'Term': term_code, 'active': True},
-                        {'$set': {'status': status, 'last_checked': time.time()}}
+                        {'$set': {'status': status, 'last_checked': time.time(), 'updated_at': time.time()}}
                     )
                     
                     # Group by email for notifications - send email when course is available
-                    if email and status:
+                    with pending_lock:
+                        pending = alert['_id'] in pending_notifications
+                    if email and status and not pending:
                         if email not in alerts_by_email:
                             alerts_by_email[email] = []
                         
                         alerts_by_email[email].append({
+                            'id': alert['_id'],
                             'crn': crn,
                             'term': term_code,
                             'status': status
@@ -185,81 +220,43 @@ async def monitor_crns(interval=60):
                                 else:
                                     print(f"Phone number doesn't have enough digits: {phone_number}")
                             
-                            # SIMPLIFIED EMAIL SENDING - using same approach as phone verification
-                            try:
-                                # Create simple message
-                                from email.message import EmailMessage
-                                msg = EmailMessage()
-                                msg.set_content(body)
-                                msg["Subject"] = subject
-                                msg["From"] = sender_email
-                                msg["To"] = email
-                                
-                                # Print debug info
-                                print(f"Preparing to send email to {email}")
-                                print(f"Subject: {subject}")
-                                print(f"Body (preview): {body[:100]}...")
-                                
-                                # Send using basic settings
-                                smtp_server = "smtp.gmail.com"
-                                port = 587  # Using TLS instead of SSL for better compatibility
-                                
-                                import smtplib
-                                server = smtplib.SMTP(smtp_server, port)
-                                server.ehlo()  # Can be omitted
-                                server.starttls()  # Secure the connection
-                                server.ehlo()  # Can be omitted
-                                server.login(sender_email, password)
-                                server.send_message(msg)
-                                
-                                # If we have an SMS recipient, send a second email to the SMS gateway
-                                if sms_recipient:
-                                    # Create more concise content for SMS
-                                    sms_content = ""
-                                    
-                                    # Add CRNs to the message
-                                    crn_list = [alert['crn'] for alert in available_crns]
-                                    
-                                    # Create SMS message
-                                    sms_msg = EmailMessage()
-                                    
-                                    # Simplify SMS content to be just "CRN [number] is available"
-                                    if len(crn_list) == 1:
-                                        sms_content = f"CRN {crn_list[0]} is available"
-                                    else:
-                                        # For multiple CRNs, list each one on a separate line
-                                        sms_content = "\n".join([f"CRN {crn} is available" for crn in crn_list])
-                                    
-                                    sms_msg.set_content(sms_content)
-                                    sms_msg["Subject"] = "Aggie Class Alert"  # Set subject as requested
-                                    sms_msg["From"] = sender_email
-                                    sms_msg["To"] = sms_recipient
-                                    
-                                    print(f"Also sending SMS to {sms_recipient}")
-                                    print(f"SMS subject: Aggie Class Alert")
-                                    print(f"SMS content: {sms_content}")
-                                    
-                                    # Send the SMS message
-                                    server.send_message(sms_msg)
-                                    print(f"✅ SMS sent successfully to {sms_recipient}!")
+                            # Create simple message
+                            msg = EmailMessage()
+                            msg.set_content(body)
+                            msg["Subject"] = subject
+                            msg["From"] = sender_email
+                            msg["To"] = email
+                            
+                            # Print debug info
+                            print(f"Queueing email to {email}")
+                            print(f"Subject: {subject}")
+                            print(f"Body (preview): {body[:100]}...")
+                            
+                            # The alerts are deactivated once the email is out; until then they are not notified again
+                            with pending_lock:
+                                pending_notifications.update(alert['id'] for alert in available_crns)
+                            mailer.send(msg).add_done_callback(alerts_notified(email, available_crns, sms_recipient is not None))
+                            
+                            # If we have an SMS recipient, send a second email to the SMS gateway
+                            if sms_recipient:
+                                # Simplify SMS content to be just "CRN [number] is available"
+                                crn_list = [alert['crn'] for alert in available_crns]
+                                if len(crn_list) == 1:
+                                    sms_content = f"CRN {crn_list[0]} is available"
+                                else:
+                                    # For multiple CRNs, list each one on a separate line
+                                    sms_content = "\n".join([f"CRN {crn} is available" for crn in crn_list])
                                 
-                                server.quit()
-                                print(f"✅ Email sent successfully to {email}!")
+                                # Create SMS message
+                                sms_msg = EmailMessage()
+                                sms_msg.set_content(sms_content)
+                                sms_msg["Subject"] = "Aggie Class Alert"  # Set subject as requested
+                                sms_msg["From"] = sender_email
+                                sms_msg["To"] = sms_recipient
                                 
-                                # Deactivate alerts after successful notification
-                                for alert in available_crns:
-                                    crn = alert['crn']
-                                    term = alert['term']
-                                    result = collection.update_one(
-                                        {'CRN': crn, 'Term': term, 'email': email, 'active': True},
-                                        {'$set': {'active': False, 'notified': True, 'notified_at': time.time(), 'notified_via_sms': sms_recipient is not None}}
-                                    )
-                                    print(f"Deactivated alert for CRN {crn} (Term {term}) for {email} - Modified: {result.modified_count}")
-                                    
-                            except Exception as e:
-                                print(f"❌ Failed to send email: {str(e)}")
-                                import traceback
-                                traceback.print_exc()
+                                print(f"Also queueing SMS to {sms_recipient}")
+                                print(f"SMS content: {sms_content}")
+                                mailer.send(sms_msg)
                         except Exception as e:
                             print(f"❌ Failed to send email to {email}: {e}")
             else:
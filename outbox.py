@@ -0,0 +1,247 @@
+import random
+import threading
+import time
+import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+# Threads delivering notification jobs
+OUTBOX_WORKERS = 2
+# Delivery attempts before a job is given up on
+MAX_DELIVERY_ATTEMPTS = 6
+# Backoff after the n-th failure: uniform(0.5, 1) * min(MAX_BACKOFF, BASE_BACKOFF * 2 ** n) seconds
+BASE_BACKOFF = 30
+MAX_BACKOFF = 60 * 60
+# Seconds a claimed job is reserved for its worker; after that another worker may retry it
+CLAIM_LEASE = 5 * 60
+# Seconds an idle worker waits before looking for due jobs again
+OUTBOX_POLL_INTERVAL = 2
+# Seconds a delivery waits for the mailer
+SEND_TIMEOUT = 2 * 60
+# Seconds a failed job waits before it is re-armed for an alert that is still open
+REARM_AFTER = MAX_BACKOFF
+# Failed jobs listed in stats()
+RECENT_FAILURES = 10
+
+PENDING, SENDING, SENT, FAILED, CANCELLED = 'pending', 'sending', 'sent', 'failed', 'cancelled'
+
+
+def notification_key(alert):
+    """Idempotency key of one seat opening for one alert: its id plus when the opening was seen."""
+    return f"{alert['_id']}:{alert.get('opened_at') or 0}"
+
+
+class NotificationOutbox:
+    """
+    Durable queue of "your section opened" notifications in a MongoDB collection.
+
+    The monitor only enqueues: one job per alert and opening, keyed by notification_key()
+    so the same opening is never queued twice, whichever process or cycle sees it. Worker
+    threads claim due jobs with a lease, group the recipient's other due jobs into the
+    same email, deliver it through the mailer and then, in this order, mark the jobs sent
+    and deactivate their alerts with one conditional update_many. Sent jobs whose alerts
+    were not marked yet (e.g. after a crash) are reconciled whenever a worker is idle.
+    Failed deliveries are retried with exponential backoff and jitter until
+    MAX_DELIVERY_ATTEMPTS, after which the job is failed; the monitor keeps enqueueing
+    open alerts, which re-arms their failed jobs after REARM_AFTER. Jobs whose alert was
+    deleted or deactivated meanwhile are cancelled instead of sent.
+
+    Delivery is at least once: a crash after the SMTP server accepted an email but
+    before the job was marked sent means one duplicate once the lease expires.
+
+    Args:
+        db: pymongo database
+        alerts: pymongo collection of alerts
+        mailer (Mailer): Delivers the messages
+        compose (callable): (email, jobs) -> (list of EmailMessage, whether an SMS is included);
+                            the first message is the one that must go out
+        on_notified (callable): Called with the alert ids deactivated after a delivery
+    """
+
+    def __init__(self, db, alerts, mailer, compose, name='NotificationOutbox', workers=OUTBOX_WORKERS, on_notified=None):
+        self.collection = db[name]
+        self.alerts = alerts
+        self.mailer = mailer
+        self.compose = compose
+        self.on_notified = on_notified
+        self.workers = workers
+        self._threads = []
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        # Keys this process already enqueued, so the monitor does not re-insert them every cycle
+        self._known = {}
+        try:
+            self.collection.create_index([('state', 1), ('next_attempt_at', 1)])
+            self.collection.create_index([('email', 1), ('state', 1)])
+            self.collection.create_index('claim')
+        except Exception as e:
+            print(f"Could not create notification outbox indexes: {e}")
+
+    def start(self):
+        """Start the delivery workers (once)."""
+        with self._start_lock:
+            if self._threads:
+                return self
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"outbox-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def enqueue(self, jobs):
+        """
+        Write notification jobs; ones whose key is already in the outbox are ignored,
+        unless that job failed at least REARM_AFTER ago, in which case it is retried.
+
+        Args:
+            jobs (list): {'key', 'alert_id', 'email', 'crn', 'term'} dicts of alerts that are open now
+        """
+        self._rearm([job['key'] for job in jobs])
+        jobs = [job for job in jobs if job['key'] not in self._known]
+        if not jobs:
+            return 0
+        now = time.time()
+        documents = [{'_id': job['key'], 'alert_id': job['alert_id'], 'email': job['email'], 'crn': job['crn'],
+                      'term': job['term'], 'state': PENDING, 'attempts': 0, 'next_attempt_at': now,
+                      'created_at': now, 'alerts_marked': False} for job in jobs]
+        try:
+            inserted = len(self.collection.insert_many(documents, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Duplicate keys: that opening is already queued or delivered
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', ())):
+                print(f"Failed to enqueue some notifications: {e.details.get('writeErrors')}")
+                return e.details.get('nInserted', 0)
+            inserted = e.details.get('nInserted', 0)
+        for job in jobs:
+            self._known[job['key']] = job['alert_id']
+        if inserted:
+            self._wake.set()
+        return inserted
+
+    def _rearm(self, keys):
+        """Give failed jobs of still-open alerts a new round of attempts."""
+        if not keys:
+            return 0
+        now = time.time()
+        result = self.collection.update_many(
+            {'_id': {'$in': keys}, 'state': FAILED, 'failed_at': {'$lte': now - REARM_AFTER}},
+            {'$set': {'state': PENDING, 'attempts': 0, 'next_attempt_at': now}, '$inc': {'rearmed': 1}}
+        )
+        if result.modified_count:
+            print(f"Re-armed {result.modified_count} failed notifications")
+            self._wake.set()
+        return result.modified_count
+
+    def retain(self, alert_ids):
+        """Forget enqueued keys of alerts that are no longer active."""
+        alert_ids = set(alert_ids)
+        self._known = {key: alert_id for key, alert_id in self._known.items() if alert_id in alert_ids}
+
+    def _claim(self):
+        """Claim the most overdue job and every other due job of its recipient. Returns the claimed jobs."""
+        now = time.time()
+        claim = uuid.uuid4().hex
+        due = {'$or': [{'state': PENDING, 'next_attempt_at': {'$lte': now}},
+                       {'state': SENDING, 'lease_until': {'$lt': now}}]}
+        lease = {'$set': {'state': SENDING, 'claim': claim, 'lease_until': now + CLAIM_LEASE}}
+        first = self.collection.find_one_and_update(due, lease, sort=[('next_attempt_at', 1)],
+                                                    return_document=ReturnDocument.AFTER)
+        if first is None:
+            return []
+        self.collection.update_many(dict(due, email=first['email']), lease)
+        return list(self.collection.find({'claim': claim}))
+
+    def _reconcile(self):
+        """Deactivate the alerts of sent jobs that were not marked yet."""
+        for job in self.collection.find({'state': SENT, 'alerts_marked': False}).limit(100):
+            self._mark_alerts([job], job.get('via_sms', False))
+
+    def _mark_alerts(self, jobs, via_sms):
+        alert_ids = [job['alert_id'] for job in jobs]
+        now = time.time()
+        result = self.alerts.update_many(
+            {'_id': {'$in': alert_ids}, 'active': True},
+            {'$set': {'active': False, 'notified': True, 'notified_at': now, 'notified_via_sms': via_sms, 'updated_at': now}}
+        )
+        self.collection.update_many({'_id': {'$in': [job['_id'] for job in jobs]}}, {'$set': {'alerts_marked': True}})
+        if self.on_notified is not None:
+            self.on_notified(alert_ids)
+        return result.modified_count
+
+    def _deliver(self, jobs):
+        email = jobs[0]['email']
+        active = {alert['_id'] for alert in self.alerts.find(
+            {'_id': {'$in': [job['alert_id'] for job in jobs]}, 'active': True}, {'_id': 1})}
+        cancelled = [job['_id'] for job in jobs if job['alert_id'] not in active]
+        if cancelled:
+            self.collection.update_many({'_id': {'$in': cancelled}}, {'$set': {'state': CANCELLED}})
+        jobs = [job for job in jobs if job['alert_id'] in active]
+        if not jobs:
+            return
+
+        try:
+            messages, via_sms = self.compose(email, jobs)
+            futures = [self.mailer.send(message) for message in messages]
+            latency = futures[0].result(SEND_TIMEOUT)
+        except Exception as e:
+            self._retry(jobs, e)
+            return
+        for future in futures[1:]:
+            # The SMS copy is best effort; the email decides whether the jobs are done
+            future.add_done_callback(lambda f: f.exception() and print(f"Failed to send SMS copy to {email}: {f.exception()}"))
+
+        self.collection.update_many({'_id': {'$in': [job['_id'] for job in jobs]}},
+                                    {'$set': {'state': SENT, 'sent_at': time.time(), 'via_sms': via_sms},
+                                     '$inc': {'attempts': 1}, '$unset': {'claim': '', 'lease_until': ''}})
+        deactivated = self._mark_alerts(jobs, via_sms)
+        print(f"✅ Notified {email} about {len(jobs)} CRNs in {latency:.2f}s, deactivated {deactivated} alerts")
+
+    def _retry(self, jobs, error):
+        now = time.time()
+        for job in jobs:
+            attempts = job.get('attempts', 0) + 1
+            if attempts >= MAX_DELIVERY_ATTEMPTS:
+                update = {'state': FAILED, 'failed_at': now}
+            else:
+                delay = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 1)) * random.uniform(0.5, 1)
+                update = {'state': PENDING, 'next_attempt_at': now + delay}
+            self.collection.update_one({'_id': job['_id']},
+                                       {'$set': dict(update, attempts=attempts, last_error=str(error)),
+                                        '$unset': {'claim': '', 'lease_until': ''}})
+        print(f"❌ Failed to notify {jobs[0]['email']} (attempt {jobs[0].get('attempts', 0) + 1}): {error}")
+
+    def _work(self):
+        while True:
+            try:
+                jobs = self._claim()
+                if not jobs:
+                    self._reconcile()
+            except Exception as e:
+                print(f"Notification outbox unavailable: {e}")
+                jobs = []
+            if not jobs:
+                self._wake.wait(OUTBOX_POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            try:
+                self._deliver(jobs)
+            except Exception as e:
+                print(f"Notification delivery to {jobs[0]['email']} failed: {e}")
+                try:
+                    self._retry(jobs, e)
+                except Exception:
+                    # The lease runs out and another attempt picks the jobs up
+                    pass
+
+    def stats(self):
+        """Number of jobs per state and the most recently failed jobs."""
+        try:
+            jobs = {row['_id']: row['count'] for row in
+                    self.collection.aggregate([{'$group': {'_id': '$state', 'count': {'$sum': 1}}}])}
+            failed = self.collection.find(
+                {'state': FAILED},
+                {'alert_id': 1, 'crn': 1, 'term': 1, 'attempts': 1, 'rearmed': 1, 'last_error': 1, 'failed_at': 1}
+            ).sort('failed_at', -1).limit(RECENT_FAILURES)
+            return {'jobs': jobs, 'recent_failures': [dict(job, alert_id=str(job['alert_id'])) for job in failed]}
+        except Exception as e:
+            return {'error': str(e)}
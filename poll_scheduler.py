@@ -0,0 +1,162 @@
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+# Polling interval of a term with one alert, no churn and no open registration window
+BASE_POLL_INTERVAL = 60
+# Bounds of any term's interval
+MIN_POLL_INTERVAL = 15
+MAX_POLL_INTERVAL = 10 * 60
+# Term fetches allowed per rolling minute across every term
+POLL_BUDGET_PER_MINUTE = 6
+# Seat changes per minute at which churn halves a term's interval
+CHURN_REFERENCE = 10
+# Weight of the newest poll in the churn moving average
+CHURN_SMOOTHING = 0.3
+# Factor a term's interval is divided by while its registration window is open
+REGISTRATION_SPEEDUP = 4
+# {"202531": [["2025-04-07T08:00", "2025-04-18T23:59"], ...]}, local time
+REGISTRATION_WINDOWS = os.getenv('HOWDY_REGISTRATION_WINDOWS')
+
+
+def parse_registration_windows(config):
+    """
+    Registration windows from a JSON string or dict of {term: [[start, end], ...]} in ISO format.
+
+    Returns:
+        dict: {term_code: [(start timestamp, end timestamp), ...]}
+    """
+    if not config:
+        return {}
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except json.JSONDecodeError as e:
+            print(f"Ignoring unreadable registration windows: {e}")
+            return {}
+    windows = {}
+    for term_code, ranges in config.items():
+        for start, end in ranges:
+            try:
+                windows.setdefault(str(term_code), []).append(
+                    (datetime.fromisoformat(start).timestamp(), datetime.fromisoformat(end).timestamp()))
+            except (TypeError, ValueError) as e:
+                print(f"Ignoring registration window {start} - {end} of term {term_code}: {e}")
+    return windows
+
+
+class PollScheduler:
+    """
+    Decides which terms the monitor fetches and when.
+
+    Every term gets its own interval: BASE_POLL_INTERVAL divided by a factor that grows
+    with the log of its active alerts, by its recent churn (seat changes per minute,
+    averaged over its polls) and by REGISTRATION_SPEEDUP while one of its registration
+    windows is open, clamped to [MIN_POLL_INTERVAL, MAX_POLL_INTERVAL]. Terms without
+    alerts are never due. When more terms are due than the rolling per-minute budget
+    allows, the most overdue go first and the rest wait for the next tick.
+
+    Args:
+        base_interval (float): Interval of a term with one alert and nothing else going on
+        budget_per_minute (int): Most term fetches per rolling minute
+        registration_windows: See parse_registration_windows
+    """
+
+    def __init__(self, base_interval=BASE_POLL_INTERVAL, min_interval=MIN_POLL_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL, budget_per_minute=POLL_BUDGET_PER_MINUTE,
+                 registration_windows=REGISTRATION_WINDOWS):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_per_minute = budget_per_minute
+        self.registration_windows = parse_registration_windows(registration_windows)
+        self.last_polled = {}
+        self.churn = {}
+        self._fetches = deque()
+
+    def in_registration(self, term_code, now=None):
+        now = now or time.time()
+        return any(start <= now <= end for start, end in self.registration_windows.get(term_code, ()))
+
+    def interval(self, term_code, alert_count, now=None):
+        """Seconds between polls of a term, or None if it has no alerts."""
+        if alert_count <= 0:
+            return None
+        speedup = 1 + math.log10(alert_count)
+        speedup *= 1 + self.churn.get(term_code, 0.0) / CHURN_REFERENCE
+        if self.in_registration(term_code, now):
+            speedup *= REGISTRATION_SPEEDUP
+        return min(self.max_interval, max(self.min_interval, self.base_interval / speedup))
+
+    def _budget_left(self, now):
+        while self._fetches and self._fetches[0] <= now - 60:
+            self._fetches.popleft()
+        return self.budget_per_minute - len(self._fetches)
+
+    def due_terms(self, alert_counts, now=None):
+        """
+        Terms to fetch now, most overdue first and within the budget.
+
+        Args:
+            alert_counts (dict): {term_code: number of active alerts}
+        """
+        now = now or time.time()
+        for term_code in set(self.last_polled) - set(alert_counts):
+            # Forget terms whose alerts are gone, so they start fresh if alerts come back
+            self.last_polled.pop(term_code, None)
+            self.churn.pop(term_code, None)
+        overdue = []
+        for term_code, alert_count in alert_counts.items():
+            interval = self.interval(term_code, alert_count, now)
+            if interval is None:
+                continue
+            last_polled = self.last_polled.get(term_code)
+            if last_polled is None:
+                overdue.append((float('inf'), term_code))
+            elif now - last_polled >= interval:
+                overdue.append(((now - last_polled) / interval, term_code))
+        overdue.sort(reverse=True)
+        return [term_code for _, term_code in overdue[:max(0, self._budget_left(now))]]
+
+    def record(self, term_code, change_count, now=None):
+        """Note a fetch of a term and how many sections changed in it."""
+        now = now or time.time()
+        last_polled = self.last_polled.get(term_code)
+        if last_polled is not None and now > last_polled:
+            rate = change_count * 60 / (now - last_polled)
+            self.churn[term_code] = CHURN_SMOOTHING * rate + (1 - CHURN_SMOOTHING) * self.churn.get(term_code, rate)
+        self.last_polled[term_code] = now
+        self._fetches.append(now)
+
+    def next_due(self, alert_counts, now=None):
+        """Seconds until the next term is due (0 if one is already), or None if no term has alerts."""
+        now = now or time.time()
+        waits = []
+        for term_code, alert_count in alert_counts.items():
+            interval = self.interval(term_code, alert_count, now)
+            if interval is not None:
+                waits.append(max(0.0, self.last_polled.get(term_code, now - interval) + interval - now))
+        if not waits:
+            return None
+        wait = min(waits)
+        if self._budget_left(now) <= 0 and self._fetches:
+            wait = max(wait, self._fetches[0] + 60 - now)
+        return wait
+
+    def stats(self, alert_counts, now=None):
+        """Per-term interval, churn and last poll, for /api/status."""
+        now = now or time.time()
+        return {
+            'budget_per_minute': self.budget_per_minute,
+            'budget_left': self._budget_left(now),
+            'terms': {term_code: {
+                'alerts': alert_count,
+                'interval': self.interval(term_code, alert_count, now),
+                'churn_per_minute': round(self.churn.get(term_code, 0.0), 2),
+                'registration_open': self.in_registration(term_code, now),
+                'last_polled': self.last_polled.get(term_code),
+            } for term_code, alert_count in alert_counts.items()},
+        }
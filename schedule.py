@@ -0,0 +1,175 @@
+from collections import namedtuple
+from itertools import combinations
+from CustomHelpers import mask_ranges, parse_meeting_time, SLOT_MINUTES, SLOTS_PER_DAY, WEEK_DAYS
+
+# Schedules generate_schedules yields before stopping, unless told otherwise
+DEFAULT_SCHEDULE_LIMIT = 200
+
+# crns is the (first, second) pair that overlaps and overlap the weekly bitmask of the shared time
+Conflict = namedtuple('Conflict', ['crns', 'overlap'])
+
+
+def combined_mask(sections):
+    """OR of the weekly time bitmasks of several SectionRows."""
+    mask = 0
+    for section in sections:
+        mask |= section.schedule_mask
+    return mask
+
+
+def find_conflicts(sections):
+    """
+    Every pair of sections whose meetings overlap.
+
+    Args:
+        sections (list): SectionRows of one term
+
+    Returns:
+        list: Conflict, in the order the sections were given
+    """
+    masked = [(section['SWV_CLASS_SEARCH_CRN'], section.schedule_mask) for section in sections]
+    return [Conflict((first_crn, second_crn), first_mask & second_mask)
+            for (first_crn, first_mask), (second_crn, second_mask) in combinations(masked, 2)
+            if first_mask & second_mask]
+
+
+def fitting_sections(candidates, busy_mask, open_only=True):
+    """
+    Sections that fit around an existing schedule.
+
+    Args:
+        candidates (list): SectionRows to choose from, e.g. every section of a course
+        busy_mask (int): Weekly bitmask of the times already taken
+        open_only (bool): Leave out sections without open seats
+
+    Returns:
+        list: The candidates whose meetings do not overlap busy_mask
+    """
+    return [section for section in candidates
+            if not section.schedule_mask & busy_mask and (not open_only or section.get('STUSEAT_OPEN') == 'Y')]
+
+
+def conflict_to_dict(conflict):
+    return {'crns': list(conflict.crns), 'overlap': mask_ranges(conflict.overlap)}
+
+
+def window_mask(earliest=None, latest=None):
+    """Weekly bitmask of every slot before earliest or from latest on ("HH:MM" or Howdy times)."""
+    start, end = parse_meeting_time(earliest), parse_meeting_time(latest)
+    day_mask = 0
+    if start is not None:
+        day_mask |= (1 << (start // SLOT_MINUTES)) - 1
+    if end is not None:
+        day_mask |= ((1 << SLOTS_PER_DAY) - 1) & ~((1 << -(-end // SLOT_MINUTES)) - 1)
+    mask = 0
+    for position in range(len(WEEK_DAYS)):
+        mask |= day_mask << (position * SLOTS_PER_DAY)
+    return mask
+
+
+def section_scorer(preferences):
+    """
+    Score function for generate_schedules built from a preferences dict.
+
+    Args:
+        preferences (dict): 'instructors' is a list of preferred names (full or last name,
+                            one point each); 'earliest' / 'latest' ("HH:MM") cost one point for
+                            every section meeting outside that window
+
+    Returns:
+        callable: SectionRow -> number, or None when there are no preferences
+    """
+    if not preferences:
+        return None
+    instructors = {str(name).strip().lower() for name in preferences.get('instructors') or ()}
+    outside = window_mask(preferences.get('earliest'), preferences.get('latest'))
+
+    def score(section):
+        points = 0
+        if instructors and any(instructor.name.lower() in instructors or instructor.last_name.lower() in instructors
+                               for instructor in section.instructors):
+            points += 1
+        if section.schedule_mask & outside:
+            points -= 1
+        return points
+
+    return score
+
+
+def generate_schedules(courses, open_only=False, limit=DEFAULT_SCHEDULE_LIMIT, score=None):
+    """
+    Lazily enumerate every conflict-free choice of one section per course.
+
+    Backtracks over the courses with the fewest candidates first. Sections with the
+    same meeting times are interchangeable for conflicts, so each course is searched
+    once per distinct bitmask. After every choice, the search checks that each
+    remaining course still has a fitting time and prunes the branch if not.
+
+    With a score function the candidates of each course are tried best first, so the
+    schedules come out roughly best first; each schedule's score is the sum of its
+    sections'.
+
+    Args:
+        courses (list): One list of SectionRows per course
+        open_only (bool): Only use sections with open seats
+        limit (int): Stop after this many schedules (None for no limit)
+        score (callable): SectionRow -> number, e.g. from section_scorer()
+
+    Yields:
+        tuple: (list of SectionRows in the order of courses, total score)
+    """
+    # Per course: [(mask, [(section, section score), ...])], best first
+    options = []
+    for candidates in courses:
+        by_mask = {}
+        for section in candidates:
+            if open_only and section.get('STUSEAT_OPEN') != 'Y':
+                continue
+            by_mask.setdefault(section.schedule_mask, []).append((section, score(section) if score else 0))
+        groups = []
+        for mask, group in by_mask.items():
+            group.sort(key=lambda pair: -pair[1])
+            groups.append((mask, group))
+        groups.sort(key=lambda entry: -entry[1][0][1])
+        if not groups:
+            return
+        options.append(groups)
+
+    order = sorted(range(len(options)), key=lambda i: len(options[i]))
+    ordered = [options[i] for i in order]
+    count = 0
+
+    def fits(depth, busy):
+        return all(any(not mask & busy for mask, _ in ordered[later]) for later in range(depth, len(ordered)))
+
+    def search(depth, busy, chosen):
+        nonlocal count
+        if depth == len(ordered):
+            yield from expand(chosen)
+            return
+        for mask, group in ordered[depth]:
+            if mask & busy:
+                continue
+            if not fits(depth + 1, busy | mask):
+                continue
+            chosen.append(group)
+            yield from search(depth + 1, busy | mask, chosen)
+            chosen.pop()
+            if limit is not None and count >= limit:
+                return
+
+    def expand(groups, depth=0, picked=()):
+        nonlocal count
+        if depth == len(groups):
+            schedule = [None] * len(groups)
+            for position, (section, _) in zip(order, picked):
+                schedule[position] = section
+            count += 1
+            yield schedule, sum(points for _, points in picked)
+            return
+        for pair in groups[depth]:
+            if limit is not None and count >= limit:
+                return
+            yield from expand(groups, depth + 1, picked + (pair,))
+
+    yield from search(0, 0, [])
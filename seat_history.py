@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from catalog_diff import is_seat_field
+
+OPEN_KEY = 'STUSEAT_OPEN'
+# Directory of the local seat history, one append-only file per term
+SEAT_HISTORY_DIR = os.getenv('HOWDY_SEAT_HISTORY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seat-history'))
+# Substrings marking the seat fields fill_rate reads: capacity, seats left and enrollment
+CAPACITY_MARKERS = ('CAPACITY', 'MAX')
+AVAILABLE_MARKERS = ('AVAIL', 'REM')
+ENROLLED_MARKERS = ('ENRL',)
+
+
+def observe(section):
+    """(is_open, {seat field: value}) of one section, without STUSEAT_OPEN in the counts."""
+    return section.get(OPEN_KEY) == 'Y', {key: value for key, value in section.items()
+                                          if key != OPEN_KEY and is_seat_field(key)}
+
+
+def _field(seats, markers):
+    for key, value in seats.items():
+        if any(marker in key for marker in markers):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def fill_rate(seats):
+    """Share of a section's capacity that is taken (0-1), or None if the counts are not in the payload."""
+    capacity = _field(seats, CAPACITY_MARKERS)
+    if not capacity:
+        return None
+    enrolled = _field(seats, ENROLLED_MARKERS)
+    if enrolled is None:
+        available = _field(seats, AVAILABLE_MARKERS)
+        if available is None:
+            return None
+        enrolled = capacity - available
+    return min(1.0, max(0.0, enrolled / capacity))
+
+
+def summarize(observations, now=None):
+    """
+    Seat history of one section plus derived figures.
+
+    Args:
+        observations (list): {'t', 'open', 'seats'} dicts, oldest first
+
+    Returns:
+        dict: observations, the latest fill_rate and open_fraction, the share of the
+              observed time the section had open seats
+    """
+    now = now or time.time()
+    open_time = total_time = 0.0
+    for observation, following in zip(observations, observations[1:] + [{'t': now}]):
+        span = max(0.0, following['t'] - observation['t'])
+        total_time += span
+        if observation['open']:
+            open_time += span
+    return {
+        'observations': observations,
+        'fill_rate': fill_rate(observations[-1]['seats']) if observations else None,
+        'open_fraction': open_time / total_time if total_time else None,
+    }
+
+
+class _SeatHistory:
+    """
+    Shared logic of the seat history stores: per-CRN change detection and batching.
+
+    record() compares each section with the last values written for its CRN and hands
+    only the ones that moved to _append(), once per term and call.
+    """
+
+    def __init__(self):
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def _last_values(self, term_code):
+        """{crn: (is_open, seats)} last written for a term; subclasses seed it from storage."""
+        return self._last.setdefault(term_code, {})
+
+    def record(self, term_code, catalog, crns=None, observed_at=None):
+        """
+        Append an observation for every section whose open flag or seat counts changed.
+
+        Args:
+            term_code (str): Term of the catalog
+            catalog (SectionCatalog): Freshly fetched catalog
+            crns (iterable): CRNs that may have changed (e.g. from the refresh diff); None checks every section
+            observed_at (float): Unix time of the poll, defaults to now
+
+        Returns:
+            int: Number of observations written
+        """
+        rows = catalog if crns is None else filter(None, map(catalog.find_crn, crns))
+        return self.record_observed(term_code, ((row.get('SWV_CLASS_SEARCH_CRN'), observe(row)) for row in rows),
+                                    observed_at)
+
+    def record_observed(self, term_code, observations, observed_at=None):
+        """
+        Like record(), for seat states that did not come from a catalog (e.g. per-CRN details calls).
+
+        Args:
+            observations (iterable): (crn, (is_open, {seat field: value})) pairs
+
+        Returns:
+            int: Number of observations written
+        """
+        observed_at = observed_at or time.time()
+        with self._lock:
+            last = self._last_values(term_code)
+            batch = []
+            for crn, values in observations:
+                if crn is None:
+                    continue
+                if last.get(crn) != values:
+                    last[crn] = values
+                    batch.append({'crn': crn, 't': observed_at, 'open': values[0], 'seats': values[1]})
+            if batch:
+                self._append(term_code, batch)
+            return len(batch)
+
+
+class FileSeatHistory(_SeatHistory):
+    """
+    Seat history in local append-only files, one JSON line per observation.
+
+    Byte offsets of each CRN's lines are kept in memory, so history() reads only that
+    section's lines.
+
+    Args:
+        directory (str): Directory the per-term files are written to
+    """
+
+    def __init__(self, directory=SEAT_HISTORY_DIR):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._offsets = {}
+
+    def _path(self, term_code):
+        return os.path.join(self.directory, f"term-{term_code}.jsonl")
+
+    def _load(self, term_code):
+        """Index an existing term file once: line offsets per CRN and the last values written."""
+        offsets, last = {}, self._last.setdefault(term_code, {})
+        try:
+            with open(self._path(term_code), 'rb') as f:
+                offset = 0
+                for line in f:
+                    try:
+                        observation = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line from a crash; the next append starts a fresh one
+                        offset += len(line)
+                        continue
+                    offsets.setdefault(observation['c'], []).append(offset)
+                    last[observation['c']] = (bool(observation['o']), observation['s'])
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        self._offsets[term_code] = offsets
+
+    def _last_values(self, term_code):
+        if term_code not in self._offsets:
+            self._load(term_code)
+        return self._last[term_code]
+
+    def _append(self, term_code, batch):
+        offsets = self._offsets[term_code]
+        with open(self._path(term_code), 'ab') as f:
+            offset = f.tell()
+            if offset and not self._ends_with_newline(f.name):
+                f.write(b'\n')
+                offset += 1
+            for observation in batch:
+                line = json.dumps({'c': observation['crn'], 't': observation['t'], 'o': int(observation['open']),
+                                   's': observation['seats']}, separators=(',', ':')).encode('utf-8') + b'\n'
+                f.write(line)
+                offsets.setdefault(observation['crn'], []).append(offset)
+                offset += len(line)
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def history(self, term_code, crn, since=None):
+        """Returns [{'t', 'open', 'seats'}] for one section, oldest first."""
+        with self._lock:
+            self._last_values(term_code)
+            offsets = list(self._offsets[term_code].get(str(crn), ()))
+        observations = []
+        if not offsets:
+            return observations
+        with open(self._path(term_code), 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                observation = json.loads(f.readline())
+                if since is None or observation['t'] >= since:
+                    observations.append({'t': observation['t'], 'open': bool(observation['o']), 'seats': observation['s']})
+        return observations
+
+
+class MongoSeatHistory(_SeatHistory):
+    """
+    Seat history in a MongoDB time-series collection shared by every process.
+
+    Observations are written with one insert_many per term and refresh. After a
+    restart the first poll of each term writes one baseline observation per section,
+    since the last values are only tracked in memory.
+
+    Args:
+        db: pymongo database
+        name (str): Collection name
+    """
+
+    def __init__(self, db, name='SeatHistory'):
+        super().__init__()
+        if name not in db.list_collection_names():
+            try:
+                db.create_collection(name, timeseries={'timeField': 't', 'metaField': 'section', 'granularity': 'minutes'})
+            except Exception as e:
+                print(f"Could not create seat history time-series collection: {e}")
+        self.collection = db[name]
+        try:
+            self.collection.create_index([('section.term', 1), ('section.crn', 1), ('t', 1)])
+        except Exception as e:
+            print(f"Could not create seat history index: {e}")
+
+    def _append(self, term_code, batch):
+        try:
+            self.collection.insert_many([{
+                'section': {'term': term_code, 'crn': observation['crn']},
+                't': datetime.fromtimestamp(observation['t'], timezone.utc),
+                'open': observation['open'],
+                'seats': observation['seats'],
+            } for observation in batch], ordered=False)
+        except Exception as e:
+            print(f"Seat history write failed for term {term_code}: {e}")
+
+    def history(self, term_code, crn, since=None):
+        query = {'section.term': term_code, 'section.crn': str(crn)}
+        if since is not None:
+            query['t'] = {'$gte': datetime.fromtimestamp(since, timezone.utc)}
+        try:
+            docs = self.collection.find(query, {'_id': 0, 't': 1, 'open': 1, 'seats': 1}).sort('t', 1)
+            # pymongo hands back naive datetimes in UTC
+            return [{'t': doc['t'].replace(tzinfo=timezone.utc).timestamp(), 'open': doc['open'], 'seats': doc['seats']}
+                    for doc in docs]
+        except Exception as e:
+            print(f"Seat history lookup failed: {e}")
+            return []
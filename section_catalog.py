@@ -0,0 +1,330 @@
+import sys
+from array import array
+from functools import reduce
+from operator import or_
+from collections.abc import Mapping, Sequence
+from CustomHelpers import normalize_instructors, normalize_meetings
+from catalog_diff import is_seat_field
+
+CRN_KEY = 'SWV_CLASS_SEARCH_CRN'
+OPEN_KEY = 'STUSEAT_OPEN'
+SUBJECT_KEY = 'SWV_CLASS_SEARCH_SUBJECT'
+COURSE_KEY = 'SWV_CLASS_SEARCH_COURSE'
+CAMPUS_KEY = 'SWV_CLASS_SEARCH_SITE'
+INSTRUCTOR_KEY = 'SWV_CLASS_SEARCH_INSTRCTR_JSON'
+MEETINGS_KEY = 'SWV_CLASS_SEARCH_JSON_CLOB'
+# Nested JSON strings that are only decoded when somebody asks for them
+BLOB_KEYS = (INSTRUCTOR_KEY, MEETINGS_KEY)
+
+# Column code for "this row does not have the key"
+ABSENT = 0
+# Stand-in for None inside integer seat columns
+NULL_INT = -2 ** 63
+# Stand-in for a CRN that does not round-trip through int()
+NON_NUMERIC_CRN = -1
+
+
+class SectionRow(Mapping):
+    """Read-only, dict-like view of one section stored in a SectionCatalog."""
+
+    __slots__ = ('_catalog', 'index')
+
+    def __init__(self, catalog, index):
+        self._catalog = catalog
+        self.index = index
+
+    def __getitem__(self, key):
+        return self._catalog.value(self.index, key)
+
+    def __iter__(self):
+        return self._catalog.row_keys(self.index)
+
+    def __len__(self):
+        return sum(1 for _ in self._catalog.row_keys(self.index))
+
+    def __repr__(self):
+        return f"SectionRow({self.to_dict()!r})"
+
+    @property
+    def instructors(self):
+        return self._catalog.instructors(self.index)
+
+    @property
+    def meetings(self):
+        return self._catalog.meetings(self.index)
+
+    @property
+    def schedule_mask(self):
+        return self._catalog.schedule_mask(self.index)
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class SectionCatalog(Sequence):
+    """
+    Columnar store for one term's course sections.
+
+    Every field is dictionary-encoded: each distinct value is kept once in a shared
+    value table and every column is a flat array of 32-bit codes into it, so the long
+    SWV_CLASS_SEARCH_* keys and the repeated subject/course/building strings are no
+    longer stored per row. CRNs live in an integer column, STUSEAT_OPEN in a byte
+    column and numeric seat fields in integer columns for fast whole-catalog scans.
+    Indexing the catalog returns SectionRow views that behave like the original dicts.
+
+    The instructor and meeting blobs are decoded once per distinct value at ingest
+    into Instructor and Meeting records (see CustomHelpers), so query paths never
+    re-parse them. Each distinct meeting blob is also reduced to one weekly time
+    bitmask for schedule-conflict checks. Hash indexes by CRN, (subject, course), instructor name, campus and
+    building are built with the catalog, so a refreshed catalog and its indexes are
+    swapped in as one object.
+
+    When built from a response body, payload_hash fingerprints the whole body and
+    row_hashes holds one hash per section of that section's source text, so a later
+    fetch can tell unchanged terms and sections apart without comparing fields. Row
+    hashes use hash() and are only comparable within one process.
+
+    Build one with SectionCatalog.from_sections(payload) or SectionCatalogBuilder.
+    """
+
+    def __init__(self, keys, columns, values, crns, crn_strings, open_flags, seat_counts,
+                 row_hashes=None, payload_hash=None):
+        self.keys = keys
+        self._columns = columns
+        self._values = values
+        self.crns = crns
+        self._crn_strings = crn_strings
+        self.open_flags = open_flags
+        self.seat_counts = seat_counts
+        self.row_hashes = row_hashes
+        self.payload_hash = payload_hash
+        self._decode_nested()
+        self._build_indexes()
+
+    def _decode_nested(self):
+        """Decode every distinct instructor and meeting blob once."""
+        self._instructors_by_code = {ABSENT: ()}
+        self._meetings_by_code = {ABSENT: ()}
+        for key, decoded, normalize in ((INSTRUCTOR_KEY, self._instructors_by_code, normalize_instructors),
+                                        (MEETINGS_KEY, self._meetings_by_code, normalize_meetings)):
+            column = self._columns.get(key)
+            if column is None:
+                continue
+            for code in set(column):
+                if code not in decoded:
+                    decoded[code] = normalize(self._values[code]) if self._values[code] is not None else ()
+        self._masks_by_code = {code: reduce(or_, (meeting.mask for meeting in meetings), 0)
+                               for code, meetings in self._meetings_by_code.items()}
+
+    def instructors(self, index):
+        """Pre-decoded Instructor records for a section."""
+        column = self._columns.get(INSTRUCTOR_KEY)
+        return () if column is None else self._instructors_by_code[column[index]]
+
+    def meetings(self, index):
+        """Pre-decoded Meeting records for a section."""
+        column = self._columns.get(MEETINGS_KEY)
+        return () if column is None else self._meetings_by_code[column[index]]
+
+    def schedule_mask(self, index):
+        """Weekly time bitmask of all of a section's meetings (0 if it has no scheduled times)."""
+        column = self._columns.get(MEETINGS_KEY)
+        return 0 if column is None else self._masks_by_code[column[index]]
+
+    def _build_indexes(self):
+        self.crn_index = {}
+        self.course_index = {}
+        self.instructor_index = {}
+        self.campus_index = {}
+        self.building_index = {}
+
+        for i in range(len(self.crns)):
+            crn = self.crn(i)
+            if crn is not None:
+                self.crn_index[crn] = i
+
+            subject = self._raw(i, SUBJECT_KEY)
+            course = self._raw(i, COURSE_KEY)
+            if subject is not None and course is not None:
+                self.course_index.setdefault((subject.upper(), course), array('I')).append(i)
+
+            campus = self._raw(i, CAMPUS_KEY)
+            if campus is not None:
+                self.campus_index.setdefault(campus, array('I')).append(i)
+
+            for name in {instructor.raw_name for instructor in self.instructors(i)}:
+                self.instructor_index.setdefault(name, array('I')).append(i)
+
+            for building in {meeting.building for meeting in self.meetings(i) if meeting.building}:
+                self.building_index.setdefault(building, array('I')).append(i)
+
+    def _raw(self, index, key):
+        column = self._columns.get(key)
+        return None if column is None else self._values[column[index]]
+
+    def _rows(self, indexes):
+        return [SectionRow(self, i) for i in indexes]
+
+    def find_crn(self, crn):
+        """Returns the SectionRow for a CRN, or None if the term has no such section."""
+        index = self.crn_index.get(str(crn))
+        return None if index is None else SectionRow(self, index)
+
+    def by_course(self, subject, course):
+        return self._rows(self.course_index.get((subject.upper(), course), ()))
+
+    def by_instructor(self, name):
+        return self._rows(self.instructor_index.get(name, ()))
+
+    def by_campus(self, campus):
+        return self._rows(self.campus_index.get(campus, ()))
+
+    def by_building(self, building):
+        return self._rows(self.building_index.get(building, ()))
+
+    @classmethod
+    def from_sections(cls, sections):
+        builder = SectionCatalogBuilder()
+        for section in sections:
+            builder.add(section)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.crns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SectionRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('section index out of range')
+        return SectionRow(self, index)
+
+    def crn(self, index):
+        crn = self.crns[index]
+        if crn == NON_NUMERIC_CRN:
+            return self._crn_strings.get(index)
+        return str(crn)
+
+    def is_open(self, index):
+        return bool(self.open_flags[index])
+
+    def value(self, index, key):
+        if key == CRN_KEY:
+            crn = self.crn(index)
+            if crn is None:
+                raise KeyError(key)
+            return crn
+        code = self._columns[key][index]
+        if code == ABSENT:
+            raise KeyError(key)
+        return self._values[code]
+
+    def row_keys(self, index):
+        for key in self.keys:
+            if key == CRN_KEY:
+                if self.crns[index] != NON_NUMERIC_CRN or self._crn_strings.get(index) is not None:
+                    yield key
+            elif self._columns[key][index] != ABSENT:
+                yield key
+
+    def availability_map(self):
+        """Build the {crn: is_open} map straight from the integer and flag columns."""
+        return {self.crn(i): bool(flag) for i, flag in enumerate(self.open_flags)}
+
+    def to_sections(self):
+        """Materialise the catalog back into the raw list-of-dicts payload."""
+        return [SectionRow(self, i).to_dict() for i in range(len(self))]
+
+
+class SectionCatalogBuilder:
+    """Incrementally encodes raw section dicts into a SectionCatalog."""
+
+    def __init__(self):
+        self._keys = []
+        self._columns = {}
+        self._values = [None]  # code 0 is reserved for ABSENT
+        self._codes = {}
+        self._crns = array('q')
+        self._crn_strings = {}
+        self._open_flags = bytearray()
+        self._row_hashes = array('q')
+        self.payload_hash = None
+
+    def _code(self, value):
+        if isinstance(value, str):
+            value = sys.intern(value)
+        try:
+            lookup = (type(value), value)
+            code = self._codes.get(lookup)
+        except TypeError:  # lists/dicts are stored as-is
+            lookup, code = None, None
+        if code is None:
+            code = len(self._values)
+            self._values.append(value)
+            if lookup is not None:
+                self._codes[lookup] = code
+        return code
+
+    def add(self, section, row_hash=None):
+        """
+        Append one section.
+
+        Args:
+            section (dict): Raw section from the course-sections payload
+            row_hash (int): hash() of the section's source text, if known
+        """
+        crn = section.get(CRN_KEY)
+        if crn is None:
+            # Nothing can look up or watch a section without a CRN
+            return
+        crn = str(crn)
+        index = len(self._crns)
+
+        # isdigit() alone also accepts non-ASCII digits such as '²', which int() rejects
+        if crn.isascii() and crn.isdigit() and str(int(crn)) == crn:
+            self._crns.append(int(crn))
+        else:
+            self._crns.append(NON_NUMERIC_CRN)
+            self._crn_strings[index] = crn
+        self._open_flags.append(1 if section.get(OPEN_KEY) == 'Y' else 0)
+        if row_hash is not None and len(self._row_hashes) == index:
+            self._row_hashes.append(row_hash)
+
+        for key, value in section.items():
+            if key == CRN_KEY:
+                if key not in self._columns:
+                    self._keys.append(key)
+                    self._columns[key] = None
+                continue
+            column = self._columns.get(key)
+            if column is None:
+                self._keys.append(key)
+                column = self._columns[key] = array('I', bytes(4 * index))
+            column.append(self._code(value))
+
+        # Pad columns this row did not have
+        for column in self._columns.values():
+            if column is not None and len(column) == index:
+                column.append(ABSENT)
+
+    def _seat_counts(self):
+        counts = {}
+        for key, column in self._columns.items():
+            if column is None or key == OPEN_KEY or not is_seat_field(key):
+                continue
+            values = [self._values[code] for code in set(column) if code != ABSENT]
+            if not all(value is None or (isinstance(value, int) and not isinstance(value, bool)) for value in values):
+                continue
+            counts[key] = array('q', (NULL_INT if code == ABSENT or self._values[code] is None else self._values[code]
+                                      for code in column))
+        return counts
+
+    def build(self):
+        columns = {key: column for key, column in self._columns.items() if column is not None}
+        keys = list(self._keys)
+        # Row hashes are only usable if every section had one
+        row_hashes = self._row_hashes if len(self._row_hashes) == len(self._crns) else None
+        return SectionCatalog(keys, columns, self._values, self._crns, self._crn_strings,
+                              self._open_flags, self._seat_counts(), row_hashes, self.payload_hash)
@@ -0,0 +1,202 @@
+import json
+import mmap
+import os
+import struct
+import time
+import uuid
+from array import array
+from section_catalog import SectionCatalog
+
+# Directory the refresher publishes catalogs into; unset means every process fetches for itself
+SHARED_CATALOG_DIR = os.getenv('HOWDY_SHARED_CATALOG_DIR')
+# Seconds between a worker's checks of the manifest for newly published versions
+MANIFEST_CHECK_INTERVAL = 1
+# Seconds between a worker re-announcing that it still uses a term
+REQUEST_TOUCH_INTERVAL = 60
+# Seconds a worker waits for the refresher to publish a term it asked for
+PUBLISH_WAIT_TIMEOUT = 45
+PUBLISH_POLL_INTERVAL = 0.25
+
+FILE_MAGIC = b'HCAT'
+FILE_FORMAT = 1
+# magic, format, catalog version, row count, metadata length
+HEADER = struct.Struct('<4sIQII')
+# Typecodes of the array columns, written widest first so every column stays aligned
+INT64, UINT32, BYTE = 'q', 'I', 'B'
+
+
+def _align(offset, size=8):
+    return (offset + size - 1) // size * size
+
+
+def write_catalog(path, catalog, version):
+    """
+    Write a SectionCatalog to a file laid out for zero-copy mapping with map_catalog().
+
+    The value table, keys and non-numeric CRNs go into a JSON metadata block; the CRN,
+    seat-count, code and open-flag columns follow it as raw native arrays.
+    """
+    rows = len(catalog)
+    column_keys = list(catalog._columns)
+    seat_keys = list(catalog.seat_counts)
+    meta = json.dumps({
+        'keys': catalog.keys,
+        'columns': column_keys,
+        'seat_counts': seat_keys,
+        'values': catalog._values,
+        'crn_strings': {str(index): crn for index, crn in catalog._crn_strings.items()},
+        'payload_hash': catalog.payload_hash,
+    }, separators=(',', ':')).encode('utf-8')
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(FILE_MAGIC, FILE_FORMAT, version, rows, len(meta)))
+        f.write(meta)
+        f.write(bytes(_align(f.tell()) - f.tell()))
+        for typecode, column in ([(INT64, catalog.crns)] + [(INT64, catalog.seat_counts[key]) for key in seat_keys]
+                                 + [(UINT32, catalog._columns[key]) for key in column_keys]
+                                 + [(BYTE, catalog.open_flags)]):
+            f.write(array(typecode, column).tobytes())
+    os.replace(tmp_path, path)
+
+
+def map_catalog(path):
+    """
+    Map a file written by write_catalog() read-only and wrap it in a SectionCatalog.
+
+    The array columns are memoryviews straight into the page cache, so every process
+    mapping the same file shares them. The value table, the decoded instructor and
+    meeting records and the hash indexes are still built per process.
+
+    Returns:
+        tuple: (catalog version, SectionCatalog)
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, file_format, version, rows, meta_length = HEADER.unpack_from(mapped)
+    if magic != FILE_MAGIC or file_format != FILE_FORMAT:
+        raise ValueError(f"{path} is not a shared catalog file")
+    meta = json.loads(mapped[HEADER.size:HEADER.size + meta_length])
+
+    view = memoryview(mapped)
+    offset = _align(HEADER.size + meta_length)
+
+    def take(typecode):
+        nonlocal offset
+        column = view[offset:offset + rows * array(typecode).itemsize].cast(typecode)
+        offset += rows * array(typecode).itemsize
+        return column
+
+    crns = take(INT64)
+    seat_counts = {key: take(INT64) for key in meta['seat_counts']}
+    columns = {key: take(UINT32) for key in meta['columns']}
+    open_flags = take(BYTE)
+    crn_strings = {int(index): crn for index, crn in meta['crn_strings'].items()}
+    catalog = SectionCatalog(meta['keys'], columns, meta['values'], crns, crn_strings, open_flags, seat_counts,
+                             payload_hash=meta['payload_hash'])
+    return version, catalog
+
+
+class SharedCatalogStore:
+    """
+    Directory through which one refresher process shares its catalogs with workers.
+
+    The refresher publishes every new catalog version as its own file and then swaps
+    manifest.json, which maps each term to its current version, with an atomic
+    rename. Workers map the file the manifest points at (see map_catalog), so N
+    workers hold one copy of the columns and cause no course-sections traffic.
+    Superseded files are unlinked right away; workers that still map them keep
+    reading the old version until they pick up the new one.
+
+    Workers ask for a term the refresher has not loaded by touching a want-<term>
+    file, which also tells the refresher the term is still in use.
+
+    Args:
+        directory (str): Directory shared by the refresher and its workers
+    """
+
+    def __init__(self, directory=SHARED_CATALOG_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest_path = os.path.join(self.directory, 'manifest.json')
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self._manifest_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def manifest(self):
+        """Returns {'terms': term list, 'catalogs': {term_code: {'version', 'file', 'fetched_at'}}}."""
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'terms': None, 'catalogs': {}}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable shared catalog manifest: {e}")
+            return {'terms': None, 'catalogs': {}}
+
+    def manifest_mtime(self):
+        try:
+            return os.stat(self._manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def publish_terms(self, terms):
+        manifest = self.manifest()
+        manifest['terms'] = terms
+        self._write_manifest(manifest)
+
+    def publish(self, term_code, catalog, fetched_at=None):
+        """Write a new version of a term's catalog and point the manifest at it. Returns the version."""
+        version = time.time_ns()
+        name = f"term-{term_code}-{version}.cat"
+        write_catalog(os.path.join(self.directory, name), catalog, version)
+
+        manifest = self.manifest()
+        previous = manifest['catalogs'].get(term_code)
+        manifest['catalogs'][term_code] = {'version': version, 'file': name, 'fetched_at': fetched_at or time.time()}
+        self._write_manifest(manifest)
+        if previous is not None:
+            self._remove(previous['file'])
+        return version
+
+    def unpublish(self, term_code):
+        manifest = self.manifest()
+        previous = manifest['catalogs'].pop(term_code, None)
+        if previous is not None:
+            self._write_manifest(manifest)
+            self._remove(previous['file'])
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def open(self, entry):
+        """Map the catalog a manifest entry points at. Returns (version, SectionCatalog)."""
+        return map_catalog(os.path.join(self.directory, entry['file']))
+
+    def request(self, term_code):
+        """Tell the refresher a worker wants (or is still using) a term."""
+        path = os.path.join(self.directory, f"want-{term_code}")
+        with open(path, 'a'):
+            pass
+        os.utime(path)
+
+    def requested_terms(self, max_age):
+        """Returns {term_code: last request time} for terms a worker asked for within max_age seconds."""
+        cutoff = time.time() - max_age
+        requested = {}
+        for name in os.listdir(self.directory):
+            if not name.startswith('want-'):
+                continue
+            try:
+                mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+            except FileNotFoundError:
+                continue
+            if mtime >= cutoff:
+                requested[name[len('want-'):]] = mtime
+        return requested
@@ -0,0 +1,149 @@
+import gzip
+import json
+import os
+import time
+import uuid
+
+# Directory holding the on-disk catalog snapshots
+SNAPSHOT_DIR = os.getenv('HOWDY_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+
+
+class SnapshotWriter:
+    """
+    Writes one snapshot incrementally, e.g. straight from a streamed response body.
+
+    The data goes to a temporary file that only replaces the previous snapshot on
+    commit(), so readers never see a half-written term.
+    """
+
+    def __init__(self, store, name):
+        self._store = store
+        self._name = name
+        self._path = store._path(name, '.json.gz')
+        self._tmp_path = f"{self._path}.{uuid.uuid4().hex}.tmp"
+        self._file = gzip.open(self._tmp_path, 'wb', compresslevel=6)
+
+    def write(self, chunk):
+        self._file.write(chunk)
+
+    def commit(self, count, fetched_at=None):
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+        meta = {'fetched_at': fetched_at or time.time(), 'count': count}
+        self._store._write_atomic(self._store._path(self._name, '.meta.json'), json.dumps(meta).encode('utf-8'))
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotStore:
+    """
+    On-disk store for the last known Howdy catalog.
+
+    Each term's course-sections payload is kept as a gzip-compressed JSON file
+    next to a small metadata file holding the fetch timestamp. The all-terms list
+    is stored the same way so a process can boot without touching the network.
+
+    Args:
+        directory (str): Directory the snapshot files are written to
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, f"{name}{suffix}")
+
+    def _write_atomic(self, path, data, compress=False):
+        # Unique per write, so concurrent writers of the same file never share a temp file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            if compress:
+                with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                    f.write(data)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _write_json(self, name, payload, fetched_at):
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self._write_atomic(self._path(name, '.json.gz'), data, compress=True)
+        meta = {'fetched_at': fetched_at, 'count': len(payload)}
+        self._write_atomic(self._path(name, '.meta.json'), json.dumps(meta).encode('utf-8'))
+
+    def _read_json(self, name):
+        try:
+            with open(self._path(name, '.meta.json'), 'rb') as f:
+                meta = json.loads(f.read())
+            with gzip.open(self._path(name, '.json.gz'), 'rb') as f:
+                payload = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable snapshot '{name}': {e}")
+            return None
+        return payload, meta.get('fetched_at')
+
+    def save_terms(self, terms, fetched_at=None):
+        self._write_json('terms', terms, fetched_at or time.time())
+
+    def load_terms(self):
+        """Returns (terms, fetched_at), or None if no snapshot exists."""
+        return self._read_json('terms')
+
+    def save(self, term_code, sections, fetched_at=None):
+        """
+        Write one term's course-sections payload to disk.
+
+        Args:
+            term_code (str): Term the sections belong to
+            sections (list): Raw course-sections payload
+            fetched_at (float): Unix time the payload was downloaded, defaults to now
+        """
+        self._write_json(f"term-{term_code}", sections, fetched_at or time.time())
+
+    def writer(self, term_code):
+        """Returns a SnapshotWriter that replaces a term's snapshot with raw JSON bytes as they are written."""
+        return SnapshotWriter(self, f"term-{term_code}")
+
+    def load(self, term_code):
+        """Returns (sections, fetched_at) for a term, or None if no snapshot exists."""
+        return self._read_json(f"term-{term_code}")
+
+    def load_raw(self, term_code):
+        """Returns (response body bytes, fetched_at) for a term without decoding it, or None if no snapshot exists."""
+        name = f"term-{term_code}"
+        try:
+            with open(self._path(name, '.meta.json'), 'rb') as f:
+                meta = json.loads(f.read())
+            with gzip.open(self._path(name, '.json.gz'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable snapshot '{name}': {e}")
+            return None
+        return data, meta.get('fetched_at')
+
+    def touch(self, term_code, fetched_at=None):
+        """Record that a term was re-fetched and found identical, without rewriting its payload."""
+        path = self._path(f"term-{term_code}", '.meta.json')
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.read())
+        except (OSError, json.JSONDecodeError):
+            return
+        meta['fetched_at'] = fetched_at or time.time()
+        self._write_atomic(path, json.dumps(meta).encode('utf-8'))